@@ -1,72 +1,88 @@
 """
 Analiza jakości instruction datasetu.
+Jedno przejście w ograniczonej pamięci (processing/sketches.py): kwantyle długości z t-digest,
+unikalne instrukcje z HyperLogLog (~0.8% błędu), histogram długości w tokenach.
 """
-import json
+import argparse
+import sys
 from pathlib import Path
-from collections import Counter
-import statistics
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from processing.sketches import DatasetSketch, build_token_counter, iter_jsonl, observe_instruction, sketch_records
+
 DATASET_PATH = ROOT / "data" / "curated" / "instruction_dataset.jsonl"
+SHORT_RESPONSE = 500
+LONG_RESPONSE = 4000
+
+def observe(sketch: DatasetSketch, record: dict) -> dict:
+    texts = observe_instruction(sketch, record)
+    n = len(texts["response"])
+    if n < SHORT_RESPONSE:
+        sketch.count("response_flags", "short")
+    elif n > LONG_RESPONSE:
+        sketch.count("response_flags", "long")
+    return texts
 
-def analyze_dataset():
+def print_length(title: str, summary: dict, unit: str) -> None:
+    print(f"\n{title}:")
+    print(f"  Średnia: {summary['mean']:.1f} {unit}")
+    print(f"  Mediana: {summary['p50']:.1f} {unit} (p90: {summary['p90']:.0f}, p99: {summary['p99']:.0f})")
+    print(f"  Min/Max: {summary['min']:.0f}/{summary['max']:.0f}")
+
+def analyze_dataset(path: Path = DATASET_PATH, tokenizer: str = "config") -> DatasetSketch:
     """Analizuje instruction dataset pod kątem jakości i dystrybucji."""
-    
-    instructions = []
-    responses = []
-    languages = []
-    sources = []
-    
-    with DATASET_PATH.open('r', encoding='utf-8') as f:
-        for line in f:
-            data = json.loads(line)
-            instructions.append(data['instruction'])
-            responses.append(data['response'])
-            languages.append(data['metadata']['language'])
-            sources.append(data['metadata']['source'])
+    counter = build_token_counter(tokenizer) if tokenizer is not None else None
+    sketch = sketch_records(iter_jsonl(path), observe, token_counter=counter)
+    total = sketch.records
     
     print("=== ANALIZA INSTRUCTION DATASET ===\n")
     
     # Podstawowe statystyki
-    print(f"Całkowita liczba par: {len(instructions)}")
-    print(f"Języki: {dict(Counter(languages))}")
-    print(f"Najczęstsze źródła: {dict(Counter(sources).most_common(5))}")
+    print(f"Całkowita liczba par: {total}")
+    if not total:
+        return sketch
+    print(f"Języki: {dict(sketch.categories['language'])}")
+    print(f"Najczęstsze źródła: {dict(sketch.categories['source'].most_common(5))}")
     
     # Długość tekstów
-    instruction_lengths = [len(inst) for inst in instructions]
-    response_lengths = [len(resp) for resp in responses]
-    
-    print(f"\nDługość instrukcji:")
-    print(f"  Średnia: {statistics.mean(instruction_lengths):.1f} znaków")
-    print(f"  Mediana: {statistics.median(instruction_lengths):.1f} znaków")
-    print(f"  Min/Max: {min(instruction_lengths)}/{max(instruction_lengths)}")
-    
-    print(f"\nDługość odpowiedzi:")
-    print(f"  Średnia: {statistics.mean(response_lengths):.1f} znaków")
-    print(f"  Mediana: {statistics.median(response_lengths):.1f} znaków")
-    print(f"  Min/Max: {min(response_lengths)}/{max(response_lengths)}")
+    print_length("Długość instrukcji", sketch.fields["instruction_chars"].summary(), "znaków")
+    print_length("Długość odpowiedzi", sketch.fields["response_chars"].summary(), "znaków")
+    for name in ("instruction_tokens", "response_tokens"):
+        if name in sketch.fields:
+            print_length(f"Tokeny ({name.split('_')[0]})", sketch.fields[name].summary(), "tokenów")
+            print("  Histogram: " + ", ".join(f"{label}: {n}" for label, n in sketch.fields[name].hist.items()))
     
     # Przykłady
     print(f"\n=== PRZYKŁADY ===")
-    sample_indices = [0, len(instructions)//2, -1]
-    for i, idx in enumerate(sample_indices):
+    for i, record in enumerate(sketch.sample()):
         print(f"\n--- Przykład {i+1} ---")
-        print(f"INSTRUKCJA: {instructions[idx]}")
-        print(f"ODPOWIEDŹ: {responses[idx][:200]}...")
-        print(f"JĘZYK: {languages[idx]} | ŹRÓDŁO: {sources[idx]}")
+        print(f"INSTRUKCJA: {record['instruction']}")
+        print(f"ODPOWIEDŹ: {record['response'][:200]}...")
+        print(f"JĘZYK: {record['metadata']['language']} | ŹRÓDŁO: {record['metadata']['source']}")
     
     # Potencjalne problemy
     print(f"\n=== POTENCJALNE PROBLEMY ===")
     
-    short_responses = sum(1 for r in response_lengths if r < 500)
-    print(f"Krótkie odpowiedzi (<500 znaków): {short_responses} ({short_responses/len(responses)*100:.1f}%)")
+    short_responses = sketch.categories["response_flags"]["short"]
+    print(f"Krótkie odpowiedzi (<{SHORT_RESPONSE} znaków): {short_responses} ({short_responses/total*100:.1f}%)")
     
-    long_responses = sum(1 for r in response_lengths if r > 4000)
-    print(f"Bardzo długie odpowiedzi (>4000 znaków): {long_responses} ({long_responses/len(responses)*100:.1f}%)")
+    long_responses = sketch.categories["response_flags"]["long"]
+    print(f"Bardzo długie odpowiedzi (>{LONG_RESPONSE} znaków): {long_responses} ({long_responses/total*100:.1f}%)")
     
-    # Duplikaty instrukcji
-    unique_instructions = len(set(instructions))
-    print(f"Unikalne instrukcje: {unique_instructions}/{len(instructions)} ({unique_instructions/len(instructions)*100:.1f}%)")
+    # Duplikaty instrukcji (szacunek HyperLogLog)
+    unique_instructions = min(total, len(sketch.distinct["instruction"]))
+    print(f"Unikalne instrukcje: ~{unique_instructions}/{total} ({unique_instructions/total*100:.1f}%)")
+    return sketch
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Analiza instruction datasetu (jedno przejście)")
+    parser.add_argument("--path", default=str(DATASET_PATH))
+    parser.add_argument("--tokenizer", default="config",
+                        help='Tokenizer do histogramu tokenów ("config" = segmentation.tokenizer, "" = heurystyka)')
+    args = parser.parse_args()
+    analyze_dataset(Path(args.path), args.tokenizer)
 
 if __name__ == "__main__":
-    analyze_dataset()
\ No newline at end of file
+    main()
@@ -1,17 +1,29 @@
 """
 Tworzy instrukcyjny dataset do treningu modelu SatyrAI.
 Przekształca artykuły w pary prompt-response do supervised fine-tuning.
+
+Strumieniowo: tagged.jsonl -> instruction_dataset.jsonl rekord po rekordzie (stała pamięć,
+zapis do pliku tymczasowego i atomowa podmiana). Wybór szablonu promptu używa RNG
+seedowanego per rekord (sha256 z seed + original_id), więc wynik jest powtarzalny
+niezależnie od kolejności i podziału na shardy (--num-shards/--shard-index).
 """
 from __future__ import annotations
 
+import argparse
+import hashlib
 import json
+import os
 import random
+import re
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional
 
 ROOT = Path(__file__).resolve().parents[1]
 IN_PATH = ROOT / "data" / "curated" / "tagged.jsonl"
 OUT_PATH = ROOT / "data" / "curated" / "instruction_dataset.jsonl"
+DEFAULT_SEED = 42
+
+HTML_TAG_RE = re.compile(r'<[^>]+>')
 
 SATIRE_PROMPTS = [
     "Napisz satyryczny komentarz do następującego tematu:",
@@ -42,8 +54,24 @@ def extract_key_phrases(text: str, max_phrases: int = 3) -> List[str]:
             phrases.append(phrase)
     return phrases[:max_phrases]
 
-def create_instruction(article: Dict[str, Any]) -> Dict[str, Any] | None:
+def record_key(article: Dict[str, Any]) -> str:
+    """Stabilny klucz rekordu: original_id, a bez niego źródło + tytuł."""
+    data = article.get('data', {})
+    return str(data.get('id') or f"{article.get('source', '')}|{data.get('title', '')}")
+
+
+def record_hash(key: str, seed: int) -> int:
+    return int.from_bytes(hashlib.sha256(f"{seed}:{key}".encode('utf-8')).digest()[:8], 'big')
+
+
+def record_rng(article: Dict[str, Any], seed: int = DEFAULT_SEED) -> random.Random:
+    """RNG zależny tylko od seeda i klucza rekordu (nie od kolejności ani procesu)."""
+    return random.Random(record_hash(record_key(article), seed))
+
+
+def create_instruction(article: Dict[str, Any], rng: Optional[random.Random] = None) -> Dict[str, Any] | None:
     """Tworzy parę instruction-response z artykułu."""
+    rng = rng or record_rng(article)
     data = article.get('data', {})
     title = data.get('title', '').strip()
     
@@ -54,8 +82,7 @@ def create_instruction(article: Dict[str, Any]) -> Dict[str, Any] | None:
         # Weź pierwszy element content (HTML)
         html_content = content_list[0].get('value', '')
         # Prosta konwersja HTML na text (usuń tagi)
-        import re
-        text = re.sub(r'<[^>]+>', '', html_content)
+        text = HTML_TAG_RE.sub('', html_content)
         text = text.replace('&nbsp;', ' ').replace('&amp;', '&').strip()
     
     # Fallback na clean_text jeśli content puste
@@ -80,7 +107,7 @@ def create_instruction(article: Dict[str, Any]) -> Dict[str, Any] | None:
     # Tylko polskie prompty na razie
     if lang == 'pl':
         # Użyj tytułu jako basis dla promptu
-        base_prompt = random.choice(prompt_templates)
+        base_prompt = rng.choice(prompt_templates)
         instruction = f"{base_prompt} {title}"
     else:
         # Angielskie prompty - dodaj później
@@ -105,34 +132,67 @@ def create_instruction(article: Dict[str, Any]) -> Dict[str, Any] | None:
         'metadata': metadata
     }
 
+def iter_instructions(
+    lines: Iterator[str],
+    seed: int = DEFAULT_SEED,
+    num_shards: int = 1,
+    shard_index: int = 0,
+) -> Iterator[Optional[Dict[str, Any]]]:
+    """Generator par (None gdy artykuł pominięty) dla rekordów należących do sharda."""
+    for line in lines:
+        if not line.strip():
+            continue
+        article = json.loads(line)
+        key = record_key(article)
+        if num_shards > 1 and record_hash(key, 0) % num_shards != shard_index:
+            continue
+        yield create_instruction(article, random.Random(record_hash(key, seed)))
+
+
+def shard_path(out_path: Path, num_shards: int, shard_index: int) -> Path:
+    if num_shards <= 1:
+        return out_path
+    return out_path.with_name(f"{out_path.stem}.shard-{shard_index:03d}-of-{num_shards:03d}{out_path.suffix}")
+
+
 def main() -> None:
-    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    parser = argparse.ArgumentParser(description="Pary instruction-response z tagged.jsonl (strumieniowo)")
+    parser.add_argument("--in", dest="in_path", default=str(IN_PATH))
+    parser.add_argument("--out", dest="out_path", default=str(OUT_PATH))
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed losowania promptów (per rekord)")
+    parser.add_argument("--num-shards", type=int, default=1)
+    parser.add_argument("--shard-index", type=int, default=0)
+    args = parser.parse_args()
+    if not 0 <= args.shard_index < args.num_shards:
+        parser.error("--shard-index musi być w zakresie [0, --num-shards)")
+
+    out_path = shard_path(Path(args.out_path), args.num_shards, args.shard_index)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_suffix(out_path.suffix + ".tmp")
     
-    instructions = []
+    written = 0
     skipped = 0
+    # Przykład do podglądu: reservoir sampling rozmiaru 1 (stała pamięć, powtarzalny)
+    preview_rng = random.Random(args.seed)
+    sample = None
     
-    with IN_PATH.open('r', encoding='utf-8') as fin:
-        for line in fin:
-            article = json.loads(line)
-            instruction_pair = create_instruction(article)
-            
-            if instruction_pair:
-                instructions.append(instruction_pair)
-            else:
+    with Path(args.in_path).open('r', encoding='utf-8') as fin, tmp_path.open('w', encoding='utf-8') as fout:
+        for instruction_pair in iter_instructions(fin, args.seed, args.num_shards, args.shard_index):
+            if not instruction_pair:
                 skipped += 1
+                continue
+            fout.write(json.dumps(instruction_pair, ensure_ascii=False) + '\n')
+            written += 1
+            if preview_rng.randrange(written) == 0:
+                sample = instruction_pair
+    os.replace(tmp_path, out_path)
     
-    # Zapisz jako JSONL
-    with OUT_PATH.open('w', encoding='utf-8') as fout:
-        for inst in instructions:
-            fout.write(json.dumps(inst, ensure_ascii=False) + '\n')
-    
-    print(f"Utworzono {len(instructions)} par instruction-response")
+    print(f"Utworzono {written} par instruction-response")
     print(f"Pominięto {skipped} artykułów (zbyt krótkie)")
-    print(f"Zapisano: {OUT_PATH}")
+    print(f"Zapisano: {out_path}")
     
     # Pokaż przykład
-    if instructions:
-        sample = random.choice(instructions)
+    if sample:
         print("\n--- Przykład pary instruction-response ---")
         print(f"INSTRUCTION: {sample['instruction']}")
         print(f"RESPONSE: {sample['response'][:200]}...")
@@ -1,50 +1,78 @@
 """
 Prosty raport statystyk:
 - Zlicza wpisy per source, kraj, typ.
+- Długości clean_text (znaki i tokeny: średnia, kwantyle z t-digest, histogram log2)
+  i szacunek unikalnych tekstów (HyperLogLog) — jedno przejście, ograniczona pamięć
+  (processing/sketches.py).
 - Raport zapisuje do docs/stats_report.md
 Wejście: data/clean/clean_safe.jsonl
 """
 from __future__ import annotations
 
-import collections
-import json
+import argparse
+import sys
 from pathlib import Path
+from typing import Any, Dict
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from processing.sketches import DatasetSketch, build_token_counter, iter_jsonl, sketch_records
+
 IN_PATH = ROOT / "data" / "clean" / "clean_safe.jsonl"
 REPORT = ROOT / "docs" / "stats_report.md"
 
 
+def observe(sketch: DatasetSketch, rec: Dict[str, Any]) -> Dict[str, str]:
+    sketch.count("source", rec.get("source", "?"))
+    sketch.count("country", rec.get("country", "?"))
+    sketch.count("type", rec.get("type", "?"))
+    text = rec.get("clean_text", "")
+    sketch.observe("text_chars", len(text))
+    sketch.add_distinct("text", text)
+    return {"text": text}
+
+
 def main() -> None:
-    by_source = collections.Counter()
-    by_country = collections.Counter()
-    by_type = collections.Counter()
-    total = 0
-    with IN_PATH.open("r", encoding="utf-8") as fin:
-        for line in fin:
-            rec = json.loads(line)
-            total += 1
-            by_source[rec.get("source", "?")] += 1
-            by_country[rec.get("country", "?")] += 1
-            by_type[rec.get("type", "?")] += 1
+    parser = argparse.ArgumentParser(description="Raport statystyk clean_safe.jsonl")
+    parser.add_argument("--tokenizer", default="config",
+                        help='Tokenizer do długości w tokenach ("config" = segmentation.tokenizer, "" = heurystyka)')
+    args = parser.parse_args()
+
+    sketch = sketch_records(iter_jsonl(IN_PATH), observe, token_counter=build_token_counter(args.tokenizer))
+    total = sketch.records
 
     lines = [
         "# Stats report",
         "",
         f"Total records: {total}",
+        f"Distinct texts (HyperLogLog estimate): ~{min(total, len(sketch.distinct['text']))}",
         "",
         "## By source",
     ]
-    for k, v in by_source.most_common():
+    for k, v in sketch.categories["source"].most_common():
         lines.append(f"- {k}: {v}")
     lines.append("")
     lines.append("## By country")
-    for k, v in by_country.most_common():
+    for k, v in sketch.categories["country"].most_common():
         lines.append(f"- {k}: {v}")
     lines.append("")
     lines.append("## By type")
-    for k, v in by_type.most_common():
+    for k, v in sketch.categories["type"].most_common():
         lines.append(f"- {k}: {v}")
+    for name, title in (("text_chars", "Text length (chars)"), ("text_tokens", "Text length (tokens)")):
+        if name not in sketch.fields:
+            continue
+        summary = sketch.fields[name].summary()
+        lines.append("")
+        lines.append(f"## {title}")
+        lines.append(
+            f"- mean {summary['mean']:.1f}, p50 {summary['p50']:.0f}, p90 {summary['p90']:.0f}, "
+            f"p99 {summary['p99']:.0f}, min/max {summary['min']:.0f}/{summary['max']:.0f}"
+        )
+        if name == "text_tokens":
+            for label, n in sketch.fields[name].hist.items():
+                lines.append(f"- {label}: {n}")
 
     REPORT.write_text("\n".join(lines), encoding="utf-8")
     print(f"Zapisano raport: {REPORT}")
@@ -52,4 +80,3 @@ def main() -> None:
 
 if __name__ == "__main__":
     main()
-
@@ -1,12 +1,20 @@
 """
 Podział instruction datasetu na zbiory treningowy i ewaluacyjny.
 Zachowuje stratyfikację po językach i źródłach.
+
+Jedno przejście strumieniowe (stała pamięć — w pamięci tylko liczniki per warstwa):
+rekord trafia do eval, gdy sha256(seed, warstwa (język, źródło), ID rekordu) znormalizowany
+do [0, 1) jest < EVAL_RATIO. Przydział zależy tylko od samego rekordu, więc przy dopisywaniu
+nowych rekordów istniejące nigdy nie migrują między train i eval, a proporcja w każdej
+warstwie wynosi ~EVAL_RATIO. Kolejność wyjścia = kolejność wejścia (tasowanie robi loader).
 """
+import argparse
+import hashlib
 import json
-import random
+import os
+from collections import Counter
 from pathlib import Path
-from collections import defaultdict
-from typing import Dict, List, Any
+from typing import Dict, Any, Tuple
 
 ROOT = Path(__file__).resolve().parents[1]
 INPUT_PATH = ROOT / "data" / "curated" / "instruction_dataset.jsonl"
@@ -16,82 +24,80 @@ EVAL_PATH = ROOT / "data" / "curated" / "eval_dataset.jsonl"
 EVAL_RATIO = 0.15  # 15% do ewaluacji
 RANDOM_SEED = 42
 
-def stratified_split(data: List[Dict[str, Any]], eval_ratio: float) -> tuple:
-    """Stratyfikowany podział zachowujący proporcje języków i źródeł."""
-    random.seed(RANDOM_SEED)
-    
-    # Grupuj po języku i źródle
-    groups = defaultdict(list)
-    for item in data:
-        lang = item['metadata']['language']
-        source = item['metadata']['source']
-        key = f"{lang}_{source}"
-        groups[key].append(item)
-    
-    train_data = []
-    eval_data = []
-    
-    # Dla każdej grupy, zachowaj proporcję
-    for group_key, group_items in groups.items():
-        random.shuffle(group_items)
-        eval_size = max(1, int(len(group_items) * eval_ratio))  # Min 1 na eval
-        
-        eval_items = group_items[:eval_size]
-        train_items = group_items[eval_size:]
-        
-        eval_data.extend(eval_items)
-        train_data.extend(train_items)
-        
-        print(f"Grupa {group_key}: {len(train_items)} train, {len(eval_items)} eval")
-    
-    # Tasuj końcowe zbiory
-    random.shuffle(train_data)
-    random.shuffle(eval_data)
-    
-    return train_data, eval_data
+def stratum_key(item: Dict[str, Any]) -> str:
+    """Warstwa stratyfikacji: język + źródło."""
+    metadata = item.get('metadata', {})
+    return f"{metadata.get('language')}_{metadata.get('source')}"
+
+def record_id(item: Dict[str, Any]) -> str:
+    """Stabilne ID rekordu: original_id, a bez niego hash treści instrukcji."""
+    original_id = item.get('metadata', {}).get('original_id')
+    if original_id:
+        return str(original_id)
+    return hashlib.sha256(item.get('instruction', '').encode('utf-8')).hexdigest()
+
+def split_fraction(stratum: str, rec_id: str, seed: int = RANDOM_SEED) -> float:
+    """Deterministyczna wartość z [0, 1) dla rekordu w warstwie."""
+    digest = hashlib.sha256(f"{seed}:{stratum}:{rec_id}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2**64
+
+def assign_split(item: Dict[str, Any], eval_ratio: float = EVAL_RATIO, seed: int = RANDOM_SEED) -> Tuple[str, str]:
+    """(split, warstwa) dla rekordu; split to "train" albo "eval"."""
+    stratum = stratum_key(item)
+    split = "eval" if split_fraction(stratum, record_id(item), seed) < eval_ratio else "train"
+    return split, stratum
 
 def main():
     """Główna funkcja podziału datasetu."""
-    # Wczytaj dane
-    print("Wczytywanie instruction dataset...")
-    data = []
-    with INPUT_PATH.open('r', encoding='utf-8') as f:
-        for line in f:
-            data.append(json.loads(line))
-    
-    print(f"Wczytano {len(data)} rekordów")
-    
-    # Stratyfikowany podział
-    print(f"\nPodział na train/eval z ratio {EVAL_RATIO}")
-    train_data, eval_data = stratified_split(data, EVAL_RATIO)
+    parser = argparse.ArgumentParser(description="Strumieniowy, deterministyczny podział train/eval")
+    parser.add_argument("--in", dest="in_path", default=str(INPUT_PATH))
+    parser.add_argument("--train", dest="train_path", default=str(TRAIN_PATH))
+    parser.add_argument("--eval", dest="eval_path", default=str(EVAL_PATH))
+    parser.add_argument("--eval-ratio", type=float, default=EVAL_RATIO)
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED,
+                        help="Zmiana seeda losuje nowy podział (łamie stabilność względem poprzedniego)")
+    args = parser.parse_args()
+
+    paths = {"train": Path(args.train_path), "eval": Path(args.eval_path)}
+    tmp_paths = {name: path.with_suffix(path.suffix + ".tmp") for name, path in paths.items()}
+    for path in paths.values():
+        path.parent.mkdir(parents=True, exist_ok=True)
     
-    # Zapisz zbiory
-    print(f"\nZapis zbiorów...")
-    TRAIN_PATH.parent.mkdir(parents=True, exist_ok=True)
-    EVAL_PATH.parent.mkdir(parents=True, exist_ok=True)
+    print(f"Podział na train/eval z ratio {args.eval_ratio} (strumieniowo, hash ID w warstwie)")
+    groups: Dict[str, Counter] = {}
+    langs = {"train": Counter(), "eval": Counter()}
     
-    with TRAIN_PATH.open('w', encoding='utf-8') as f:
-        for item in train_data:
-            f.write(json.dumps(item, ensure_ascii=False) + '\n')
+    with Path(args.in_path).open('r', encoding='utf-8') as fin, \
+            tmp_paths["train"].open('w', encoding='utf-8') as ftrain, \
+            tmp_paths["eval"].open('w', encoding='utf-8') as feval:
+        outputs = {"train": ftrain, "eval": feval}
+        for line in fin:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            split, stratum = assign_split(item, args.eval_ratio, args.seed)
+            # Linia wejściowa przepisywana bez ponownej serializacji
+            outputs[split].write(line if line.endswith('\n') else line + '\n')
+            groups.setdefault(stratum, Counter())[split] += 1
+            langs[split][item.get('metadata', {}).get('language')] += 1
+    for name in paths:
+        os.replace(tmp_paths[name], paths[name])
     
-    with EVAL_PATH.open('w', encoding='utf-8') as f:
-        for item in eval_data:
-            f.write(json.dumps(item, ensure_ascii=False) + '\n')
+    for group_key, counts in sorted(groups.items()):
+        print(f"Grupa {group_key}: {counts['train']} train, {counts['eval']} eval")
     
     # Podsumowanie
+    n_train = sum(langs["train"].values())
+    n_eval = sum(langs["eval"].values())
     print(f"\n=== PODSUMOWANIE ===")
-    print(f"Train: {len(train_data)} przykładów -> {TRAIN_PATH}")
-    print(f"Eval: {len(eval_data)} przykładów -> {EVAL_PATH}")
-    print(f"Ratio eval: {len(eval_data)/len(data)*100:.1f}%")
+    print(f"Train: {n_train} przykładów -> {paths['train']}")
+    print(f"Eval: {n_eval} przykładów -> {paths['eval']}")
+    print(f"Ratio eval: {n_eval / max(1, n_train + n_eval) * 100:.1f}%")
     
     # Sprawdź dystrybucję języków
-    train_langs = [item['metadata']['language'] for item in train_data]
-    eval_langs = [item['metadata']['language'] for item in eval_data]
-    
-    from collections import Counter
     print(f"\nDystrybucja języków:")
-    print(f"Train: {dict(Counter(train_langs))}")
-    print(f"Eval: {dict(Counter(eval_langs))}")
+    print(f"Train: {dict(langs['train'])}")
+    print(f"Eval: {dict(langs['eval'])}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
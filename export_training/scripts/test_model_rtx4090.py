@@ -3,90 +3,73 @@
 Test wytrenowanego modelu SatyrAI na RTX 4090
 """
 
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
-from peft import PeftModel
+import argparse
+import json
+import sys
 import warnings
+from pathlib import Path
+
+import torch
 warnings.filterwarnings("ignore")
 
+# ml/ leży w katalogu nadrzędnym (paczka eksportu) albo w korzeniu repozytorium
+for parent in Path(__file__).resolve().parents[1:3]:
+    sys.path.append(str(parent))
+from ml.generation import BatchGenerator, GenerationConfig, load_model, load_prompts
+
 # Konfiguracja
 BASE_MODEL = "meta-llama/Llama-3.1-8B-Instruct"
 ADAPTER_PATH = "./results_rtx4090/final"
 
-def test_model():
+TEST_PROMPTS = [
+    "Napisz krótki satyryczny komentarz o inflacji w Polsce",
+    "Skomentuj z perspektywy libertariańskiej: wzrost podatków",
+    "Write a libertarian opinion about government spending",
+    "Opisz ironicznie biurokrację urzędniczą",
+    "Comment on free market economics"
+]
+
+def test_model(prompts_path=None, out_path=None, batch_size=16, max_new_tokens=200):
+    """Generacja wsadowa (ml/generation.py) dla promptów testowych albo pliku z promptami."""
     print("🔄 Ładowanie modelu...")
-    
-    # Tokenizer
-    tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL)
-    if tokenizer.pad_token is None:
-        tokenizer.pad_token = tokenizer.eos_token
-    
-    # Base model
-    model = AutoModelForCausalLM.from_pretrained(
-        BASE_MODEL, 
-        torch_dtype=torch.bfloat16,
-        device_map="auto",
-        trust_remote_code=True
-    )
-    
-    # Załaduj adapter LoRA
-    model = PeftModel.from_pretrained(model, ADAPTER_PATH)
+    model, tokenizer = load_model(BASE_MODEL, ADAPTER_PATH)
     
     print("✅ Model załadowany!")
-    print(f"🎯 GPU: {torch.cuda.get_device_name()}")
-    print(f"💾 VRAM: {torch.cuda.memory_allocated() / 1024**3:.1f}GB")
+    if torch.cuda.is_available():
+        print(f"🎯 GPU: {torch.cuda.get_device_name()}")
+        print(f"💾 VRAM: {torch.cuda.memory_allocated() / 1024**3:.1f}GB")
     
-    # Testy
-    test_prompts = [
-        "Napisz krótki satyryczny komentarz o inflacji w Polsce",
-        "Skomentuj z perspektywy libertariańskiej: wzrost podatków",
-        "Write a libertarian opinion about government spending",
-        "Opisz ironicznie biurokrację urzędniczą",
-        "Comment on free market economics"
-    ]
+    prompts = load_prompts(prompts_path) if prompts_path else TEST_PROMPTS
+    generator = BatchGenerator(
+        model, tokenizer,
+        GenerationConfig(max_new_tokens=max_new_tokens, temperature=0.8, top_p=0.9, batch_size=batch_size),
+    )
+    results = generator.generate(prompts)
     
     print("\n🎭 Testowanie modelu:")
     print("=" * 60)
     
-    for i, prompt in enumerate(test_prompts, 1):
-        print(f"\n[Test {i}/5]")
-        print(f"Prompt: {prompt}")
+    for i, result in enumerate(results, 1):
+        print(f"\n[Test {i}/{len(results)}]")
+        print(f"Prompt: {result['prompt']}")
         print("-" * 40)
-        
-        # Format instruction
-        full_prompt = f"### Instruction:\n{prompt}\n### Response:\n"
-        
-        # Tokenize
-        inputs = tokenizer(full_prompt, return_tensors="pt").to(model.device)
-        
-        # Generate
-        with torch.no_grad():
-            outputs = model.generate(
-                **inputs,
-                max_new_tokens=200,
-                temperature=0.8,
-                top_p=0.9,
-                do_sample=True,
-                pad_token_id=tokenizer.eos_token_id,
-                eos_token_id=tokenizer.eos_token_id,
-            )
-        
-        # Decode response
-        full_response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        
-        # Extract only the model's response (after "### Response:")
-        if "### Response:\n" in full_response:
-            response = full_response.split("### Response:\n")[1].strip()
-        else:
-            response = full_response[len(full_prompt):].strip()
-        
-        print(f"Response: {response}")
+        print(f"Response: {result['response']}")
         print()
+    
+    stats = generator.stats.summary()
+    print(f"⏱️  {stats['generated_tokens']} tokenów, {stats['tokens_per_s']} tokenów/s "
+          f"(prefill {stats['prefill_s']}s, dekodowanie {stats['decode_s']}s), stop: {stats['stop_reasons']}")
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps({k: v for k, v in result.items() if k != "token_ids"}, ensure_ascii=False) + "\n")
+        print(f"💾 Odpowiedzi: {out_path}")
 
 def quick_test():
     """Szybki test czy model się ładuje"""
     try:
         print("⚡ Szybki test ładowania...")
+        from transformers import AutoTokenizer
         tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL)
         
         # Test czy adapter istnieje
@@ -113,12 +96,19 @@ def quick_test():
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test modelu SatyrAI (generacja wsadowa)")
+    parser.add_argument("--prompts", help="plik .txt (prompt w linii) albo .jsonl (instruction/prompt)")
+    parser.add_argument("--out", help="odpowiedzi JSONL")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-new-tokens", type=int, default=200)
+    args = parser.parse_args()
+
     print("🎯 SatyrAI Model Tester - RTX 4090")
     print("=" * 50)
     
     if quick_test():
         print("\n🚀 Uruchamiam pełny test...")
-        test_model()
+        test_model(args.prompts, args.out, args.batch_size, args.max_new_tokens)
         print("\n🎉 Test zakończony!")
     else:
         print("\n❌ Test nie może być uruchomiony")
\ No newline at end of file
@@ -0,0 +1,236 @@
+"""
+Wspólny cache audio dla skryptów YouTube (content-addressed, z limitem LRU):
+- data/audio_cache/blobs/<sha256[:2]>/<sha256>.<ext> — pliki adresowane treścią
+  (ten sam plik pod dwoma kluczami zajmuje miejsce raz).
+- data/audio_cache/index.json — mapa "<video_id>:<format>" -> digest/rozmiar/ostatni dostęp.
+- Formaty: "bestaudio" (yt-dlp -f bestaudio), "mp3" (yt-dlp -x --audio-format mp3),
+  "pcm16k" (zdekodowane 16 kHz mono int16 .npy — wejście dla ingest/long_audio.py).
+
+Zmiana modelu Whisper nie wymaga ponownego pobierania: audio i PCM są brane z cache.
+Po przekroczeniu limitu (config.yaml: audio_cache.max_gb) usuwane są najdawniej używane wpisy
+(poza innymi formatami tego samego video_id, np. audio, z którego właśnie powstaje PCM).
+Czasy dostępu z lookup() są buforowane w pamięci i zapisywane do index.json najwyżej co
+ACCESS_FLUSH_SECONDS, przy najbliższym put() albo na końcu procesu.
+"""
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import yaml
+from filelock import FileLock
+
+ROOT = Path(__file__).resolve().parents[1]
+CONFIG = ROOT / "config" / "config.yaml"
+AUDIO_CACHE_DIR = ROOT / "data" / "audio_cache"
+DEFAULT_MAX_GB = 20.0
+ACCESS_FLUSH_SECONDS = 60.0
+
+AUDIO_EXTS = ("mp3", "m4a", "webm", "opus", "mp4")
+PCM_FORMAT = "pcm16k"
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class AudioCache:
+    def __init__(self, root: Path = AUDIO_CACHE_DIR, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.blobs = self.root / "blobs"
+        self.tmp = self.root / "tmp"
+        self.index_path = self.root / "index.json"
+        self.max_bytes = max_bytes if max_bytes is not None else int(DEFAULT_MAX_GB * 1024**3)
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self.tmp.mkdir(parents=True, exist_ok=True)
+        self._lock = FileLock(str(self.root / "index.lock"))
+        self._accessed: Dict[str, float] = {}  # klucz -> czas dostępu jeszcze niezapisany w indeksie
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_config(cls) -> "AudioCache":
+        cfg: Dict[str, Any] = {}
+        if CONFIG.exists():
+            cfg = (yaml.safe_load(CONFIG.read_text(encoding="utf-8")) or {}).get("audio_cache", {})
+        root = ROOT / cfg["dir"] if cfg.get("dir") else AUDIO_CACHE_DIR
+        max_gb = float(cfg.get("max_gb", DEFAULT_MAX_GB))
+        return cls(root=root, max_bytes=int(max_gb * 1024**3))
+
+    # --- indeks -------------------------------------------------------------
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if not self.index_path.exists():
+            return {}
+        return json.loads(self.index_path.read_text(encoding="utf-8"))
+
+    def _save_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        tmp = self.index_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(index, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+    def _apply_access(self, index: Dict[str, Dict[str, Any]]) -> None:
+        """Przenosi buforowane czasy dostępu do indeksu (wywoływane pod blokadą)."""
+        for key, accessed in self._accessed.items():
+            entry = index.get(key)
+            if entry and accessed > entry["last_access"]:
+                entry["last_access"] = accessed
+        self._accessed.clear()
+        self._last_flush = time.monotonic()
+
+    def flush(self) -> None:
+        """Zapisuje buforowane czasy dostępu LRU do index.json."""
+        if not self._accessed:
+            return
+        with self._lock:
+            index = self._load_index()
+            self._apply_access(index)
+            self._save_index(index)
+
+    @staticmethod
+    def _key(video_id: str, fmt: str) -> str:
+        return f"{video_id}:{fmt}"
+
+    def _blob_path(self, digest: str, ext: str) -> Path:
+        return self.blobs / digest[:2] / f"{digest}.{ext}"
+
+    # --- API ----------------------------------------------------------------
+
+    def lookup(self, video_id: str, fmt: str) -> Optional[Path]:
+        """Ścieżka pliku z cache (aktualizuje czas dostępu LRU) lub None."""
+        key = self._key(video_id, fmt)
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if not entry:
+                return None
+            path = self._blob_path(entry["digest"], entry["ext"])
+            if not path.exists():
+                del index[key]
+                self._apply_access(index)
+                self._save_index(index)
+                return None
+            self._accessed[key] = time.time()
+            # Sam czas dostępu nie wymaga przepisywania indeksu przy każdym trafieniu
+            if time.monotonic() - self._last_flush >= ACCESS_FLUSH_SECONDS:
+                self._apply_access(index)
+                self._save_index(index)
+            return path
+
+    def put(self, video_id: str, fmt: str, src: Path, move: bool = True) -> Path:
+        """Dodaje plik pod kluczem (video_id, fmt); zwraca ścieżkę bloba w cache."""
+        src = Path(src)
+        digest = file_digest(src)
+        ext = src.suffix.lstrip(".") or "bin"
+        dest = self._blob_path(digest, ext)
+        with self._lock:
+            if dest.exists():
+                if move:
+                    src.unlink()
+            else:
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                if move:
+                    shutil.move(str(src), dest)
+                else:
+                    shutil.copy2(src, dest)
+            index = self._load_index()
+            self._apply_access(index)
+            now = time.time()
+            index[self._key(video_id, fmt)] = {
+                "digest": digest,
+                "ext": ext,
+                "size": dest.stat().st_size,
+                "created": now,
+                "last_access": now,
+            }
+            self._evict(index, keep_video=video_id)
+            self._save_index(index)
+        return dest
+
+    def fetch_audio(
+        self,
+        video_id: str,
+        fmt: str,
+        downloader: Callable[[Path], Optional[Path]],
+        legacy_path: Optional[Path] = None,
+    ) -> Optional[Path]:
+        """
+        Zwraca audio z cache albo pobiera je `downloader(target_dir)` do katalogu
+        tymczasowego w cache i rejestruje. Sieć jest używana tylko przy braku wpisu.
+        legacy_path: plik ze starego układu skryptów (audio/<id>.mp3) — przenoszony do cache.
+        """
+        cached = self.lookup(video_id, fmt)
+        if cached:
+            return cached
+        if legacy_path is not None and Path(legacy_path).exists():
+            return self.put(video_id, fmt, Path(legacy_path))
+        with tempfile.TemporaryDirectory(dir=self.tmp, ignore_cleanup_errors=True) as tmpdir:
+            downloaded = downloader(Path(tmpdir))
+            if not downloaded or not Path(downloaded).exists():
+                return None
+            return self.put(video_id, fmt, Path(downloaded))
+
+    def find_any_audio(self, video_id: str) -> Optional[Path]:
+        for fmt in ("bestaudio", "mp3"):
+            path = self.lookup(video_id, fmt)
+            if path:
+                return path
+        return None
+
+    def get_pcm(self, video_id: str, audio_path: Optional[Path] = None) -> Optional[Path]:
+        """
+        Ścieżka do zdekodowanego 16 kHz PCM (.npy, int16). Dekoduje raz z audio z cache
+        (lub podanego audio_path) i zapamiętuje wynik pod formatem "pcm16k".
+        """
+        cached = self.lookup(video_id, PCM_FORMAT)
+        if cached:
+            return cached
+        source = audio_path or self.find_any_audio(video_id)
+        if not source:
+            return None
+        import numpy as np
+
+        from ingest.long_audio import decode_audio
+
+        pcm = decode_audio(Path(source))
+        with tempfile.TemporaryDirectory(dir=self.tmp, ignore_cleanup_errors=True) as tmpdir:
+            out = Path(tmpdir) / f"{video_id}.npy"
+            np.save(out, pcm)
+            return self.put(video_id, PCM_FORMAT, out)
+
+    def _evict(self, index: Dict[str, Dict[str, Any]], keep_video: str) -> None:
+        """
+        Usuwa najdawniej używane wpisy, aż suma unikalnych blobów <= max_bytes.
+        Wpisy keep_video (wszystkie formaty) zostają — także ich bloby współdzielone z innymi kluczami.
+        """
+        blob_sizes: Dict[str, int] = {}
+        for entry in index.values():
+            blob_sizes[entry["digest"]] = entry["size"]
+        kept = {key for key in index if key.rsplit(":", 1)[0] == keep_video}
+        total = sum(blob_sizes.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(index.items(), key=lambda kv: kv[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key in kept:
+                continue
+            del index[key]
+            digest = entry["digest"]
+            if any(e["digest"] == digest for e in index.values()):
+                continue
+            path = self._blob_path(digest, entry["ext"])
+            if path.exists():
+                path.unlink()
+            total -= blob_sizes.pop(digest, 0)
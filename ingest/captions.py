@@ -0,0 +1,117 @@
+"""
+Strumieniowy parser napisów VTT/SRT (yt-dlp --write-auto-sub / --write-sub):
+- Czyta plik linia po linii (bez read_text całego pliku), regexy kompilowane raz.
+- Zachowuje czasy cue i zwraca segmenty w formacie wspólnym z transcript API/Whisper:
+  {"start": float, "end": float, "text": str} (patrz ingest/segment_store.py).
+- Usuwa "rolling" duplikaty auto-napisów YouTube: każda linia pojawia się tam 2-3 razy
+  (jako nowa linia, potem jako górna linia kolejnego cue i w 10 ms cue przejściowych).
+  Porównanie tylko z bezpośrednio poprzednim cue — prawdziwe powtórzenia w dalszych cue
+  (np. "Tak." / "Nie." / "Tak." w ręcznych SRT) zostają.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# 00:01:02.345 | 01:02.345 | 00:01:02,345 (SRT)
+TIMESTAMP = r"(?:(\d{1,2}):)?(\d{1,2}):(\d{2})[.,](\d{1,3})"
+TIMING_RE = re.compile(rf"^\s*{TIMESTAMP}\s*-->\s*{TIMESTAMP}")
+TAG_RE = re.compile(r"<[^>]*>")
+SPACE_RE = re.compile(r"\s+")
+VTT_HEADER_PREFIXES = ("WEBVTT", "Kind:", "Language:", "NOTE", "STYLE", "REGION")
+ENTITIES = {"&amp;": "&", "&lt;": "<", "&gt;": ">", "&nbsp;": " ", "&#39;": "'", "&quot;": '"'}
+
+
+@dataclass
+class Cue:
+    start: float
+    end: float
+    lines: List[str] = field(default_factory=list)
+
+
+def _seconds(h: Optional[str], m: str, s: str, ms: str) -> float:
+    return int(h or 0) * 3600 + int(m) * 60 + int(s) + int(ms.ljust(3, "0")) / 1000.0
+
+
+def clean_caption_line(line: str) -> str:
+    """Usuwa tagi (<c>, <00:00:01.000>, <i>), encje i nadmiarowe spacje."""
+    text = TAG_RE.sub("", line)
+    if "&" in text:
+        for ent, repl in ENTITIES.items():
+            text = text.replace(ent, repl)
+    return SPACE_RE.sub(" ", text).strip()
+
+
+def iter_caption_cues(path: Path) -> Iterator[Cue]:
+    """Generator cue z pliku VTT lub SRT (format wykrywany po liniach czasu)."""
+    cue: Optional[Cue] = None
+    with Path(path).open("r", encoding="utf-8", errors="ignore") as f:
+        for raw in f:
+            line = raw.rstrip("\r\n")
+            match = TIMING_RE.match(line)
+            if match:
+                if cue is not None and cue.lines:
+                    yield cue
+                g = match.groups()
+                cue = Cue(start=_seconds(*g[0:4]), end=_seconds(*g[4:8]))
+                continue
+            if cue is None:
+                # Nagłówek VTT / numer cue SRT przed pierwszą linią czasu
+                continue
+            if not line:
+                if cue.lines:
+                    yield cue
+                cue = None
+                continue
+            if not line.strip():
+                # YouTube wstawia linie z samą spacją wewnątrz cue — to nie koniec cue
+                continue
+            if line.startswith(VTT_HEADER_PREFIXES):
+                continue
+            text = clean_caption_line(line)
+            if text:
+                cue.lines.append(text)
+    if cue is not None and cue.lines:
+        yield cue
+
+
+def _new_text(text: str, previous: List[str]) -> str:
+    """
+    Część linii nieobecna w poprzednim cue ("" gdy to powtórzenie albo jego prefiks
+    urwany na granicy słowa — "Tak." po "Tak jest." to nowa linia).
+    """
+    for line in previous:
+        if text == line or line.startswith(text + " "):
+            return ""
+        if text.startswith(line + " "):
+            # Kontynuacja: poprzednia linia rozbudowana o kolejne słowa
+            return text[len(line):].strip()
+    return text
+
+
+def iter_caption_segments(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Segmenty bez rolling duplikatów: linie powtórzone z bezpośrednio poprzedniego cue
+    (albo jego prefiksy) są pomijane, kontynuacje przycinane do nowych słów. Cue bez
+    nowego tekstu wydłuża poprzedni segment.
+    """
+    previous: List[str] = []
+    pending: Optional[Dict[str, Any]] = None
+    for cue in iter_caption_cues(path):
+        new_lines = [t for t in (_new_text(text, previous) for text in cue.lines) if t]
+        previous = cue.lines
+        if not new_lines:
+            if pending is not None:
+                pending["end"] = max(pending["end"], cue.end)
+            continue
+        if pending is not None:
+            yield pending
+        pending = {"start": cue.start, "end": cue.end, "text": " ".join(new_lines)}
+    if pending is not None:
+        yield pending
+
+
+def parse_caption_segments(path: Path) -> List[Dict[str, Any]]:
+    return list(iter_caption_segments(path))
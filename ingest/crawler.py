@@ -0,0 +1,521 @@
+"""
+Asynchroniczny silnik crawlera (wspólny dla Salon24Scraper i serwisów z scraping_analysis):
+- Frontier: kolejka priorytetowa (heapq) per host; niższy priorytet = wcześniej.
+- Grzeczność per host: robots.txt (can_fetch, Crawl-delay, Request-rate) pobierany przed
+  pierwszym żądaniem; odstęp między startami żądań = opóźnienie hosta; Retry-After dla 429/503.
+- Współbieżność: różne hosty pobierane równolegle, limit aktywnych żądań per host
+  (max_per_host) i globalnie (max_concurrency).
+- requests (blokujące) i parsowanie HTML idą przez asyncio.to_thread — pętla zdarzeń
+  tylko planuje.
+- http_cache (ingest/http_cache.py): strony i robots.txt przez cache — rewalidacja
+  warunkowa i odtwarzanie offline; odstępy per host planuje nadal crawler.
+
+Handler dostaje (CrawlRequest, requests.Response) i zwraca iterowalną kolekcję:
+CrawlRequest => nowy URL do frontiera, dict => rekord przekazywany do on_record.
+
+Checkpointy (CrawlCheckpoint): log pobranych URL-i, zrzut frontiera (łącznie z żądaniami
+w locie i nieudanymi — po wznowieniu są pobierane ponownie) i rozmiary plików wyjściowych zapisywane co interval_s / every_n żądań (fsync +
+atomowy rename) oraz przy wyjściu, także po Ctrl-C. Wznowienie obcina pliki wyjściowe
+i log do rozmiarów z checkpointu, więc praca po checkpoincie jest powtarzana bez duplikatów.
+Crawl zakończony (pusty frontier, bez nieudanych) usuwa checkpoint — kolejne uruchomienie
+zaczyna od nowa. Seedy (listingi) omijają seen, więc zawsze są pobierane ponownie
+i wyłapują nowe wpisy.
+
+Deduplikacja: frontier porównuje URL-e po canonicalize_url w skalowalnym filtrze Blooma
+(2-3 bajty na URL zamiast zbioru napisów; rzadkie fałszywe trafienie pomija nowy URL).
+Z url_store (ingest/url_store.py) żądania rodzajów z store_kinds (strony z treścią, np.
+artykuły) znane z poprzednich uruchomień są pomijane przed pobraniem; magazyn jest
+zatwierdzany razem z checkpointem.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from ingest.http_cache import HttpCache
+from ingest.url_store import ScalableBloomFilter, UrlStore, canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; SatyrAI-Research/1.0; Educational research)"
+DEFAULT_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "pl,en;q=0.7",
+    "Accept-Encoding": "gzip, deflate",
+}
+RETRY_STATUSES = (429, 503)
+SEEN_ERROR_RATE = 1e-4
+
+_SEQ = itertools.count()
+CRAWL_DELAY_RE = re.compile(r"^\s*crawl-delay\s*:\s*([0-9]*\.?[0-9]+)", re.I)
+USER_AGENT_RE = re.compile(r"^\s*user-agent\s*:\s*(\S+)", re.I)
+
+Handler = Callable[["CrawlRequest", requests.Response], Iterable[Any]]
+
+
+@dataclass(order=True)
+class CrawlRequest:
+    priority: int
+    seq: int = field(default_factory=lambda: next(_SEQ))
+    url: str = field(default="", compare=False)
+    kind: str = field(default="page", compare=False)
+    meta: Dict[str, Any] = field(default_factory=dict, compare=False)
+    retries: int = field(default=0, compare=False)
+
+    @property
+    def host(self) -> str:
+        return urlparse(self.url).netloc.lower()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"priority": self.priority, "url": self.url, "kind": self.kind, "meta": self.meta, "retries": self.retries}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CrawlRequest":
+        return cls(data["priority"], url=data["url"], kind=data["kind"], meta=data["meta"], retries=data["retries"])
+
+
+@dataclass
+class HostState:
+    host: str
+    scheme: str
+    delay: float
+    max_active: int
+    queue: List[CrawlRequest] = field(default_factory=list)
+    active: int = 0
+    next_at: float = 0.0
+    robots: Optional[RobotFileParser] = None
+    robots_loaded: bool = False
+    session: requests.Session = field(default_factory=requests.Session)
+
+    def ready(self, now: float) -> bool:
+        return self.robots_loaded and bool(self.queue) and self.active < self.max_active and self.next_at <= now
+
+
+def parse_crawl_delay(lines: Iterable[str], user_agent: str) -> Optional[float]:
+    """
+    Crawl-delay z robots.txt (także ułamkowe — RobotFileParser akceptuje tylko liczby całkowite).
+    Grupa, której nazwa agenta występuje w naszym User-Agent, ma pierwszeństwo przed "*".
+    """
+    ua = user_agent.lower()
+    delays: Dict[str, float] = {}
+    agents: List[str] = []
+    in_rules = False
+    for line in lines:
+        line = line.split("#", 1)[0]
+        m = USER_AGENT_RE.match(line)
+        if m:
+            if in_rules:
+                agents = []
+                in_rules = False
+            agents.append(m.group(1).lower())
+            continue
+        if not line.strip():
+            continue
+        in_rules = True
+        m = CRAWL_DELAY_RE.match(line)
+        if m:
+            for agent in agents:
+                delays.setdefault(agent, float(m.group(1)))
+    for agent, delay in delays.items():
+        if agent != "*" and agent in ua:
+            return delay
+    return delays.get("*")
+
+
+def _fsync(f: IO) -> None:
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class CrawlCheckpoint:
+    """
+    Stan crawla w katalogu state_dir:
+    - visited.log — URL-e pobrane pomyślnie (po jednym na linię, dopisywane na bieżąco),
+    - state.json  — frontier, rozmiary visited.log i plików wyjściowych, statystyki.
+    """
+
+    def __init__(self, state_dir: Path, interval_s: float = 30.0, every_n: int = 100):
+        self.dir = Path(state_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.dir / "state.json"
+        self.visited_path = self.dir / "visited.log"
+        self.interval_s = interval_s
+        self.every_n = every_n
+        self.files: Dict[str, IO] = {}
+        self.file_sizes: Dict[str, int] = {}
+        self._visited: Optional[IO] = None
+        self._since = 0
+        self._last = time.monotonic()
+
+    def reset(self) -> None:
+        for path in (self.state_path, self.visited_path):
+            if path.exists():
+                path.unlink()
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Przywraca spójny stan z ostatniego checkpointu; None gdy brak."""
+        if not self.state_path.exists():
+            return None
+        state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        for path, size in state["files"].items():
+            p = Path(path)
+            if p.exists() and p.stat().st_size > size:
+                with p.open("r+b") as f:
+                    f.truncate(size)
+        self.file_sizes.update(state["files"])
+        if self.visited_path.exists():
+            with self.visited_path.open("r+b") as f:
+                f.truncate(state["visited_size"])
+        return state
+
+    def iter_visited(self) -> Iterable[str]:
+        if not self.visited_path.exists():
+            return
+        with self.visited_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                url = line.rstrip("\n")
+                if url:
+                    yield url
+
+    def register_file(self, f: IO) -> None:
+        """Plik wyjściowy (otwarty w trybie 'a'); rozmiar startowy trafia od razu do stanu."""
+        path = str(Path(f.name).resolve())
+        self.files[path] = f
+        if path not in self.file_sizes:
+            f.flush()
+            self.file_sizes[path] = os.fstat(f.fileno()).st_size
+
+    def mark_visited(self, url: str) -> None:
+        if self._visited is None:
+            self._visited = self.visited_path.open("a", encoding="utf-8")
+        self._visited.write(url + "\n")
+        self._since += 1
+
+    def due(self) -> bool:
+        return self._since >= self.every_n or time.monotonic() - self._last >= self.interval_s
+
+    def save(self, frontier: List[CrawlRequest], stats: Dict[str, int]) -> None:
+        # Kolejność: dane -> log odwiedzonych -> stan (rename). Stan nigdy nie wskazuje
+        # na dane, których nie ma na dysku.
+        for path, f in self.files.items():
+            _fsync(f)
+            self.file_sizes[path] = os.fstat(f.fileno()).st_size
+        visited_size = 0
+        if self._visited is not None:
+            _fsync(self._visited)
+        if self.visited_path.exists():
+            visited_size = self.visited_path.stat().st_size
+        state = {
+            "updated_at": time.time(),
+            "visited_size": visited_size,
+            "files": self.file_sizes,
+            "frontier": [req.to_dict() for req in frontier],
+            "stats": stats,
+        }
+        tmp = self.state_path.with_suffix(".json.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+            _fsync(f)
+        os.replace(tmp, self.state_path)
+        self._since = 0
+        self._last = time.monotonic()
+
+    def close(self) -> None:
+        if self._visited is not None:
+            self._visited.close()
+            self._visited = None
+
+
+class Crawler:
+    def __init__(
+        self,
+        handlers: Dict[str, Handler],
+        on_record: Callable[[Dict[str, Any]], None],
+        user_agent: str = DEFAULT_USER_AGENT,
+        default_delay: float = 1.0,
+        max_per_host: int = 2,
+        max_concurrency: int = 16,
+        timeout: float = 15.0,
+        max_retries: int = 2,
+        host_delays: Optional[Dict[str, float]] = None,
+        checkpoint: Optional[CrawlCheckpoint] = None,
+        url_store: Optional[UrlStore] = None,
+        store_kinds: Iterable[str] = (),
+        http_cache: Optional[HttpCache] = None,
+    ):
+        self.handlers = handlers
+        self.on_record = on_record
+        self.user_agent = user_agent
+        self.default_delay = default_delay
+        self.max_per_host = max_per_host
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.host_delays = host_delays or {}
+        self.checkpoint = checkpoint
+        self.url_store = url_store
+        self.store_kinds = set(store_kinds)
+        self.http_cache = http_cache
+        self.hosts: Dict[str, HostState] = {}
+        self.seen = ScalableBloomFilter(error_rate=SEEN_ERROR_RATE)
+        self.inflight: Dict[int, CrawlRequest] = {}
+        self.failed: List[CrawlRequest] = []  # nieudane: tylko w checkpoincie, do ponowienia po wznowieniu
+        self.stats = {"fetched": 0, "errors": 0, "disallowed": 0, "records": 0, "known": 0}
+
+    # --- frontier -------------------------------------------------------------
+
+    def add(self, req: CrawlRequest, force: bool = False) -> bool:
+        """
+        Dodaje URL do frontiera (raz na URL); False gdy już widziany lub znany z url_store.
+        force: pomija seen (seedy/listingi pobrane w przerwanym przebiegu), ale nie dubluje
+        żądania, które już czeka we frontierze.
+        """
+        key = canonicalize_url(req.url)
+        if force:
+            if any(canonicalize_url(pending.url) == key for pending in self.frontier()):
+                return False
+        elif key in self.seen:
+            return False
+        self.seen.add(key)
+        if self._stored(req) and req.url in self.url_store:
+            self.stats["known"] += 1
+            return False
+        self._push(req)
+        return True
+
+    def _push(self, req: CrawlRequest) -> None:
+        host = req.host
+        state = self.hosts.get(host)
+        if state is None:
+            state = HostState(
+                host=host,
+                scheme=urlparse(req.url).scheme or "https",
+                delay=self.host_delays.get(host, self.default_delay),
+                max_active=self.max_per_host,
+            )
+            state.session.headers.update({"User-Agent": self.user_agent, **DEFAULT_HEADERS})
+            self.hosts[host] = state
+        heapq.heappush(state.queue, req)
+
+    def _stored(self, req: CrawlRequest) -> bool:
+        return self.url_store is not None and req.kind in self.store_kinds
+
+    def _has_work(self) -> bool:
+        return any(state.queue for state in self.hosts.values())
+
+    def frontier(self) -> List[CrawlRequest]:
+        """Wszystkie niezakończone żądania: kolejki hostów, żądania w locie i nieudane."""
+        pending = list(self.inflight.values()) + self.failed
+        for state in self.hosts.values():
+            pending.extend(state.queue)
+        return sorted(pending)
+
+    def restore(self) -> bool:
+        """Wznawia z checkpointu: pobrane => seen, zapisany frontier => kolejki."""
+        if self.checkpoint is None:
+            return False
+        state = self.checkpoint.load()
+        if state is None:
+            return False
+        if not state["frontier"]:
+            # Zakończony crawl (checkpoint sprzed automatycznego czyszczenia) — od nowa
+            self.checkpoint.reset()
+            return False
+        for url in self.checkpoint.iter_visited():
+            self.seen.add(canonicalize_url(url))
+        for data in state["frontier"]:
+            self.add(CrawlRequest.from_dict(data))
+        logger.info(f"Wznowienie: {len(self.seen)} URL-i znanych, {len(state['frontier'])} w frontierze")
+        return True
+
+    def _done(self, req: CrawlRequest, ok: bool) -> None:
+        self.inflight.pop(req.seq, None)
+        if not ok:
+            # W tym uruchomieniu bez kolejnych prób; po wznowieniu — od nowa z pełną pulą ponowień
+            req.retries = 0
+            self.failed.append(req)
+            return
+        if self.checkpoint is not None:
+            self.checkpoint.mark_visited(req.url)
+        if self._stored(req):
+            self.url_store.add(req.url, req.kind)
+
+    def _save(self) -> None:
+        # Magazyn URL-i po stanie crawla: awaria pomiędzy => ponowne pobranie, nie utrata
+        if self.checkpoint is not None:
+            self.checkpoint.save(self.frontier(), self.stats)
+        if self.url_store is not None:
+            self.url_store.commit()
+
+    def _get(self, state: HostState, url: str) -> requests.Response:
+        if self.http_cache is not None:
+            return self.http_cache.get(url, session=state.session, timeout=self.timeout)
+        return state.session.get(url, timeout=self.timeout)
+
+    # --- robots.txt -----------------------------------------------------------
+
+    def _load_robots(self, state: HostState) -> None:
+        robots_url = f"{state.scheme}://{state.host}/robots.txt"
+        rp = RobotFileParser()
+        lines: List[str] = []
+        try:
+            resp = self._get(state, robots_url)
+            if resp.status_code >= 400:
+                rp.allow_all = True
+            else:
+                lines = resp.text.splitlines()
+                rp.parse(lines)
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"robots.txt niedostępny dla {state.host}: {e}")
+            rp.allow_all = True
+        state.robots = rp
+        crawl_delay = parse_crawl_delay(lines, self.user_agent)
+        rate = rp.request_rate(self.user_agent)
+        if crawl_delay is not None:
+            state.delay = float(crawl_delay)
+        elif rate is not None and rate.requests:
+            state.delay = rate.seconds / rate.requests
+        logger.info(f"[{state.host}] opóźnienie {state.delay:.2f}s, max równolegle {state.max_active}")
+
+    # --- pobieranie -----------------------------------------------------------
+
+    @staticmethod
+    def _retry_after(resp: requests.Response, fallback: float) -> float:
+        value = resp.headers.get("Retry-After")
+        if not value:
+            return fallback
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return fallback
+
+    def _fetch_and_handle(self, state: HostState, req: CrawlRequest) -> List[Any]:
+        """Wykonywane w wątku: GET + handler. Zwraca listę wyników handlera."""
+        resp = self._get(state, req.url)
+        if resp.status_code in RETRY_STATUSES and req.retries < self.max_retries:
+            wait_s = self._retry_after(resp, fallback=max(state.delay, 1.0) * 2 ** (req.retries + 1))
+            return [("retry", wait_s)]
+        resp.raise_for_status()
+        if resp.encoding and resp.encoding.lower() in ("iso-8859-1", "windows-1252"):
+            resp.encoding = "utf-8"
+        handler = self.handlers[req.kind]
+        return list(handler(req, resp) or [])
+
+    async def _process(self, state: HostState, req: CrawlRequest) -> None:
+        loop = asyncio.get_running_loop()
+        retry = False
+        ok = False
+        try:
+            results = await asyncio.to_thread(self._fetch_and_handle, state, req)
+            self.stats["fetched"] += 1
+            for item in results:
+                if isinstance(item, tuple) and item and item[0] == "retry":
+                    state.next_at = max(state.next_at, loop.time() + item[1])
+                    retry = True
+                elif isinstance(item, CrawlRequest):
+                    self.add(item)
+                elif isinstance(item, dict):
+                    self.on_record(item)
+                    self.stats["records"] += 1
+            ok = not retry
+        except Exception as e:  # noqa: BLE001
+            self.stats["errors"] += 1
+            logger.error(f"Błąd pobierania {req.url}: {e}")
+        finally:
+            state.active -= 1
+        if retry:
+            self.inflight.pop(req.seq, None)
+            req.retries += 1
+            self._push(req)
+        else:
+            self._done(req, ok)
+
+    async def _robots_task(self, state: HostState) -> None:
+        await asyncio.to_thread(self._load_robots, state)
+        state.robots_loaded = True
+
+    async def run(self) -> Dict[str, int]:
+        pending: Set[asyncio.Task] = set()
+        try:
+            await self._run(pending)
+        finally:
+            for task in pending:
+                task.cancel()
+            self._save()
+            if self.checkpoint is not None:
+                self.checkpoint.close()
+                if not self.frontier():
+                    # Wszystko pobrane: nic do wznowienia, a stary seen blokowałby seedy
+                    self.checkpoint.reset()
+            for state in self.hosts.values():
+                state.session.close()
+        return self.stats
+
+    async def _run(self, pending: Set[asyncio.Task]) -> None:
+        loop = asyncio.get_running_loop()
+        robots_started: Set[str] = set()
+        while True:
+            now = loop.time()
+            for host, state in self.hosts.items():
+                if host not in robots_started:
+                    robots_started.add(host)
+                    pending.add(asyncio.create_task(self._robots_task(state)))
+            # Hosty gotowe do żądania, w kolejności priorytetu ich najlepszego URL-a
+            ready = sorted((s for s in self.hosts.values() if s.ready(now)), key=lambda s: s.queue[0])
+            for state in ready:
+                while state.ready(now) and len(pending) < self.max_concurrency:
+                    req = heapq.heappop(state.queue)
+                    if state.robots is not None and not state.robots.can_fetch(self.user_agent, req.url):
+                        self.stats["disallowed"] += 1
+                        logger.info(f"robots.txt blokuje {req.url}")
+                        continue
+                    state.active += 1
+                    state.next_at = now + state.delay
+                    self.inflight[req.seq] = req
+                    pending.add(asyncio.create_task(self._process(state, req)))
+
+            if not pending:
+                if not self._has_work():
+                    break
+            waits = [
+                s.next_at - now
+                for s in self.hosts.values()
+                if s.robots_loaded and s.queue and s.active < s.max_active
+            ]
+            timeout = max(0.0, min(waits)) if waits else None
+            if pending:
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+            elif timeout:
+                await asyncio.sleep(timeout)
+            if self.checkpoint is not None and self.checkpoint.due():
+                self._save()
+
+
+def run_crawler(crawler: Crawler, seeds: Iterable[CrawlRequest]) -> Dict[str, int]:
+    """Wznawia z checkpointu (jeśli jest), dokłada seedy (zawsze, także już pobrane) i uruchamia crawl."""
+    crawler.restore()
+    for req in seeds:
+        crawler.add(req, force=True)
+    try:
+        return asyncio.run(crawler.run())
+    except KeyboardInterrupt:
+        logger.warning("Przerwano — stan zapisany w checkpoincie, uruchom ponownie aby wznowić")
+        return crawler.stats
@@ -0,0 +1,276 @@
+"""
+Profile ekstrakcji per serwis (zamiast kaskad selektorów BeautifulSoup):
+- Profil = XPath elementu postu + XPath pól (tytuł, autor, treść, data, link) względem
+  elementu + XPath linków listingu (np. blogi w kategorii Salon24).
+- Profil jest uczony raz (scraping_analysis.analyze_page_structure -> learn_profile):
+  z listy kandydatów wybierany jest ten, który na przykładowej stronie daje najlepsze trafienia
+  (elementy zagnieżdżone w innym trafieniu, np. .post-title w .post, nie są liczone osobno).
+- Zapis: config/extraction_profiles.json; przy użyciu XPath są kompilowane raz (lxml.etree.XPath),
+  a strona jest parsowana raz do drzewa lxml — zamiast kilkudziesięciu zapytań soupsieve.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urljoin, urlparse
+
+from lxml import etree, html as lxml_html
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILES_PATH = ROOT / "config" / "extraction_profiles.json"
+
+
+def _cls(name: str) -> str:
+    """XPath odpowiednik CSS .name"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Kandydaci: (selektor CSS dla czytelności raportu, XPath)
+ITEM_CANDIDATES: List[Tuple[str, str]] = [
+    ("article", "//article"),
+    (".post", f"//*[{_cls('post')}]"),
+    (".blog-post", f"//*[{_cls('blog-post')}]"),
+    (".entry", f"//*[{_cls('entry')}]"),
+    (".article", f"//*[{_cls('article')}]"),
+    ('[class*="post"]', "//*[contains(@class, 'post')]"),
+    (".tile", f"//*[{_cls('tile')}]"),
+]
+TITLE_CANDIDATES: List[Tuple[str, str]] = [
+    ("h1", ".//h1"),
+    ("h2", ".//h2"),
+    ("h3", ".//h3"),
+    (".title", f".//*[{_cls('title')}]"),
+    ('[class*="title"]', ".//*[contains(@class, 'title')]"),
+    ("a", ".//a"),
+]
+AUTHOR_CANDIDATES: List[Tuple[str, str]] = [
+    (".author", f".//*[{_cls('author')}]"),
+    (".by", f".//*[{_cls('by')}]"),
+    ('[class*="author"]', ".//*[contains(@class, 'author')]"),
+    (".username", f".//*[{_cls('username')}]"),
+]
+CONTENT_CANDIDATES: List[Tuple[str, str]] = [
+    (".content", f".//*[{_cls('content')}]"),
+    (".post-content", f".//*[{_cls('post-content')}]"),
+    (".entry-content", f".//*[{_cls('entry-content')}]"),
+    ("p", ".//p"),
+]
+DATE_CANDIDATES: List[Tuple[str, str]] = [
+    ("time[datetime]", ".//time/@datetime"),
+    ("time", ".//time"),
+    (".date", f".//*[{_cls('date')}]"),
+    (".published", f".//*[{_cls('published')}]"),
+    ('[class*="date"]', ".//*[contains(@class, 'date')]"),
+]
+LINK_CANDIDATES: List[Tuple[str, str]] = [
+    ('a[href*="/u/"], a[href*="/blog/"]', "//a[contains(@href, '/u/') or contains(@href, '/blog/')]"),
+    (".blog-title a", f"//*[{_cls('blog-title')}]//a[@href]"),
+    ("article a", "//article//a[@href]"),
+    ("h2 a", "//h2//a[@href]"),
+    ("h3 a", "//h3//a[@href]"),
+]
+
+MIN_TITLE = 10
+MIN_PARAGRAPH = 20
+MIN_CONTENT = 100
+MIN_LINK_TEXT = 3
+
+
+@dataclass
+class ExtractionProfile:
+    site: str
+    item: Optional[str] = None
+    title: Optional[str] = None
+    author: Optional[str] = None
+    content: Optional[str] = None
+    date: Optional[str] = None
+    link: str = ".//a/@href"
+    links: Optional[str] = None
+    learned_from: List[str] = field(default_factory=list)
+    learned_at: Optional[str] = None
+    _compiled: Dict[str, etree.XPath] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.init}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExtractionProfile":
+        return cls(**{k: v for k, v in data.items() if not k.startswith("_")})
+
+    def _xpath(self, name: str) -> Optional[etree.XPath]:
+        expr = getattr(self, name)
+        if not expr:
+            return None
+        compiled = self._compiled.get(name)
+        if compiled is None:
+            compiled = self._compiled[name] = etree.XPath(expr)
+        return compiled
+
+    @staticmethod
+    def parse(content: bytes, base_url: str) -> etree._Element:
+        return lxml_html.fromstring(content, base_url=base_url)
+
+    def extract_items(self, content: bytes, base_url: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Posty ze strony: jedno parsowanie, skompilowane XPath per pole; limit — po odfiltrowaniu."""
+        item_xp = self._xpath("item")
+        if item_xp is None:
+            return []
+        tree = self.parse(content, base_url)
+        items: List[Dict[str, Any]] = []
+        for element in _outermost(item_xp(tree)):
+            if limit is not None and len(items) >= limit:
+                break
+            title = _first_text(self._xpath("title"), element, MIN_TITLE)
+            if not title:
+                continue
+            parts = [t for t in _texts(self._xpath("content"), element) if len(t) > MIN_PARAGRAPH]
+            content_text = " ".join(parts) or _norm(element.text_content())
+            href = _first_text(self._xpath("link"), element)
+            items.append({
+                "title": title,
+                "author": _first_text(self._xpath("author"), element),
+                "content": content_text,
+                "url": urljoin(base_url, href) if href else base_url,
+                "published_date": _first_text(self._xpath("date"), element) or None,
+            })
+        return items
+
+    def extract_links(self, content: bytes, base_url: str) -> List[Dict[str, str]]:
+        """Linki listingu (unikalne, z tekstem > MIN_LINK_TEXT)."""
+        links_xp = self._xpath("links")
+        if links_xp is None:
+            return []
+        tree = self.parse(content, base_url)
+        seen = set()
+        links = []
+        for a in links_xp(tree):
+            url = urljoin(base_url, a.get("href", "")).split("#")[0]
+            text = _norm(a.text_content())
+            if url in seen or len(text) <= MIN_LINK_TEXT:
+                continue
+            seen.add(url)
+            links.append({"url": url, "text": text})
+        return links
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _outermost(elements: Sequence[etree._Element]) -> List[etree._Element]:
+    """Trafienia bez zagnieżdżonych w innym trafieniu (jeden post = jeden element)."""
+    matched = set(elements)
+    return [el for el in elements if not any(a in matched for a in el.iterancestors())]
+
+
+def _texts(xp: Optional[etree.XPath], element: etree._Element) -> List[str]:
+    if xp is None:
+        return []
+    out = []
+    for node in xp(element):
+        text = _norm(node if isinstance(node, str) else node.text_content())
+        if text:
+            out.append(text)
+    return out
+
+
+def _first_text(xp: Optional[etree.XPath], element: etree._Element, min_len: int = 1) -> str:
+    """Pierwszy tekst >= min_len; gdy żaden nie spełnia warunku — pierwszy niepusty."""
+    texts = _texts(xp, element)
+    for text in texts:
+        if len(text) >= min_len:
+            return text
+    return texts[0] if texts else ""
+
+
+# --- uczenie profilu -------------------------------------------------------------
+
+
+def _best_field(
+    elements: Sequence[etree._Element],
+    candidates: List[Tuple[str, str]],
+    ok: Callable[[List[str]], bool],
+) -> Optional[str]:
+    """Kandydat z najwyższym odsetkiem elementów spełniających warunek (remis => kolejność listy)."""
+    best: Tuple[float, Optional[str]] = (0.0, None)
+    for _, expr in candidates:
+        xp = etree.XPath(expr)
+        hits = sum(1 for el in elements if ok(_texts(xp, el)))
+        score = hits / len(elements)
+        if score > best[0]:
+            best = (score, expr)
+    return best[1]
+
+
+def learn_profile(content: bytes, base_url: str, site: str, sample: int = 10) -> ExtractionProfile:
+    """Uczy profil z jednej strony: najliczniejszy sensowny element postu (bez zagnieżdżonych) + najlepsze pola."""
+    tree = ExtractionProfile.parse(content, base_url)
+    profile = ExtractionProfile(site=site, learned_from=[base_url])
+    profile.learned_at = datetime.now(timezone.utc).isoformat()
+
+    best_items: List[etree._Element] = []
+    for _, expr in ITEM_CANDIDATES:
+        elements = [el for el in _outermost(tree.xpath(expr)) if len(_norm(el.text_content())) > MIN_CONTENT]
+        # Tylko zewnętrzne elementy z treścią; wygrywa kandydat z największą liczbą trafień
+        if len(elements) > len(best_items):
+            best_items = elements
+            profile.item = expr
+    if best_items:
+        sample_items = best_items[:sample]
+        profile.title = _best_field(sample_items, TITLE_CANDIDATES, lambda t: any(len(x) >= MIN_TITLE for x in t))
+        profile.author = _best_field(sample_items, AUTHOR_CANDIDATES, lambda t: bool(t))
+        profile.content = _best_field(
+            sample_items, CONTENT_CANDIDATES,
+            lambda t: sum(len(x) for x in t if len(x) > MIN_PARAGRAPH) > MIN_CONTENT,
+        )
+        profile.date = _best_field(sample_items, DATE_CANDIDATES, lambda t: bool(t))
+
+    host = urlparse(base_url).netloc
+    best_links = 0
+    for _, expr in LINK_CANDIDATES:
+        urls = {
+            urljoin(base_url, a.get("href", "")).split("#")[0]
+            for a in tree.xpath(expr)
+            if len(_norm(a.text_content())) > MIN_LINK_TEXT
+            and urlparse(urljoin(base_url, a.get("href", ""))).netloc == host
+        }
+        if len(urls) > best_links:
+            best_links = len(urls)
+            profile.links = expr
+    return profile
+
+
+def merge_profiles(profiles: Sequence[ExtractionProfile]) -> Optional[ExtractionProfile]:
+    """Łączy profile stron jednego serwisu: pole z pierwszego profilu, który je ma."""
+    if not profiles:
+        return None
+    merged = ExtractionProfile(site=profiles[0].site, learned_at=profiles[0].learned_at)
+    for name in ("item", "title", "author", "content", "date", "links"):
+        setattr(merged, name, next((getattr(p, name) for p in profiles if getattr(p, name)), None))
+    merged.learned_from = [url for p in profiles for url in p.learned_from]
+    return merged
+
+
+# --- przechowywanie ---------------------------------------------------------------
+
+
+def load_profiles(path: Path = PROFILES_PATH) -> Dict[str, ExtractionProfile]:
+    if not path.exists():
+        return {}
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return {site: ExtractionProfile.from_dict(p) for site, p in data.items()}
+
+
+def save_profiles(profiles: Dict[str, ExtractionProfile], path: Path = PROFILES_PATH) -> None:
+    """Nadpisuje/dodaje profile podanych serwisów, zachowując pozostałe."""
+    data: Dict[str, Any] = {}
+    if path.exists():
+        data = json.loads(path.read_text(encoding="utf-8"))
+    data.update({site: p.to_dict() for site, p in profiles.items()})
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
@@ -0,0 +1,294 @@
+"""
+Dyskowy cache odpowiedzi HTTP dla scraperów i narzędzi analizy (scraping_analysis,
+Salon24Scraper.get_page i crawl przez ingest/crawler.py, verify_feeds, scripts/test_*):
+- data/http_cache/<sha256[:2]>/<sha256>.json (metadane) + .body (treść); klucz = metoda + URL.
+- Tryb "normal": świeży wpis (Cache-Control max-age / Expires / heurystyka z Last-Modified,
+  co najmniej min_ttl_s) jest zwracany bez sieci; nieświeży — rewalidowany warunkowo
+  (If-None-Match / If-Modified-Since), 304 odświeża metadane bez pobierania treści.
+  no-cache / no-store => zawsze rewalidacja (wpis zostaje tylko na potrzeby trybu offline).
+- Tryb "offline": odtwarzanie z cache bez względu na świeżość; brak wpisu => CacheMiss.
+  Z --cache-dir wskazującym zamrożoną kopię (freeze) ekstrakcja jest porównywalna
+  między wersjami na identycznym wejściu.
+- Tryb "off": bez cache.
+
+Konfiguracja: config.yaml, sekcja `http_cache`; tryb nadpisuje zmienna SATYRAI_HTTP_CACHE.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from email.utils import parsedate_tz, mktime_tz
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+import yaml
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+ROOT = Path(__file__).resolve().parents[1]
+CONFIG = ROOT / "config" / "config.yaml"
+HTTP_CACHE_DIR = ROOT / "data" / "http_cache"
+MODE_ENV = "SATYRAI_HTTP_CACHE"
+MODES = ("normal", "offline", "off")
+
+CACHEABLE_STATUSES = (200, 203, 300, 301, 404, 410)
+# Nagłówki aktualizowane przez 304 Not Modified
+REVALIDATION_HEADERS = ("Cache-Control", "Date", "Expires", "ETag", "Last-Modified", "Age", "Vary")
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX_S = 24 * 3600
+
+
+class CacheMiss(requests.RequestException):
+    """Tryb offline: brak wpisu w cache."""
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    try:
+        return float(mktime_tz(parsed))
+    except (OverflowError, ValueError):
+        return None
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers: Dict[str, str], stored_at: float) -> float:
+    """Czas świeżości odpowiedzi (s) wg RFC 9111: max-age > Expires > heurystyka Last-Modified."""
+    cc = parse_cache_control(headers.get("Cache-Control"))
+    if "no-cache" in cc or "no-store" in cc:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if cc.get(name):
+            try:
+                return float(cc[name])
+            except ValueError:
+                return 0.0
+    date = _http_date(headers.get("Date")) or stored_at
+    expires = headers.get("Expires")
+    if expires is not None:
+        expires_at = _http_date(expires)
+        return max(0.0, expires_at - date) if expires_at is not None else 0.0
+    last_modified = _http_date(headers.get("Last-Modified"))
+    if last_modified is not None:
+        return min(HEURISTIC_MAX_S, max(0.0, (date - last_modified) * HEURISTIC_FRACTION))
+    return 0.0
+
+
+class HttpCache:
+    def __init__(self, root: Path = HTTP_CACHE_DIR, mode: str = "normal", min_ttl_s: float = 0.0):
+        if mode not in MODES:
+            raise ValueError(f"http_cache: nieznany tryb {mode!r} (dozwolone: {', '.join(MODES)})")
+        self.root = Path(root)
+        self.mode = mode
+        self.min_ttl_s = min_ttl_s
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "network": 0}
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, mode: Optional[str] = None, root: Optional[Path] = None) -> "HttpCache":
+        cfg: Dict[str, Any] = {}
+        if CONFIG.exists():
+            cfg = (yaml.safe_load(CONFIG.read_text(encoding="utf-8")) or {}).get("http_cache", {})
+        if root is None:
+            root = ROOT / cfg["dir"] if cfg.get("dir") else HTTP_CACHE_DIR
+        mode = mode or os.environ.get(MODE_ENV) or cfg.get("mode", "normal")
+        return cls(root=Path(root), mode=mode, min_ttl_s=float(cfg.get("min_ttl_s", 0)))
+
+    # --- przechowywanie -------------------------------------------------------
+
+    def _paths(self, method: str, url: str):
+        digest = hashlib.sha256(f"{method} {url}".encode("utf-8")).hexdigest()
+        base = self.root / digest[:2] / digest
+        return base.with_suffix(".json"), base.with_suffix(".body")
+
+    def _load(self, method: str, url: str) -> Optional[Dict[str, Any]]:
+        meta_path, body_path = self._paths(method, url)
+        if not meta_path.exists() or not body_path.exists():
+            return None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except ValueError:
+            return None
+        meta["_body_path"] = body_path
+        return meta
+
+    def _write_meta(self, meta_path: Path, meta: Dict[str, Any]) -> None:
+        tmp = meta_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({k: v for k, v in meta.items() if not k.startswith("_")}), encoding="utf-8")
+        os.replace(tmp, meta_path)
+
+    def _store(self, method: str, url: str, resp: requests.Response) -> None:
+        meta_path, body_path = self._paths(method, url)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        # Treść przed metadanymi: metadane nigdy nie wskazują na niepełny plik
+        tmp = body_path.with_suffix(".body.tmp")
+        tmp.write_bytes(resp.content if method != "HEAD" else b"")
+        os.replace(tmp, body_path)
+        self._write_meta(meta_path, {
+            "url": url,
+            "final_url": resp.url,
+            "method": method,
+            "status": resp.status_code,
+            "reason": resp.reason,
+            "headers": dict(resp.headers),
+            "stored_at": time.time(),
+        })
+
+    def _revalidated(self, method: str, url: str, meta: Dict[str, Any], resp: requests.Response) -> None:
+        stored = CaseInsensitiveDict(meta["headers"])
+        for name in REVALIDATION_HEADERS:
+            if name in resp.headers:
+                stored[name] = resp.headers[name]
+        meta["headers"] = dict(stored)
+        meta["stored_at"] = time.time()
+        self._write_meta(self._paths(method, url)[0], meta)
+
+    @staticmethod
+    def _response(meta: Dict[str, Any], method: str) -> requests.Response:
+        resp = requests.Response()
+        resp.status_code = meta["status"]
+        resp.reason = meta.get("reason") or ""
+        resp.url = meta["final_url"]
+        resp.headers = CaseInsensitiveDict(meta["headers"])
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp._content = b"" if method == "HEAD" else meta["_body_path"].read_bytes()
+        resp.from_cache = True  # type: ignore[attr-defined]
+        return resp
+
+    def is_fresh(self, meta: Dict[str, Any], now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        headers = CaseInsensitiveDict(meta["headers"])
+        lifetime = freshness_lifetime(headers, meta["stored_at"])
+        cc = parse_cache_control(headers.get("Cache-Control"))
+        if "no-store" not in cc and "no-cache" not in cc:
+            lifetime = max(lifetime, self.min_ttl_s)
+        try:
+            age = float(headers.get("Age") or 0)
+        except ValueError:
+            age = 0.0
+        return age + (now - meta["stored_at"]) < lifetime
+
+    # --- API ------------------------------------------------------------------
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        session: Optional[requests.Session] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10.0,
+        delay: float = 0.0,
+    ) -> requests.Response:
+        """
+        Odpowiedź z cache lub z sieci (zapisywana do cache). delay (s) — odczekiwane tylko
+        przed rzeczywistym żądaniem sieciowym, więc trafienia w cache nie spowalniają analizy.
+        """
+        method = method.upper()
+        url = url.split("#")[0]
+        http = session or requests
+        if self.mode == "off":
+            self.stats["network"] += 1
+            if delay > 0:
+                time.sleep(delay)
+            return http.request(method, url, headers=headers, timeout=timeout)
+
+        meta = self._load(method, url)
+        if meta is None and method == "HEAD":
+            meta = self._load("GET", url)  # wpis GET odpowiada też na HEAD
+        if meta is not None and (self.mode == "offline" or self.is_fresh(meta)):
+            self.stats["hits"] += 1
+            return self._response(meta, method)
+        if self.mode == "offline":
+            self.stats["misses"] += 1
+            raise CacheMiss(f"brak w cache (offline): {method} {url}")
+
+        conditional = dict(headers or {})
+        if meta is not None and meta["method"] == method:
+            stored = CaseInsensitiveDict(meta["headers"])
+            etag = stored.get("ETag")
+            last_modified = stored.get("Last-Modified")
+            if etag:
+                conditional["If-None-Match"] = etag
+            if last_modified:
+                conditional["If-Modified-Since"] = last_modified
+        if delay > 0:
+            time.sleep(delay)
+        self.stats["network"] += 1
+        resp = http.request(method, url, headers=conditional, timeout=timeout, allow_redirects=True)
+        if resp.status_code == 304 and meta is not None:
+            self.stats["revalidated"] += 1
+            self._revalidated(method, url, meta, resp)
+            return self._response(meta, method)
+        self.stats["misses"] += 1
+        if resp.status_code in CACHEABLE_STATUSES:
+            self._store(method, url, resp)
+        resp.from_cache = False  # type: ignore[attr-defined]
+        return resp
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def freeze(self, dest: Path) -> Path:
+        """Kopia cache jako zamrożony snapshot (do odtwarzania z --cache-dir w trybie offline)."""
+        dest = Path(dest)
+        shutil.copytree(self.root, dest, ignore=shutil.ignore_patterns("*.tmp"), dirs_exist_ok=True)
+        return dest
+
+
+_default: Optional[HttpCache] = None
+
+
+def get_cache() -> HttpCache:
+    """Wspólna instancja procesu (z config.yaml / SATYRAI_HTTP_CACHE)."""
+    global _default
+    if _default is None:
+        _default = HttpCache.from_config()
+    return _default
+
+
+def configure(mode: Optional[str] = None, root: Optional[Path] = None) -> HttpCache:
+    """Ustawia wspólną instancję (np. z flag --offline / --cache-dir skryptu)."""
+    global _default
+    _default = HttpCache.from_config(mode=mode, root=root)
+    return _default
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cache HTTP scraperów")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="Liczba wpisów i rozmiar cache")
+    freeze = sub.add_parser("freeze", help="Zamroź kopię cache (snapshot do trybu offline)")
+    freeze.add_argument("dest")
+    args = parser.parse_args()
+
+    cache = HttpCache.from_config()
+    if args.cmd == "stats":
+        metas = list(cache.root.glob("*/*.json"))
+        size = sum(p.stat().st_size for p in cache.root.glob("*/*.body"))
+        print(f"{cache.root}: {len(metas)} wpisów, {size / 1024**2:.1f} MB")
+    else:
+        print(f"Snapshot: {cache.freeze(Path(args.dest))}")
+
+
+if __name__ == "__main__":
+    main()
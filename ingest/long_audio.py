@@ -0,0 +1,285 @@
+"""
+Transkrypcja długiego audio (tryb long-audio) dla podcastów > 30 min:
+- Dekoduje audio jeden raz do 16 kHz mono PCM (ffmpeg, s16le).
+- Usuwa ciszę i muzykę detektorem mowy (webrtcvad jeśli zainstalowany, inaczej próg energii).
+- Dzieli mowę w pauzach na fragmenty o ograniczonej długości.
+- Transkrybuje fragmenty Whisperem w puli procesów CPU i skleja znaczniki czasu
+  z powrotem do osi czasu oryginalnego nagrania.
+
+Wymagania: numpy, ffmpeg, openai-whisper; opcjonalnie webrtcvad (lepsze odrzucanie muzyki).
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+FRAME_LEN = SAMPLE_RATE * FRAME_MS // 1000
+
+# Stan procesu roboczego (model ładowany raz na proces, nie na fragment)
+_WORKER_MODEL: Any = None
+_WORKER_LANGUAGE: Optional[str] = None
+
+
+@dataclass
+class Chunk:
+    """Fragment do transkrypcji: sklejone zakresy próbek z oryginalnego nagrania."""
+    pieces: List[Tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def num_samples(self) -> int:
+        return sum(end - start for start, end in self.pieces)
+
+    def to_source_time(self, t: float) -> float:
+        """Mapuje czas lokalny fragmentu (s) na czas w oryginalnym nagraniu (s)."""
+        pos = max(0, int(round(t * SAMPLE_RATE)))
+        for start, end in self.pieces:
+            length = end - start
+            if pos <= length:
+                return (start + pos) / SAMPLE_RATE
+            pos -= length
+        return self.pieces[-1][1] / SAMPLE_RATE if self.pieces else 0.0
+
+
+def decode_audio(audio_path: Path, timeout: int = 600) -> np.ndarray:
+    """
+    Dekoduje dowolny format audio do 16 kHz mono int16 jednym wywołaniem ffmpeg.
+    """
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-threads",
+        "0",
+        "-i",
+        str(audio_path),
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-",
+    ]
+    res = subprocess.run(cmd, capture_output=True, timeout=timeout)
+    if res.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg decode failed: {res.stderr.decode('utf-8', errors='ignore')[-300:]}"
+        )
+    return np.frombuffer(res.stdout, dtype=np.int16)
+
+
+def _frame_energy(pcm: np.ndarray) -> np.ndarray:
+    n_frames = len(pcm) // FRAME_LEN
+    frames = pcm[: n_frames * FRAME_LEN].astype(np.float32).reshape(n_frames, FRAME_LEN)
+    return np.sqrt(np.mean(frames * frames, axis=1) + 1e-9)
+
+
+def speech_frames(pcm: np.ndarray, aggressiveness: int = 2) -> np.ndarray:
+    """
+    Zwraca maskę bool per ramka 30 ms: True gdy ramka zawiera mowę.
+    webrtcvad odrzuca też większość muzyki; fallback energetyczny odrzuca tylko ciszę.
+    """
+    n_frames = len(pcm) // FRAME_LEN
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool)
+    try:
+        import webrtcvad  # type: ignore
+    except Exception:
+        webrtcvad = None
+
+    if webrtcvad is not None:
+        vad = webrtcvad.Vad(aggressiveness)
+        raw = pcm[: n_frames * FRAME_LEN].tobytes()
+        step = FRAME_LEN * 2  # int16 = 2 bajty
+        return np.fromiter(
+            (vad.is_speech(raw[i * step:(i + 1) * step], SAMPLE_RATE) for i in range(n_frames)),
+            dtype=bool,
+            count=n_frames,
+        )
+
+    # Próg adaptacyjny: powyżej poziomu szumu tła (niski percentyl) z marginesem
+    energy = _frame_energy(pcm)
+    noise_floor = np.percentile(energy, 10)
+    threshold = max(noise_floor * 3.0, 100.0)
+    return energy > threshold
+
+
+def speech_regions(
+    flags: np.ndarray,
+    min_speech_ms: int = 250,
+    min_silence_ms: int = 500,
+    pad_ms: int = 150,
+) -> List[Tuple[int, int]]:
+    """
+    Zamienia maskę ramek na zakresy próbek z mową.
+    Krótkie pauzy (< min_silence_ms) są scalane, krótkie wybuchy (< min_speech_ms) odrzucane.
+    """
+    regions: List[Tuple[int, int]] = []
+    if not len(flags):
+        return regions
+    # Granice serii True w masce
+    padded = np.concatenate(([False], flags, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    runs = list(zip(edges[::2], edges[1::2]))
+
+    min_gap = max(1, min_silence_ms // FRAME_MS)
+    merged: List[List[int]] = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < min_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([int(start), int(end)])
+
+    min_len = max(1, min_speech_ms // FRAME_MS)
+    pad = pad_ms // FRAME_MS
+    total = len(flags)
+    for start, end in merged:
+        if end - start < min_len:
+            continue
+        start = max(0, start - pad)
+        end = min(total, end + pad)
+        if regions and start * FRAME_LEN <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end * FRAME_LEN)
+        else:
+            regions.append((start * FRAME_LEN, end * FRAME_LEN))
+    return regions
+
+
+def _split_point(pcm: np.ndarray, start: int, end: int) -> int:
+    """Najcichsza ramka w drugiej połowie okna [start, end) — tam tniemy długą wypowiedź."""
+    lo = start + (end - start) // 2
+    window = pcm[lo:end]
+    energy = _frame_energy(window)
+    if not len(energy):
+        return end
+    return lo + int(np.argmin(energy)) * FRAME_LEN + FRAME_LEN // 2
+
+
+def plan_chunks(
+    pcm: np.ndarray, regions: List[Tuple[int, int]], max_chunk_s: float = 30.0
+) -> List[Chunk]:
+    """
+    Pakuje kolejne zakresy mowy w fragmenty <= max_chunk_s (okno kontekstu Whispera).
+    Zakresy dłuższe niż limit są cięte w najcichszym miejscu.
+    """
+    max_len = int(max_chunk_s * SAMPLE_RATE)
+    pieces: List[Tuple[int, int]] = []
+    for start, end in regions:
+        while end - start > max_len:
+            cut = _split_point(pcm, start, start + max_len)
+            pieces.append((start, cut))
+            start = cut
+        pieces.append((start, end))
+
+    chunks: List[Chunk] = []
+    current = Chunk()
+    for piece in pieces:
+        if current.pieces and current.num_samples + (piece[1] - piece[0]) > max_len:
+            chunks.append(current)
+            current = Chunk()
+        current.pieces.append(piece)
+    if current.pieces:
+        chunks.append(current)
+    return chunks
+
+
+def _init_worker(model_name: str, language: Optional[str], threads: int) -> None:
+    global _WORKER_MODEL, _WORKER_LANGUAGE
+    import torch
+    import whisper  # type: ignore
+
+    torch.set_num_threads(max(1, threads))
+    _WORKER_MODEL = whisper.load_model(model_name, device="cpu")
+    _WORKER_LANGUAGE = language
+
+
+def _transcribe_chunk(job: Tuple[str, List[Tuple[int, int]]]) -> List[Dict[str, Any]]:
+    pcm_path, pieces = job
+    # memmap: worker czyta tylko swoje próbki, bez kopiowania całego nagrania przez pickle
+    pcm = np.load(pcm_path, mmap_mode="r")
+    chunk = Chunk(pieces=list(pieces))
+    audio = np.concatenate([pcm[s:e] for s, e in chunk.pieces]).astype(np.float32) / 32768.0
+    result = _WORKER_MODEL.transcribe(
+        audio,
+        language=_WORKER_LANGUAGE,
+        fp16=False,
+        condition_on_previous_text=False,
+    )
+    segments = []
+    for seg in result.get("segments", []):
+        text = seg.get("text", "").strip()
+        if not text:
+            continue
+        segments.append(
+            {
+                "start": round(chunk.to_source_time(seg["start"]), 3),
+                "end": round(chunk.to_source_time(seg["end"]), 3),
+                "text": text,
+            }
+        )
+    return segments
+
+
+def transcribe_long_audio(
+    audio_path: Path,
+    model_name: str = "small",
+    language: Optional[str] = None,
+    workers: Optional[int] = None,
+    max_chunk_s: float = 30.0,
+    vad_aggressiveness: int = 2,
+    pcm_path: Optional[Path] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Transkrybuje długie nagranie fragmentami w puli procesów CPU.
+    pcm_path: gotowe 16 kHz PCM (.npy, int16) z ingest/audio_cache.py — pomija dekodowanie.
+    Zwraca {"text", "segments": [{"start", "end", "text"}], "language", "speech_seconds",
+    "total_seconds"} lub None gdy nie ma mowy / brak zależności.
+    """
+    try:
+        import whisper  # type: ignore  # noqa: F401
+    except Exception:
+        return None
+
+    if pcm_path is not None:
+        pcm = np.load(pcm_path, mmap_mode="r")
+    else:
+        pcm = decode_audio(audio_path)
+    flags = speech_frames(pcm, aggressiveness=vad_aggressiveness)
+    regions = speech_regions(flags)
+    chunks = plan_chunks(pcm, regions, max_chunk_s=max_chunk_s)
+    if not chunks:
+        return None
+
+    cpu = os.cpu_count() or 1
+    workers = max(1, min(workers or max(1, cpu // 4), len(chunks)))
+    threads = max(1, cpu // workers)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if pcm_path is None:
+            pcm_path = Path(tmpdir) / "pcm16k.npy"
+            np.save(pcm_path, pcm)
+        jobs = [(str(pcm_path), chunk.pieces) for chunk in chunks]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(model_name, language, threads),
+        ) as pool:
+            # map zachowuje kolejność fragmentów => segmenty są już posortowane w czasie
+            per_chunk = list(pool.map(_transcribe_chunk, jobs))
+
+    segments = [seg for chunk_segments in per_chunk for seg in chunk_segments]
+    return {
+        "text": " ".join(seg["text"] for seg in segments).strip(),
+        "segments": segments,
+        "language": language,
+        "speech_seconds": round(sum(c.num_samples for c in chunks) / SAMPLE_RATE, 1),
+        "total_seconds": round(len(pcm) / SAMPLE_RATE, 1),
+    }
@@ -3,12 +3,16 @@ RSS fetcher (draft)
 - Pobiera feedy z docs/whitelist.yaml
 - Respektuje rate limit z config/config.yaml
 - Zapisuje surowe wpisy do data/raw/{slug}.jsonl (per źródło) + zbiorczy rss_raw.jsonl
+- Dopisuje tylko wpisy, których link nie jest znany ze wspólnego magazynu URL-i
+  (ingest/url_store.py, wspólny z crawlerem i fetch_*_sources); wpisy trafiają do magazynu
+  dopiero po zapisaniu rekordów (mark_seen), więc błąd zapisu nie gubi ich na zawsze
 Uwaga: brak parsera licencji — należy użyć license_checker osobno.
 """
 
 from __future__ import annotations
 
 import json
+import sys
 import time
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional
@@ -17,6 +21,10 @@ import feedparser
 import yaml
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ingest.url_store import UrlStore
+
 WHITELIST = ROOT / "docs" / "whitelist.yaml"
 CONFIG = ROOT / "config" / "config.yaml"
 RAW_DIR = ROOT / "data" / "raw"
@@ -62,6 +70,32 @@ def fetch_feed(
             raise last_exc
 
 
+def entry_key(item: Dict[str, Any]) -> Optional[str]:
+    return item.get("link") or item.get("id")
+
+
+def fetch_new_entries(
+    url: str, store: UrlStore, user_agent: Optional[str] = None
+) -> Iterable[Dict[str, Any]]:
+    """Jak fetch_feed, ale tylko wpisy nieznane ze `store` (bez zapamiętywania — zob. mark_seen)."""
+    batch = set()
+    for item in fetch_feed(url, user_agent=user_agent):
+        key = entry_key(item)
+        if key:
+            if key in batch or key in store:
+                continue
+            batch.add(key)
+        yield item
+
+
+def mark_seen(store: UrlStore, items: Iterable[Dict[str, Any]], kind: str = "rss_entry") -> None:
+    """Zapamiętuje zapisane już wpisy w `store` (trwałe po store.commit())."""
+    for item in items:
+        key = entry_key(item)
+        if key:
+            store.add(key, kind)
+
+
 def slugify(name: str) -> str:
     return "".join(c.lower() if c.isalnum() else "-" for c in name).strip("-")
 
@@ -74,7 +108,8 @@ def main(selected: Optional[str] = None) -> None:
 
     whitelist = load_whitelist()
     out_path_all = RAW_DIR / "rss_raw.jsonl"
-    with out_path_all.open("w", encoding="utf-8") as fall:
+    store = UrlStore.from_config()
+    with store, out_path_all.open("a", encoding="utf-8") as fall:
         for src in whitelist:
             name = src.get("name", "")
             if selected and selected.lower() not in name.lower():
@@ -84,10 +119,10 @@ def main(selected: Optional[str] = None) -> None:
                 continue
             rps = src.get("rate_limit_rps", default_rps)
             per_src = RAW_DIR / f"{slugify(name)}.jsonl"
-            count = 0
-            with per_src.open("w", encoding="utf-8") as fs:
+            written: List[Dict[str, Any]] = []
+            with per_src.open("a", encoding="utf-8") as fs:
                 try:
-                    for item in fetch_feed(feed, user_agent=user_agent):
+                    for item in fetch_new_entries(feed, store, user_agent=user_agent):
                         record = {
                             "source": name,
                             "feed": feed,
@@ -98,11 +133,15 @@ def main(selected: Optional[str] = None) -> None:
                         }
                         fs.write(json.dumps(record, ensure_ascii=False) + "\n")
                         fall.write(json.dumps(record, ensure_ascii=False) + "\n")
-                        count += 1
+                        written.append(item)
                 except Exception as exc:
                     print(f"[{name}] błąd pobierania ({exc}); pomijam ten feed")
+            fall.flush()
+            # Tylko wpisy faktycznie dopisane do plików
+            mark_seen(store, written)
+            store.commit()
             rate_limit_sleep(rps)
-            print(f"[{name}] zapisano {count} wpisów -> {per_src}")
+            print(f"[{name}] dopisano {len(written)} nowych wpisów -> {per_src}")
     print(f"Zapisano zbiorczo: {out_path_all}")
 
 
@@ -0,0 +1,187 @@
+"""
+Kolumnowy magazyn segmentów transkrypcji (per wideo), mapowany w pamięci:
+- data/youtube/segments/<video_id>/start.npy, end.npy   (float32, sekundy)
+- offsets.npy (int64, n+1) — offsety bajtowe segmentów w text.bin
+- source.npy  (uint8)      — kod źródła: manual/auto/whisper (SOURCES)
+- text.bin    (UTF-8)      — teksty segmentów sklejone separatorem " "
+- meta.json                — video_id, liczba segmentów, legenda źródeł
+
+Separator jest częścią bufora, więc tekst okna segmentów [i, j) to jeden ciągły
+wycinek text.bin — bez łączenia stringów i bez parsowania JSON.
+
+Wspólny format segmentu (transcript API / napisy / Whisper):
+    {"start": float, "end": float, "text": str}
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from processing.segmenter import pack_windows
+
+ROOT = Path(__file__).resolve().parents[1]
+SEGMENTS_DIR = ROOT / "data" / "youtube" / "segments"
+
+SOURCES = ("manual", "auto", "whisper")
+SEPARATOR = b" "
+
+
+def segments_from_api(data: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """youtube-transcript-api zwraca start+duration; zamieniamy na start/end."""
+    out = []
+    for seg in data:
+        text = (seg.get("text") or "").replace("\n", " ").strip()
+        if not text:
+            continue
+        start = float(seg.get("start", 0.0))
+        out.append({"start": start, "end": start + float(seg.get("duration", 0.0)), "text": text})
+    return out
+
+
+def segments_from_whisper(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Wynik whisper.transcribe -> segmenty bez tokenów i statystyk dekodera."""
+    out = []
+    for seg in result.get("segments", []):
+        text = (seg.get("text") or "").strip()
+        if text:
+            out.append({"start": float(seg["start"]), "end": float(seg["end"]), "text": text})
+    return out
+
+
+def segments_text(segments: Iterable[Dict[str, Any]]) -> str:
+    return " ".join(seg["text"] for seg in segments if seg.get("text")).strip()
+
+
+def write_segments(
+    video_id: str,
+    segments: Iterable[Dict[str, Any]],
+    source: str,
+    root: Path = SEGMENTS_DIR,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Path:
+    """
+    Zapisuje segmenty jednego wideo do katalogu tymczasowego i podmienia poprzednią wersję
+    rename'ami: stary katalog na bok, nowy na jego miejsce, dopiero potem usunięcie starego.
+    Czytelnik widzi całą starą albo całą nową wersję (lub przez chwilę brak katalogu),
+    nigdy mieszaniny plików; przerwanie w trakcie zostawia stary katalog w .<video_id>.old.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"Nieznane źródło segmentów: {source} (dozwolone: {SOURCES})")
+    code = SOURCES.index(source)
+    starts: List[float] = []
+    ends: List[float] = []
+    offsets: List[int] = [0]
+    chunks: List[bytes] = []
+    pos = 0
+    for seg in segments:
+        raw = seg["text"].encode("utf-8") + SEPARATOR
+        chunks.append(raw)
+        pos += len(raw)
+        offsets.append(pos)
+        starts.append(seg["start"])
+        ends.append(seg["end"])
+
+    out_dir = root / video_id
+    tmp_dir = root / f".{video_id}.tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    np.save(tmp_dir / "start.npy", np.asarray(starts, dtype=np.float32))
+    np.save(tmp_dir / "end.npy", np.asarray(ends, dtype=np.float32))
+    np.save(tmp_dir / "offsets.npy", np.asarray(offsets, dtype=np.int64))
+    np.save(tmp_dir / "source.npy", np.full(len(starts), code, dtype=np.uint8))
+    (tmp_dir / "text.bin").write_bytes(b"".join(chunks))
+    info = {"video_id": video_id, "num_segments": len(starts), "sources": list(SOURCES)}
+    info.update(meta or {})
+    (tmp_dir / "meta.json").write_text(json.dumps(info, ensure_ascii=False), encoding="utf-8")
+
+    old_dir = root / f".{video_id}.old"
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+    if out_dir.exists():
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+    return out_dir
+
+
+class SegmentStore:
+    """Widok tylko-do-odczytu na segmenty jednego wideo (np.memmap, zero kopiowania)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.meta: Dict[str, Any] = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self.start = np.load(self.path / "start.npy", mmap_mode="r")
+        self.end = np.load(self.path / "end.npy", mmap_mode="r")
+        self.offsets = np.load(self.path / "offsets.npy", mmap_mode="r")
+        self.source = np.load(self.path / "source.npy", mmap_mode="r")
+        text_path = self.path / "text.bin"
+        if text_path.stat().st_size:
+            self._text = np.memmap(text_path, dtype=np.uint8, mode="r")
+        else:
+            self._text = np.zeros(0, dtype=np.uint8)
+
+    @classmethod
+    def open(cls, video_id: str, root: Path = SEGMENTS_DIR) -> "SegmentStore":
+        return cls(root / video_id)
+
+    @staticmethod
+    def exists(video_id: str, root: Path = SEGMENTS_DIR) -> bool:
+        return (root / video_id / "meta.json").exists()
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def text(self, i: int, j: Optional[int] = None) -> str:
+        """Tekst segmentu i lub okna segmentów [i, j) — jeden ciągły wycinek bufora."""
+        j = i + 1 if j is None else j
+        if j <= i:
+            return ""
+        raw = self._text[int(self.offsets[i]):int(self.offsets[j])].tobytes()
+        return raw.decode("utf-8").strip()
+
+    def segment(self, i: int) -> Dict[str, Any]:
+        return {
+            "start": float(self.start[i]),
+            "end": float(self.end[i]),
+            "text": self.text(i),
+            "source": SOURCES[int(self.source[i])],
+        }
+
+    def slice_time(self, t0: float, t1: float) -> Tuple[int, int]:
+        """Zakres indeksów [i, j) segmentów nachodzących na przedział czasu [t0, t1)."""
+        i = int(np.searchsorted(self.end, t0, side="right"))
+        j = int(np.searchsorted(self.start, t1, side="left"))
+        return i, max(i, j)
+
+    def time_windows(self, window_s: float, stride_s: Optional[float] = None) -> Iterator[Tuple[int, int]]:
+        """Okna czasowe po window_s sekund (z krokiem stride_s) jako zakresy indeksów."""
+        if not len(self):
+            return
+        stride_s = stride_s or window_s
+        t = float(self.start[0])
+        last = float(self.end[-1])
+        while t < last:
+            i, j = self.slice_time(t, t + window_s)
+            if j > i:
+                yield i, j
+            t += stride_s
+
+    def token_counts(self, count_tokens: Callable[[str], int]) -> np.ndarray:
+        return np.fromiter((count_tokens(self.text(i)) for i in range(len(self))), dtype=np.int64, count=len(self))
+
+    def token_windows(
+        self,
+        count_tokens: Callable[[str], int],
+        max_tokens: int,
+        overlap_tokens: int = 0,
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        Okna segmentów o łącznej liczbie tokenów <= max_tokens (segment dłuższy niż limit
+        tworzy własne okno). Kolejne okno cofa się o ~overlap_tokens. Dwa wskaźniki => O(n).
+        """
+        return pack_windows(self.token_counts(count_tokens), max_tokens, overlap_tokens)
@@ -0,0 +1,275 @@
+"""
+Wspólna pamięć pobranych URL-i (crawler Salon24/serwisy, rss_fetcher, fetch_*_sources):
+- canonicalize_url: jeden klucz dla wariantów adresu (http/https, www., port domyślny,
+  parametry śledzące utm_*/fbclid/gclid..., kolejność parametrów, końcowy "/", #fragment).
+- Skalowalny filtr Blooma (data/url_store/seen.bloom) — szybka odpowiedź "na pewno nowy"
+  bez dotykania dysku; przy zapełnieniu dokładany jest kolejny, większy filtr z ostrzejszym
+  progiem błędu, więc łączny odsetek fałszywych trafień nie rośnie z liczbą URL-i.
+- Dokładny magazyn sqlite (data/url_store/seen.sqlite) — rozstrzyga trafienia filtra
+  (fałszywie pozytywne), więc znany URL nigdy nie jest mylony z nowym i odwrotnie.
+
+Zapis: commit() zapisuje najpierw filtr (atomowo), potem zatwierdza sqlite — po awarii filtr
+jest nadzbiorem magazynu, co kosztuje najwyżej dodatkowe zapytanie, nigdy pominięty URL.
+Konfiguracja: config.yaml, sekcja `url_store`.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+CONFIG = ROOT / "config" / "config.yaml"
+URL_STORE_DIR = ROOT / "data" / "url_store"
+DEFAULT_CAPACITY = 100_000
+DEFAULT_ERROR_RATE = 0.001
+
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid", "igshid",
+    "ref", "ref_src", "_ga", "_gl", "spm", "cmpid", "ncid", "sr_share",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_")
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def canonicalize_url(url: str) -> str:
+    """Klucz deduplikacji URL-a (nie do pobierania — schemat jest ujednolicany do https)."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme in DEFAULT_PORTS:
+        host = (parts.hostname or "").rstrip(".")
+        if host.startswith("www."):
+            host = host[4:]
+        port = parts.port
+        netloc = host if port is None or str(port) == DEFAULT_PORTS[scheme] else f"{host}:{port}"
+        scheme = "https"
+    else:
+        netloc = parts.netloc.lower()
+    path = parts.path or "/"
+    while "//" in path:
+        path = path.replace("//", "/")
+    path = path.rstrip("/")
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(query)), ""))
+
+
+def _hash_pair(key: str) -> Tuple[int, int]:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class BloomFilter:
+    """Filtr Blooma o stałej pojemności (podwójne haszowanie blake2b)."""
+
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytearray] = None, count: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, key: str) -> Iterable[int]:
+        h1, h2 = _hash_pair(key)
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: str) -> None:
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter:
+    """
+    Ciąg filtrów Blooma: i-ty ma pojemność capacity * growth**i i próg błędu
+    error_rate * (1 - tightening) * tightening**i (suma szeregu <= error_rate).
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        error_rate: float = DEFAULT_ERROR_RATE,
+        growth: int = 2,
+        tightening: float = 0.85,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.filters: List[BloomFilter] = []
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self.filters)
+
+    def __contains__(self, key: str) -> bool:
+        return any(key in f for f in reversed(self.filters))
+
+    def _new_filter(self) -> BloomFilter:
+        i = len(self.filters)
+        return BloomFilter(
+            capacity=self.capacity * self.growth ** i,
+            error_rate=self.error_rate * (1 - self.tightening) * self.tightening ** i,
+        )
+
+    def add(self, key: str) -> None:
+        if not self.filters or self.filters[-1].full:
+            self.filters.append(self._new_filter())
+        self.filters[-1].add(key)
+
+    def save(self, path: Path) -> None:
+        """Nagłówek JSON (jedna linia) + bity kolejnych filtrów; zapis atomowy."""
+        header = {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "growth": self.growth,
+            "tightening": self.tightening,
+            "filters": [{"capacity": f.capacity, "error_rate": f.error_rate, "count": f.count} for f in self.filters],
+        }
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with tmp.open("wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            for bf in self.filters:
+                f.write(bf.bits)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ScalableBloomFilter":
+        with path.open("rb") as f:
+            header = json.loads(f.readline())
+            sbf = cls(header["capacity"], header["error_rate"], header["growth"], header["tightening"])
+            for meta in header["filters"]:
+                bf = BloomFilter(meta["capacity"], meta["error_rate"], count=meta["count"])
+                bits = f.read(len(bf.bits))
+                if len(bits) != len(bf.bits):
+                    raise ValueError(f"uszkodzony plik filtra: {path}")
+                bf.bits = bytearray(bits)
+                sbf.filters.append(bf)
+        return sbf
+
+
+class UrlStore:
+    """
+    Znane URL-e: filtr Blooma przed dokładnym magazynem sqlite.
+    Bezpieczne wątkowo (handlery crawlera działają w wątkach).
+    """
+
+    def __init__(
+        self,
+        root: Path = URL_STORE_DIR,
+        capacity: int = DEFAULT_CAPACITY,
+        error_rate: float = DEFAULT_ERROR_RATE,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.bloom_path = self.root / "seen.bloom"
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.root / "seen.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, kind TEXT, added_at REAL) WITHOUT ROWID"
+        )
+        self._db.commit()
+        self.stats = {"bloom_negative": 0, "exact_lookups": 0, "false_positive": 0}
+        self.bloom = self._load_bloom(capacity, error_rate)
+
+    @classmethod
+    def from_config(cls) -> "UrlStore":
+        cfg: Dict[str, Any] = {}
+        if CONFIG.exists():
+            cfg = (yaml.safe_load(CONFIG.read_text(encoding="utf-8")) or {}).get("url_store", {})
+        root = ROOT / cfg["dir"] if cfg.get("dir") else URL_STORE_DIR
+        return cls(
+            root=root,
+            capacity=int(cfg.get("capacity", DEFAULT_CAPACITY)),
+            error_rate=float(cfg.get("error_rate", DEFAULT_ERROR_RATE)),
+        )
+
+    def _load_bloom(self, capacity: int, error_rate: float) -> ScalableBloomFilter:
+        if self.bloom_path.exists():
+            try:
+                return ScalableBloomFilter.load(self.bloom_path)
+            except (ValueError, KeyError) as e:
+                print(f"[url_store] {e} — odbudowa filtra z sqlite")
+        # Brak/uszkodzony filtr: odbudowa z magazynu dokładnego
+        bloom = ScalableBloomFilter(capacity, error_rate)
+        for (url,) in self._db.execute("SELECT url FROM urls"):
+            bloom.add(url)
+        return bloom
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def _known(self, key: str) -> bool:
+        if key not in self.bloom:
+            self.stats["bloom_negative"] += 1
+            return False
+        self.stats["exact_lookups"] += 1
+        hit = self._db.execute("SELECT 1 FROM urls WHERE url = ?", (key,)).fetchone() is not None
+        if not hit:
+            self.stats["false_positive"] += 1
+        return hit
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return self._known(canonicalize_url(url))
+
+    def add(self, url: str, kind: str = "page") -> bool:
+        """Zapamiętuje URL; True gdy był nowy. Trwałe dopiero po commit()."""
+        key = canonicalize_url(url)
+        with self._lock:
+            if self._known(key):
+                return False
+            self._db.execute("INSERT INTO urls VALUES (?, ?, ?)", (key, kind, time.time()))
+            self.bloom.add(key)
+            return True
+
+    def filter_new(self, urls: Iterable[str]) -> List[str]:
+        """URL-e jeszcze nieznane (bez duplikatów w obrębie wejścia); nie zapamiętuje ich."""
+        out: List[str] = []
+        batch = set()
+        with self._lock:
+            for url in urls:
+                key = canonicalize_url(url)
+                if key in batch or self._known(key):
+                    continue
+                batch.add(key)
+                out.append(url)
+        return out
+
+    def commit(self) -> None:
+        with self._lock:
+            self.bloom.save(self.bloom_path)
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self.commit()
+            self._db.close()
+
+    def __enter__(self) -> "UrlStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,167 @@
+"""
+Pula adapterów LoRA nad jednym modelem bazowym (serwer: ml/server.py):
+- Rejestr nazwa -> katalog adaptera (results_rtx4090/final, results_mistral_standard/...);
+  wagi ładowane leniwie przy pierwszym żądaniu i trzymane w LRU o pojemności `max_loaded`.
+  Przy braku miejsca usuwany jest najdawniej używany adapter, którego nie używa żaden wiersz
+  biegnącego batcha; gdy wszystkie są zajęte, żądanie czeka w kolejce silnika.
+- Batch mieszany: wiersze z różnymi adapterami w jednym forwardzie (PEFT `adapter_names`,
+  BASE = sam model bazowy), więc champion/challenger nie mnoży pamięci modelu bazowego.
+- Hot-swap: ponowna rejestracja nazwy (nowy checkpoint) ładuje wagi pod nowym slotem; żądania
+  w biegu kończą na starych wagach, stary slot jest zwalniany, gdy przestanie być używany.
+
+Ładowanie i usuwanie wag (acquire/release) wyłącznie z wątku silnika — forward nie może widzieć
+zmian modułów w trakcie; register() jest bezpieczne z wątków HTTP.
+"""
+from __future__ import annotations
+
+import copy
+import threading
+from collections import Counter, OrderedDict
+from itertools import count
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import torch
+
+BASE = "__base__"  # nazwa PEFT dla wierszy bez adaptera
+
+
+def parse_adapter_specs(specs: Sequence[str]) -> Dict[str, str]:
+    """["nazwa=katalog", "katalog", ...] -> {nazwa: katalog}; bez nazwy — nazwa katalogu."""
+    adapters: Dict[str, str] = {}
+    for spec in specs:
+        name, sep, path = spec.partition("=")
+        if not sep:
+            path = name
+            name = Path(path).name if Path(path).name not in ("final", "") else Path(path).parent.name
+        adapters[name] = path
+    return adapters
+
+
+class AdapterPool:
+    def __init__(self, model: Any, adapters: Optional[Dict[str, str]] = None, max_loaded: int = 4):
+        self.base = model
+        self.model = model  # po pierwszym załadowaniu: PeftModel owijający `base`
+        self.max_loaded = max(1, max_loaded)
+        self.lock = threading.Lock()
+        self.registry: Dict[str, str] = {}  # nazwa -> katalog
+        self.current: Dict[str, str] = {}  # nazwa -> slot z wagami aktualnej wersji
+        self.loaded: "OrderedDict[str, str]" = OrderedDict()  # slot -> nazwa, kolejność LRU
+        self.pins: Counter = Counter()  # slot -> liczba żądań w batchu
+        self.hits = self.loads = self.evictions = 0
+        self._slots = count()
+        for name, path in (adapters or {}).items():
+            self.register(name, path)
+
+    def register(self, name: str, path: str) -> None:
+        """Dodaje adapter albo podmienia jego checkpoint (hot-swap przy kolejnym żądaniu)."""
+        if not name or name == BASE:
+            raise ValueError(f"niepoprawna nazwa adaptera {name!r}")
+        if not (Path(path) / "adapter_config.json").exists():
+            raise ValueError(f"{path}: brak adapter_config.json")
+        with self.lock:
+            self.registry[name] = str(path)
+            self.current.pop(name, None)  # stary slot zostaje do zwolnienia przez silnik
+
+    def names(self) -> List[str]:
+        with self.lock:
+            return list(self.registry)
+
+    def _stale(self, slot: str) -> bool:
+        return self.current.get(self.loaded[slot]) != slot
+
+    def _evictable(self) -> List[str]:
+        # Najpierw nieaktualne wersje, potem wg LRU; tylko sloty bez wierszy w batchu
+        free = [slot for slot in self.loaded if not self.pins[slot]]
+        return sorted(free, key=lambda slot: not self._stale(slot))
+
+    def can_acquire(self, name: Optional[str]) -> bool:
+        with self.lock:
+            if name is None or name in self.current:
+                return True
+            return len(self.loaded) < self.max_loaded or bool(self._evictable())
+
+    def acquire(self, name: Optional[str]) -> str:
+        """Slot adaptera dla nowego wiersza batcha (ładuje wagi, jeśli trzeba); przypina slot."""
+        if name is None:
+            return BASE
+        with self.lock:
+            path = self.registry[name]
+            slot = self.current.get(name)
+        if slot is not None:
+            self.hits += 1
+        else:
+            slot = self._load(name, path)
+        self.loaded.move_to_end(slot)
+        self.pins[slot] += 1
+        return slot
+
+    def release(self, slot: Optional[str]) -> None:
+        if slot is None or slot == BASE:
+            return
+        self.pins[slot] -= 1
+        # Nieaktualna wersja znika od razu — chyba że to ostatni adapter (PeftModel musi mieć
+        # choć jeden); wtedy zostanie usunięta po załadowaniu następnego
+        if not self.pins[slot] and self._stale(slot) and len(self.loaded) > 1:
+            self._delete(slot)
+
+    def _load(self, name: str, path: str) -> str:
+        slot = f"slot{next(self._slots)}"
+        if self.model is self.base:
+            from peft import PeftModel
+
+            self.model = PeftModel.from_pretrained(self.base, path, adapter_name=slot).eval()
+        else:
+            self.model.load_adapter(path, adapter_name=slot)
+        self.loads += 1
+        with self.lock:
+            self.loaded[slot] = name
+            # Rejestracja w trakcie ładowania — te wagi są już nieaktualne
+            if self.registry.get(name) == path:
+                self.current[name] = slot
+            evictable = self._evictable()
+            over = len(self.loaded) - self.max_loaded
+        # Nowy slot jest ładowany przed usunięciem starego: PeftModel nie może zostać bez adapterów
+        for victim in [s for s in evictable if s != slot][:max(over, 0)]:
+            self._delete(victim)
+        return slot
+
+    def _delete(self, slot: str) -> None:
+        with self.lock:
+            name = self.loaded.pop(slot)
+            if self.current.get(name) == slot:
+                del self.current[name]
+        del self.pins[slot]
+        if slot in self.model.active_adapters:
+            self.model.set_adapter(next(reversed(self.loaded)))
+        self.model.delete_adapter(slot)
+        self.evictions += 1
+
+    def forward_kwargs(self, slots: Sequence[str]) -> Dict[str, Any]:
+        """Argumenty forwardu dla wierszy batcha (po jednym slocie na wiersz)."""
+        return {"adapter_names": list(slots)} if self.model is not self.base else {}
+
+    def describe(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "registered": dict(self.registry),
+                "loaded": [name + ("" if self.current.get(name) == slot else " (stara wersja)") for slot, name in self.loaded.items()],
+                "max_loaded": self.max_loaded,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+def random_adapters(model: Any, out_dir: Path, names: Sequence[str], seed: int = 0) -> Dict[str, str]:
+    """Losowe (niezerowe) adaptery LoRA dla modelu testowego — serwer --tiny, test obciążeniowy."""
+    from peft import LoraConfig, get_peft_model
+
+    adapters = {}
+    for i, name in enumerate(names):
+        torch.manual_seed(seed + i)
+        config = LoraConfig(r=8, lora_alpha=16, target_modules=["q_proj", "k_proj", "v_proj", "o_proj"], init_lora_weights=False)
+        path = out_dir / name
+        get_peft_model(copy.deepcopy(model), config).save_pretrained(path)
+        adapters[name] = str(path)
+    return adapters
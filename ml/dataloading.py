@@ -0,0 +1,306 @@
+"""
+Warstwa ładowania danych treningowych nad cache tokenów (ml/token_cache.py):
+- Kolacja (PackedCollator / PaddingCollator, w tym maska 4D) w procesach workerów DataLoadera,
+  nie w wątku pętli treningowej.
+- Ograniczona kolejka prefetchu: wątek w tle pobiera gotowe batche i (na GPU) kopiuje je do
+  urządzenia na osobnym strumieniu CUDA; pętla treningowa dostaje batch już na urządzeniu.
+- Bufory pinned wielokrotnego użytku: pula `prefetch + 2` zestawów buforów rosnących do
+  największego batcha — bez alokacji pinned pamięci w każdym kroku. Zestaw wraca do użytku
+  dopiero po zakończeniu kopii (zdarzenie CUDA).
+- Statystyki: czas oczekiwania pętli na batch i liczba "głodnych" kroków (pusta kolejka).
+- PrefetchTrainer: transformers.Trainer z tym loaderem dla zbioru treningowego (jeden proces;
+  przy treningu rozproszonym — loader Trainera). Zbiór z własnym samplerem (atrybut `sampler`,
+  np. ml/mixture.py) używa go zamiast losowego/group_by_length.
+- Wznowienie w połowie epoki (Trainer.train(resume_from_checkpoint=...)): loader udostępnia
+  atrybuty, z których accelerate.skip_first_batches buduje zwykły DataLoader pomijający
+  wykonane batche (bez ich kolacji) w tej samej kolejności; do końca tej epoki bez prefetchu
+  i liczników tokenów profilera, kolejne epoki znowu przez PrefetchLoader.
+
+Benchmark (czy kroki nie czekają na dane): scripts/benchmark_dataloading.py.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import torch
+from torch.utils.data import DataLoader, RandomSampler
+
+try:
+    from transformers import Trainer
+except ImportError:  # loader działa bez transformers; PrefetchTrainer wymaga Trainera
+    Trainer = object  # type: ignore[misc,assignment]
+
+from ml.packing import IGNORE_INDEX
+
+_END = object()
+
+
+class _CollateWithCounts:
+    """Kolacja w workerze + liczniki tokenów (prawdziwe, pozycje, w lossie) obok batcha."""
+
+    def __init__(self, collator: Callable[[List[Dict[str, Any]]], Dict[str, torch.Tensor]]):
+        self.collator = collator
+
+    def __call__(self, features: List[Dict[str, Any]]) -> Tuple[Dict[str, torch.Tensor], Tuple[int, int, int]]:
+        batch = self.collator(features)
+        labels = batch.get("labels")
+        counts = (
+            sum(len(f["input_ids"]) for f in features),
+            batch["input_ids"].numel(),
+            int((labels != IGNORE_INDEX).sum()) if labels is not None else 0,
+        )
+        return batch, counts
+
+
+class _PinnedPool:
+    """Zestawy buforów pinned (per klucz batcha) używane cyklicznie; bufory rosną, nie maleją."""
+
+    def __init__(self, slots: int):
+        self.buffers: List[Dict[str, torch.Tensor]] = [{} for _ in range(slots)]
+        self.events: List[Optional[torch.cuda.Event]] = [None] * slots
+        self.next = 0
+
+    def stage(self, batch: Dict[str, torch.Tensor]) -> Tuple[int, Dict[str, torch.Tensor]]:
+        slot = self.next
+        self.next = (self.next + 1) % len(self.buffers)
+        if self.events[slot] is not None:
+            self.events[slot].synchronize()  # poprzednia kopia z tego zestawu zakończona
+        buffers = self.buffers[slot]
+        staged = {}
+        for key, tensor in batch.items():
+            buf = buffers.get(key)
+            if buf is None or buf.dtype != tensor.dtype or buf.numel() < tensor.numel():
+                buf = buffers[key] = torch.empty(tensor.numel(), dtype=tensor.dtype).pin_memory()
+            view = buf[: tensor.numel()].view(tensor.shape)
+            view.copy_(tensor)
+            staged[key] = view
+        return slot, staged
+
+
+class _EpochBatchSampler:
+    """batch_sampler dla accelerate.skip_first_batches; Trainer woła na nim set_epoch."""
+
+    def __init__(self, owner: "PrefetchLoader"):
+        self.owner = owner
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        return iter(self.owner.loader.batch_sampler)
+
+    def __len__(self) -> int:
+        return len(self.owner.loader.batch_sampler)
+
+    def set_epoch(self, epoch: int) -> None:
+        self.owner.set_epoch(epoch)
+
+
+class PrefetchLoader:
+    def __init__(
+        self,
+        dataset: Any,
+        collator: Callable[[List[Dict[str, Any]]], Dict[str, torch.Tensor]],
+        batch_size: int,
+        num_workers: int = 2,
+        prefetch: int = 4,
+        pin_memory: bool = True,
+        device: Optional[torch.device] = None,
+        sampler: Optional[Any] = None,
+        drop_last: bool = False,
+        seed: int = 42,
+        profiler: Optional[Any] = None,
+    ):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.prefetch = max(1, prefetch)
+        self.device = torch.device(device) if device is not None else torch.device("cpu")
+        self.use_cuda = self.device.type == "cuda" and torch.cuda.is_available()
+        self.pin_memory = pin_memory and self.use_cuda
+        self.seed = seed
+        self.epoch = 0
+        self.profiler = profiler
+        # Bez publicznego `generator`: skip_first_batches przekazałby go DataLoaderowi, który
+        # losuje z niego ziarno workerów i przesuwa kolejność samplera
+        self._generator = torch.Generator()
+        self.sampler = sampler if sampler is not None else RandomSampler(dataset, generator=self._generator)
+        if getattr(self.sampler, "generator", False) is None:
+            # Sampler Trainera (RandomSampler / LengthGroupedSampler) bez generatora losowałby
+            # z globalnego RNG — kolejność epoki zależna od ziarna i epoki, jak przy wznowieniu
+            self.sampler.generator = self._generator
+        self.loader = DataLoader(
+            dataset,
+            batch_size=batch_size,
+            sampler=self.sampler,
+            collate_fn=_CollateWithCounts(collator),
+            num_workers=num_workers,
+            prefetch_factor=self.prefetch if num_workers else None,
+            persistent_workers=num_workers > 0,
+            drop_last=drop_last,
+        )
+        self._pool = _PinnedPool(self.prefetch + 2) if self.pin_memory else None
+        self._stream = torch.cuda.Stream(self.device) if self.use_cuda else None
+        self.stats = {"batches": 0, "starved": 0, "wait_s": 0.0}
+        self._active: Optional[Tuple[threading.Event, threading.Thread]] = None
+
+    def __len__(self) -> int:
+        return len(self.loader)
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+        self._generator.manual_seed(self.seed + epoch)
+        if hasattr(self.sampler, "set_epoch"):
+            self.sampler.set_epoch(epoch)
+
+    def __iter__(self) -> Iterator[Dict[str, torch.Tensor]]:
+        # Poprzednia epoka przerwana w połowie (max_steps) nie może czytać z loadera równolegle
+        self.close()
+        self._generator.manual_seed(self.seed + self.epoch)
+        return _PrefetchIterator(self)
+
+    # --- interfejs DataLoadera dla accelerate.skip_first_batches (wznowienie) ---------
+
+    @property
+    def batch_sampler(self) -> _EpochBatchSampler:
+        return _EpochBatchSampler(self)
+
+    @property
+    def collate_fn(self) -> Callable[[List[Dict[str, Any]]], Dict[str, torch.Tensor]]:
+        return self.loader.collate_fn.collator
+
+    @property
+    def num_workers(self) -> int:
+        return self.loader.num_workers
+
+    @property
+    def prefetch_factor(self) -> Optional[int]:
+        return self.loader.prefetch_factor
+
+    @property
+    def drop_last(self) -> bool:
+        return self.loader.drop_last
+
+    def summary(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        return {
+            "num_workers": self.loader.num_workers,
+            "prefetch": self.prefetch,
+            "pin_memory": self.pin_memory,
+            "batches": batches,
+            "starved": self.stats["starved"],
+            "wait_ms_per_batch": round(1000 * self.stats["wait_s"] / batches, 3) if batches else None,
+        }
+
+    def close(self) -> None:
+        if self._active is not None:
+            stop, thread = self._active
+            stop.set()
+            thread.join()
+            self._active = None
+
+    def _to_device(self, batch: Dict[str, torch.Tensor]) -> Tuple[Dict[str, torch.Tensor], Optional[torch.cuda.Event]]:
+        if not self.use_cuda:
+            return batch, None
+        slot = None
+        if self._pool is not None:
+            slot, batch = self._pool.stage(batch)
+        with torch.cuda.stream(self._stream):
+            moved = {k: v.to(self.device, non_blocking=True) for k, v in batch.items()}
+            event = torch.cuda.Event()
+            event.record(self._stream)
+        if slot is not None:
+            self._pool.events[slot] = event
+        return moved, event
+
+
+def _fill(owner: PrefetchLoader, out: "queue.Queue[Any]", stop: threading.Event) -> None:
+    """Wątek prefetchu; bez referencji do iteratora, żeby porzucony iterator mógł go zatrzymać."""
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for batch, counts in owner.loader:
+            if not put((*owner._to_device(batch), counts)):
+                return
+        put(_END)
+    except Exception as e:  # błąd workera/kolacji trafia do pętli treningowej
+        put(e)
+
+
+class _PrefetchIterator:
+    def __init__(self, owner: PrefetchLoader):
+        self.owner = owner
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=owner.prefetch)
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=_fill, args=(owner, self.queue, self.stop), daemon=True)
+        owner._active = (self.stop, self.thread)
+        self.thread.start()
+
+    def __iter__(self) -> "_PrefetchIterator":
+        return self
+
+    def __next__(self) -> Dict[str, torch.Tensor]:
+        stats = self.owner.stats
+        if self.queue.empty():
+            stats["starved"] += 1
+        start = time.perf_counter()
+        item = self.queue.get()
+        stats["wait_s"] += time.perf_counter() - start
+        if item is _END:
+            self.thread.join()
+            raise StopIteration
+        if isinstance(item, Exception):
+            raise item
+        batch, event, counts = item
+        if event is not None:
+            current = torch.cuda.current_stream(self.owner.device)
+            current.wait_event(event)
+            for tensor in batch.values():
+                tensor.record_stream(current)  # alokacja ze strumienia kopii używana na bieżącym
+        stats["batches"] += 1
+        if self.owner.profiler is not None:
+            self.owner.profiler.count(*counts)
+        return batch
+
+    def __del__(self) -> None:
+        self.stop.set()
+
+
+class PrefetchTrainer(Trainer):
+    """
+    Trainer z PrefetchLoader dla zbioru treningowego (ewaluacja — loader Trainera).
+    loader_options=None => loader Trainera (pozostaje tylko sampler zbioru).
+    """
+
+    def __init__(self, *args: Any, loader_options: Optional[Dict[str, Any]] = None, profiler: Optional[Any] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.loader_options = loader_options
+        self.profiler = profiler
+        self.train_loader: Optional[PrefetchLoader] = None
+
+    def _get_train_sampler(self, train_dataset: Optional[Any] = None):
+        sampler = getattr(train_dataset if train_dataset is not None else self.train_dataset, "sampler", None)
+        return sampler if sampler is not None else super()._get_train_sampler(train_dataset)
+
+    def get_train_dataloader(self):
+        if self.loader_options is None or self.args.world_size > 1:
+            return super().get_train_dataloader()
+        self.train_loader = PrefetchLoader(
+            self.train_dataset,
+            self.data_collator,
+            batch_size=self._train_batch_size,
+            sampler=self._get_train_sampler(self.train_dataset),
+            drop_last=self.args.dataloader_drop_last,
+            device=self.args.device,
+            seed=self.args.seed,
+            profiler=self.profiler,
+            **self.loader_options,
+        )
+        return self.train_loader
@@ -0,0 +1,350 @@
+"""
+Wsadowa generacja dla ewaluacji modelu (zamiast model.generate prompt po promptcie):
+- Batche promptów posortowanych po długości (mniej paddingu), padding z lewej — między wspólnym
+  prefiksem a treścią promptu; position_ids liczone z maski, więc pozycje są jak bez paddingu.
+- Wspólny prefiks tokenów wszystkich promptów (BOS + "### Instruction:\\n" albo wspólny wstęp)
+  liczony raz: cache KV prefiksu kopiowany do każdego batcha, prefill tylko dla reszty promptu.
+- Wiersze zakończone (EOS albo sekwencja stop) usuwane z batcha i z cache w trakcie dekodowania.
+- Sekwencje stop (domyślnie kolejne "### Instruction:"/"### Response:") wykrywane na końcówce
+  zdekodowanego tekstu; odpowiedź ucinana przed nimi.
+- Raport: tokeny promptu/odpowiedzi, czas prefill/dekodowania, tokeny/s.
+
+CLI:
+    python ml/generation.py --prompts prompts.txt --model meta-llama/Llama-3.1-8B-Instruct \\
+        --adapter results_rtx4090/final --out responses.jsonl
+    python ml/generation.py --tiny --verify 4      # CPU: mały losowy model, zgodność z generate()
+Plik promptów: .txt (prompt w linii) albo .jsonl (pole instruction / prompt).
+"""
+from __future__ import annotations
+
+import copy
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ml.packing import PROMPT_TEMPLATE
+
+STOP_SEQUENCES = ("### Instruction:", "### Response:")
+
+
+@dataclass
+class GenerationConfig:
+    max_new_tokens: int = 200
+    temperature: float = 0.8  # 0 => greedy
+    top_p: float = 0.9
+    batch_size: int = 16
+    stop: Sequence[str] = STOP_SEQUENCES
+    seed: int = 42
+
+
+@dataclass
+class GenerationStats:
+    prompts: int = 0
+    prompt_tokens: int = 0
+    prefix_tokens: int = 0
+    generated_tokens: int = 0
+    prefill_s: float = 0.0
+    decode_s: float = 0.0
+    batches: int = 0
+    stop_reasons: Dict[str, int] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        total = self.prefill_s + self.decode_s
+        return {
+            "prompts": self.prompts,
+            "batches": self.batches,
+            "prompt_tokens": self.prompt_tokens,
+            "shared_prefix_tokens": self.prefix_tokens,
+            "generated_tokens": self.generated_tokens,
+            "prefill_s": round(self.prefill_s, 3),
+            "decode_s": round(self.decode_s, 3),
+            "tokens_per_s": round(self.generated_tokens / total, 1) if total else None,
+            "decode_tokens_per_s": round(self.generated_tokens / self.decode_s, 1) if self.decode_s else None,
+            "stop_reasons": dict(self.stop_reasons),
+        }
+
+
+def load_prompts(path: Path) -> List[str]:
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+        return [r.get("instruction") or r["prompt"] for r in records]
+    return [line.strip() for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def _common_prefix(rows: Sequence[Sequence[int]]) -> int:
+    """Długość wspólnego prefiksu; każdemu wierszowi zostaje co najmniej jeden token."""
+    n = min(len(r) for r in rows) - 1
+    first = rows[0]
+    for k in range(max(n, 0)):
+        if any(r[k] != first[k] for r in rows):
+            return k
+    return max(n, 0)
+
+
+def _sample(logits: torch.Tensor, config: GenerationConfig, generator: torch.Generator) -> torch.Tensor:
+    if config.temperature <= 0:
+        return logits.argmax(-1)
+    probs = torch.softmax(logits.float() / config.temperature, dim=-1)
+    if config.top_p < 1.0:
+        sorted_probs, order = probs.sort(dim=-1, descending=True)
+        # Zostają tokeny, dla których masa przed nimi < top_p (pierwszy zawsze)
+        keep = sorted_probs.cumsum(-1) - sorted_probs < config.top_p
+        sorted_probs = sorted_probs * keep
+        choice = torch.multinomial(sorted_probs.cpu(), 1, generator=generator).to(order.device)
+        return order.gather(-1, choice).squeeze(-1)
+    return torch.multinomial(probs.cpu(), 1, generator=generator).squeeze(-1).to(logits.device)
+
+
+class BatchGenerator:
+    def __init__(self, model: Any, tokenizer: Any, config: Optional[GenerationConfig] = None, template: str = PROMPT_TEMPLATE):
+        self.model = model.eval()
+        self.tokenizer = tokenizer
+        self.config = config or GenerationConfig()
+        self.template = template
+        self.pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.eos_ids = {tokenizer.eos_token_id} - {None}
+        self.device = next(model.parameters()).device
+        self.stats = GenerationStats()
+        # Sekwencja stop o c znakach mieści się w <= c tokenach
+        self.stop_window = max((len(s) for s in self.config.stop), default=0) + 2
+
+    def _prefix_cache(self, prefix: List[int]):
+        from transformers import DynamicCache
+
+        if not prefix:
+            return None
+        cache = DynamicCache()
+        ids = torch.tensor([prefix], device=self.device)
+        self.model(input_ids=ids, past_key_values=cache, use_cache=True, logits_to_keep=1)
+        return cache
+
+    def _stop_text(self, text: str) -> Optional[int]:
+        hits = [text.find(s) for s in self.config.stop if s and s in text]
+        return min(hits) if hits else None
+
+    @torch.no_grad()
+    def generate(self, prompts: Sequence[str]) -> List[Dict[str, Any]]:
+        config = self.config
+        encoded = [self.tokenizer(self.template.format(instruction=p))["input_ids"] for p in prompts]
+        if not encoded:
+            return []
+        shared = _common_prefix(encoded)
+        prefix_cache = self._prefix_cache(encoded[0][:shared])
+        generator = torch.Generator().manual_seed(config.seed)
+        self.stats.prompts += len(prompts)
+        self.stats.prompt_tokens += sum(map(len, encoded))
+        self.stats.prefix_tokens = shared
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(prompts)
+        order = sorted(range(len(prompts)), key=lambda i: -len(encoded[i]))
+        for start in range(0, len(order), config.batch_size):
+            batch = order[start:start + config.batch_size]
+            for i, out in zip(batch, self._generate_batch([encoded[i][shared:] for i in batch], shared, prefix_cache, generator)):
+                results[i] = dict(out, prompt=prompts[i], prompt_tokens=len(encoded[i]))
+        return results  # type: ignore[return-value]
+
+    def _generate_batch(self, suffixes: List[List[int]], shared: int, prefix_cache: Any, generator: torch.Generator) -> List[Dict[str, Any]]:
+        config = self.config
+        B = len(suffixes)
+        width = max(map(len, suffixes))
+        input_ids = torch.full((B, width), self.pad_id, dtype=torch.long)
+        mask = torch.zeros((B, shared + width), dtype=torch.long)
+        mask[:, :shared] = 1
+        for b, ids in enumerate(suffixes):
+            input_ids[b, width - len(ids):] = torch.tensor(ids)
+            mask[b, shared + width - len(ids):] = 1
+        input_ids, mask = input_ids.to(self.device), mask.to(self.device)
+        positions = (mask.cumsum(-1) - 1).clamp(min=0)
+
+        cache = None
+        if prefix_cache is not None:
+            cache = copy.deepcopy(prefix_cache)
+            cache.batch_repeat_interleave(B)
+        else:
+            from transformers import DynamicCache
+
+            cache = DynamicCache()
+
+        start = time.perf_counter()
+        out = self.model(
+            input_ids=input_ids, attention_mask=mask, position_ids=positions[:, shared:],
+            past_key_values=cache, use_cache=True, logits_to_keep=1,
+        )
+        logits = out.logits[:, -1]
+        cache = out.past_key_values
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+        self.stats.prefill_s += time.perf_counter() - start
+        self.stats.batches += 1
+
+        start = time.perf_counter()
+        generated: List[List[int]] = [[] for _ in range(B)]
+        reasons: List[str] = ["length"] * B
+        active = list(range(B))  # wiersz batcha -> indeks wyniku
+        next_pos = positions[:, -1]
+        for _ in range(config.max_new_tokens):
+            tokens = _sample(logits, config, generator)
+            keep = []
+            for row, b in enumerate(active):
+                token = int(tokens[row])
+                if token in self.eos_ids:
+                    reasons[b] = "eos"
+                    continue
+                generated[b].append(token)
+                if config.stop:
+                    tail = self.tokenizer.decode(generated[b][-self.stop_window:], skip_special_tokens=True)
+                    if self._stop_text(tail) is not None:
+                        reasons[b] = "stop"
+                        continue
+                keep.append(row)
+            if not keep:
+                active = []
+                break
+            if len(keep) < len(active):
+                index = torch.tensor(keep, device=self.device)
+                cache.batch_select_indices(index)
+                tokens, mask, next_pos = tokens[index], mask[index], next_pos[index]
+                active = [active[row] for row in keep]
+            mask = torch.cat([mask, mask.new_ones((len(active), 1))], dim=-1)
+            next_pos = next_pos + 1
+            out = self.model(
+                input_ids=tokens[:, None], attention_mask=mask, position_ids=next_pos[:, None],
+                past_key_values=cache, use_cache=True,
+            )
+            logits = out.logits[:, -1]
+            cache = out.past_key_values
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+        self.stats.decode_s += time.perf_counter() - start
+
+        results = []
+        for b in range(B):
+            text = self.tokenizer.decode(generated[b], skip_special_tokens=True)
+            cut = self._stop_text(text)
+            if cut is not None:
+                text = text[:cut]
+            self.stats.generated_tokens += len(generated[b])
+            self.stats.stop_reasons[reasons[b]] = self.stats.stop_reasons.get(reasons[b], 0) + 1
+            results.append({"response": text.strip(), "generated_tokens": len(generated[b]), "stop_reason": reasons[b], "token_ids": generated[b]})
+        return results
+
+
+# --- modele -------------------------------------------------------------------------
+
+
+def load_model(model_name: str, adapter: Optional[str] = None, dtype: str = "bfloat16"):
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    from ml.train import _dtype_kwarg
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name, device_map="auto", trust_remote_code=True, **{_dtype_kwarg(): getattr(torch, dtype)}
+    )
+    if adapter:
+        from peft import PeftModel
+
+        model = PeftModel.from_pretrained(model, adapter)
+    return model, tokenizer
+
+
+def tiny_model(out_dir: Path, seed: int = 0):
+    """Mały losowy model Llama + tokenizer BPE z danych syntetycznych (jak profil cpu_smoke)."""
+    from transformers import AutoTokenizer, LlamaConfig, LlamaForCausalLM
+
+    from ml.train import train_smoke_tokenizer, write_synthetic_dataset
+
+    data = write_synthetic_dataset(out_dir / "smoke_data" / "train_512_0.jsonl", 512, 0)
+    tokenizer = AutoTokenizer.from_pretrained(train_smoke_tokenizer(data, 512, out_dir / "tokenizer" / "train_512_0_512"))
+    torch.manual_seed(seed)
+    config = LlamaConfig(
+        vocab_size=len(tokenizer), hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=1024,
+        pad_token_id=tokenizer.pad_token_id, eos_token_id=tokenizer.eos_token_id, bos_token_id=tokenizer.bos_token_id,
+    )
+    return LlamaForCausalLM(config).eval(), tokenizer
+
+
+def verify(generator: BatchGenerator, prompts: Sequence[str], results: Sequence[Dict[str, Any]]) -> int:
+    """Zgodność (greedy) z model.generate() dla pojedynczych promptów; zwraca liczbę różnic."""
+    tokenizer, model = generator.tokenizer, generator.model
+    mismatches = 0
+    for prompt, result in zip(prompts, results):
+        inputs = tokenizer(generator.template.format(instruction=prompt), return_tensors="pt").to(generator.device)
+        with torch.no_grad():
+            output = model.generate(
+                **inputs, max_new_tokens=result["generated_tokens"], do_sample=False,
+                pad_token_id=generator.pad_id, eos_token_id=None,
+            )
+        reference = output[0, inputs["input_ids"].shape[1]:].tolist()
+        if reference != result["token_ids"]:
+            mismatches += 1
+            print(f"❌ różnica: {prompt[:50]!r}\n   batch:     {result['token_ids'][:20]}\n   generate:  {reference[:20]}")
+    return mismatches
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Wsadowa generacja odpowiedzi dla listy promptów")
+    parser.add_argument("--prompts", type=Path, help="plik .txt (prompt w linii) albo .jsonl (instruction/prompt)")
+    parser.add_argument("--model", default="meta-llama/Llama-3.1-8B-Instruct")
+    parser.add_argument("--adapter", help="katalog adaptera LoRA")
+    parser.add_argument("--dtype", default="bfloat16")
+    parser.add_argument("--tiny", action="store_true", help="mały losowy model na CPU (testy)")
+    parser.add_argument("--out", type=Path, help="odpowiedzi JSONL")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-new-tokens", type=int, default=200)
+    parser.add_argument("--temperature", type=float, default=0.8)
+    parser.add_argument("--top-p", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verify", type=int, default=0, help="porównaj N pierwszych odpowiedzi z generate() (greedy)")
+    args = parser.parse_args(argv)
+
+    if args.tiny:
+        model, tokenizer = tiny_model(ROOT / "results_cpu_smoke", args.seed)
+    else:
+        model, tokenizer = load_model(args.model, args.adapter, args.dtype)
+    if args.prompts:
+        prompts = load_prompts(args.prompts)
+    else:
+        from ml.train import SYNTHETIC_WORDS
+
+        words = SYNTHETIC_WORDS
+        prompts = [f"Napisz satyryczny komentarz o: {' '.join(words[(i * 7 + k) % len(words)] for k in range(2 + i % 5))}" for i in range(64)]
+    config = GenerationConfig(
+        max_new_tokens=args.max_new_tokens, temperature=0.0 if args.verify else args.temperature,
+        top_p=args.top_p, batch_size=args.batch_size, seed=args.seed,
+    )
+    generator = BatchGenerator(model, tokenizer, config)
+    results = generator.generate(prompts)
+    stats = generator.stats.summary()
+    print(f"✅ {stats['prompts']} promptów w {stats['batches']} batchach, wspólny prefiks {stats['shared_prefix_tokens']} tokenów")
+    print(f"   prefill {stats['prefill_s']}s, dekodowanie {stats['decode_s']}s, "
+          f"{stats['generated_tokens']} tokenów, {stats['tokens_per_s']} tokenów/s, stop: {stats['stop_reasons']}")
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with args.out.open("w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps({k: v for k, v in result.items() if k != "token_ids"}, ensure_ascii=False) + "\n")
+        print(f"💾 {args.out}")
+    if args.verify:
+        mismatches = verify(generator, prompts[: args.verify], results[: args.verify])
+        print(f"{'✅' if not mismatches else '❌'} zgodność z generate(): {args.verify - mismatches}/{args.verify}")
+        return 1 if mismatches else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
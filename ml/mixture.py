@@ -0,0 +1,186 @@
+"""
+Mieszanka źródeł próbkowana na bieżąco (zmiana proporcji bez przebudowy train_dataset.jsonl):
+- Shardy: przykłady cache tokenów (ml/token_cache.py) pogrupowane po (źródło, język, ton)
+  z metadata rekordu — tablice indeksów, dane czytane z memmap dopiero przy pobraniu.
+- Wagi z konfiguracji (sekcja `mixture` launchera): mnożniki per wartość pola, np.
+  {"source": {"*": 0.3, "salon24": 2.0}, "language": {"pl": 3.0}}. Waga przykładu to iloczyn
+  mnożników ("*" = pozostałe wartości, brak wpisu = 1, 0 wyłącza). Bez wag rozkład jak przy
+  równomiernym tasowaniu.
+- Epoka: liczba przykładów z każdego sharda losowana wielomianowo wg masy sharda (waga x liczba
+  przykładów); wewnątrz sharda bez powtórzeń, dopóki shard się nie wyczerpie.
+- Curriculum długości (opcjonalne): kompetencja rośnie liniowo od `start` do 1 w ciągu `epochs`
+  epok; etap epoki losuje tylko przykłady z percentylem długości <= kompetencja (competence-based
+  curriculum, Platanios i in. 2019). Pakowanie i tasowanie — wewnątrz etapu.
+- Plan epoki liczy sampler w procesie głównym (indeksy albo krotki indeksów = spakowane
+  sekwencje), więc set_epoch działa także z trwałymi workerami DataLoadera. Liczba sekwencji
+  w epoce jest stała (Trainer liczy max_steps i harmonogram LR z długości pierwszej epoki):
+  plan epoki jest przycinany losowo albo uzupełniany sekwencjami z ostatniego etapu.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+
+from ml.packing import pack_examples, plan_packs
+
+CURRICULUM_DEFAULTS = {"start": 0.3, "epochs": 1.0, "stages": 10}
+
+Item = Union[int, Tuple[int, ...]]
+
+
+def record_weights(attributes: Dict[str, Tuple[np.ndarray, List[str]]], weights: Dict[str, Dict[str, float]], n: int) -> np.ndarray:
+    """Waga per przykład: iloczyn mnożników z `weights` dla wartości jego pól."""
+    result = np.ones(n, dtype=np.float64)
+    for field, table in weights.items():
+        if field not in attributes:
+            raise ValueError(f"mixture: nieznane pole {field!r} (dostępne: {', '.join(attributes)})")
+        codes, vocab = attributes[field]
+        missing = sorted(set(table) - set(vocab) - {"*"})
+        if missing:
+            print(f"⚠️  mixture.{field}: brak w danych: {', '.join(missing)}")
+        factors = np.array([float(table.get(value, table.get("*", 1.0))) for value in vocab] or [1.0])
+        if (factors < 0).any():
+            raise ValueError(f"mixture.{field}: wagi muszą być >= 0")
+        result *= factors[codes]
+    return result
+
+
+class MixtureSampler(Sampler):
+    def __init__(
+        self,
+        lengths: Sequence[int],
+        attributes: Dict[str, Tuple[np.ndarray, List[str]]],
+        weights: Optional[Dict[str, Dict[str, float]]] = None,
+        max_length: Optional[int] = None,
+        epoch_size: Optional[int] = None,
+        curriculum: Optional[Dict[str, Any]] = None,
+        seed: int = 42,
+    ):
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.attributes = attributes
+        self.max_length = max_length  # None => pojedyncze przykłady, liczba => spakowane sekwencje
+        self.seed = seed
+        self.curriculum = dict(CURRICULUM_DEFAULTS, **curriculum) if curriculum else None
+        n = len(self.lengths)
+        self.weights = record_weights(attributes, weights or {}, n)
+        if n == 0 or not self.weights.any():
+            raise ValueError("mixture: wszystkie wagi zerowe albo brak przykładów")
+        self.epoch_size = epoch_size or int((self.weights > 0).sum())
+        # Trudność = percentyl długości; shard posortowany po trudności => kwalifikujące się
+        # przykłady to prefiks (searchsorted)
+        self.difficulty = np.empty(n, dtype=np.float64)
+        self.difficulty[np.argsort(self.lengths, kind="stable")] = np.arange(n) / max(n - 1, 1)
+        keys = np.stack([codes for codes, _ in attributes.values()], axis=1) if attributes else np.zeros((n, 1))
+        _, shard_of = np.unique(keys, axis=0, return_inverse=True)
+        self.shards: List[np.ndarray] = []
+        for shard in range(int(shard_of.max()) + 1):
+            members = np.flatnonzero((shard_of.reshape(-1) == shard) & (self.weights > 0))
+            if len(members):
+                self.shards.append(members[np.argsort(self.difficulty[members], kind="stable")])
+        self.shard_weight = np.array([self.weights[s[0]] for s in self.shards])
+        self.num_items = len(self._plan(np.random.default_rng(seed), [(self.epoch_size, 1.0)]))
+        self.set_epoch(0)
+
+    def _competence(self, progress: float) -> float:
+        if self.curriculum is None:
+            return 1.0
+        start, epochs = self.curriculum["start"], self.curriculum["epochs"]
+        return 1.0 if epochs <= 0 else min(1.0, start + (1.0 - start) * progress / epochs)
+
+    def _stages(self, epoch: int) -> List[Tuple[int, float]]:
+        """(liczba przykładów, kompetencja) per etap epoki."""
+        if self.curriculum is None or self._competence(epoch) >= 1.0:
+            return [(self.epoch_size, 1.0)]
+        stages = max(1, int(self.curriculum["stages"]))
+        bounds = [round(self.epoch_size * s / stages) for s in range(stages + 1)]
+        return [(bounds[s + 1] - bounds[s], self._competence(epoch + (s + 1) / stages)) for s in range(stages)]
+
+    def _draw(self, rng: np.random.Generator, count: int, competence: float) -> np.ndarray:
+        eligible = [s[: np.searchsorted(self.difficulty[s], competence, side="right")] for s in self.shards]
+        mass = np.array([w * len(e) for w, e in zip(self.shard_weight, eligible)])
+        if count == 0 or not mass.any():
+            return np.zeros(0, dtype=np.int64)
+        drawn = []
+        for members, k in zip(eligible, rng.multinomial(count, mass / mass.sum())):
+            if k:
+                reps = math.ceil(k / len(members))
+                drawn.append(np.concatenate([rng.permutation(members) for _ in range(reps)])[:k])
+        return rng.permutation(np.concatenate(drawn))
+
+    def _plan(self, rng: np.random.Generator, stages: List[Tuple[int, float]]) -> List[Item]:
+        items: List[Item] = []
+        for count, competence in stages:
+            records = self._draw(rng, count, competence)
+            if self.max_length is None:
+                items.extend(int(i) for i in records)
+                continue
+            packs = plan_packs(self.lengths[records].tolist(), self.max_length)
+            items.extend(tuple(int(records[i]) for i in packs[p]) for p in rng.permutation(len(packs)))
+        return items
+
+    def plan(self, epoch: int) -> List[Item]:
+        rng = np.random.default_rng([self.seed, epoch])
+        stages = self._stages(epoch)
+        items = self._plan(rng, stages)
+        if len(items) > self.num_items:
+            keep = np.sort(rng.choice(len(items), self.num_items, replace=False))
+            items = [items[k] for k in keep]
+        while len(items) < self.num_items:
+            extra = self._plan(rng, [(max(1, stages[-1][0]), stages[-1][1])])
+            items.extend(extra[: self.num_items - len(items)])
+        return items
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+        self.items = self.plan(epoch)
+
+    def __iter__(self) -> Iterator[Item]:
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def epoch_tokens(self) -> int:
+        """Prawdziwe tokeny w planie bieżącej epoki."""
+        return int(sum(self.lengths[list(item) if isinstance(item, tuple) else item].sum() for item in self.items))
+
+    def describe(self) -> Dict[str, Dict[str, Tuple[float, float]]]:
+        """Pole -> wartość -> (udział naturalny, udział w mieszance) wg liczby przykładów."""
+        total_w = self.weights.sum()
+        report = {}
+        for field, (codes, vocab) in self.attributes.items():
+            natural = np.bincount(codes, minlength=len(vocab)) / len(codes)
+            mixed = np.bincount(codes, weights=self.weights, minlength=len(vocab)) / total_w
+            report[field] = {value or "-": (float(natural[k]), float(mixed[k])) for k, value in enumerate(vocab)}
+        return report
+
+
+class MixtureDataset(torch.utils.data.Dataset):
+    """Przykłady/spakowane sekwencje z cache wg indeksów z MixtureSampler (atrybut `sampler`)."""
+
+    def __init__(self, cache: Any, sampler: MixtureSampler):
+        self.cache = cache
+        self.sampler = sampler
+        self.max_length = sampler.max_length
+
+    def __len__(self) -> int:
+        return len(self.sampler)
+
+    def __getitem__(self, item: Item) -> Dict[str, Any]:
+        if isinstance(item, tuple):
+            return next(pack_examples(self.cache, [item], self.max_length))
+        return self.cache[item]
+
+
+def format_mixture(sampler: MixtureSampler, top: int = 8) -> str:
+    lines = []
+    for field, shares in sampler.describe().items():
+        if len(shares) <= 1:
+            continue
+        ranked = sorted(shares.items(), key=lambda kv: -kv[1][1])[:top]
+        lines.append(f"   {field}: " + ", ".join(f"{v} {n:.0%}→{m:.0%}" for v, (n, m) in ranked))
+    return "\n".join(lines)
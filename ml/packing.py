@@ -0,0 +1,262 @@
+"""
+Pakowanie przykładów SFT w pełne sekwencje (zamiast padding="max_length"):
+- plan_packs: best-fit decreasing — przykłady (instruction/response) układane w sekwencje
+  <= max_length; typowo >95% pozycji to prawdziwe tokeny zamiast ~30-50% przy paddingu.
+- Granice przykładów: position_ids liczone od 0 w każdym przykładzie + blokowo-diagonalna
+  maska przyczynowa 4D (PackedCollator, mode="mask" — eager/sdpa), albo spłaszczony batch
+  z samymi position_ids (mode="flatten" — flash_attention_2 wykrywa granice po position_ids).
+- Loss tylko na odpowiedzi (response_only=True): granica promptu liczona raz przy tokenizacji
+  z offsetów znaków (offset_mapping), więc tokeny instrukcji mają label -100, a końcowy EOS
+  zostaje w lossie — także gdy pad_token == eos_token (padding maskują collatory po pozycji,
+  nie po id tokenu). Collatory nie szukają szablonu w batchu.
+- Pierwszy token każdego przykładu ma label -100, więc żaden token nie jest przewidywany
+  z poprzedniego przykładu; suma lossów == suma po przykładach osobno.
+- Alternatywa bez pakowania: length_grouped_batches + PaddingCollator (padding do najdłuższego
+  w batchu; w Trainerze: group_by_length=True).
+
+Benchmark efektywności tokenów i zgodności lossu na CPU: scripts/benchmark_packing.py.
+"""
+from __future__ import annotations
+
+import bisect
+import random
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import torch
+
+PROMPT_TEMPLATE = "### Instruction:\n{instruction}\n### Response:\n"
+IGNORE_INDEX = -100
+
+
+def format_example(example: Dict[str, Any], eos_token: str = "", template: str = PROMPT_TEMPLATE) -> str:
+    """Tekst przykładu w formacie skryptów treningowych (### Instruction / ### Response)."""
+    return template.format(instruction=example["instruction"]) + example["response"] + eos_token
+
+
+def response_start(tokenizer: Any, text: str, prompt_chars: int, max_length: int) -> Dict[str, Any]:
+    """
+    Tokenizacja + indeks pierwszego tokenu odpowiedzi: pierwszy token zaczynający się
+    w znaku >= prompt_chars (token na granicy, sklejony z końcem promptu, liczy się do promptu).
+    Tokenizery bez offset_mapping (wolne): liczba tokenów samego promptu.
+    """
+    try:
+        enc = tokenizer(text, truncation=True, max_length=max_length, return_offsets_mapping=True)
+    except NotImplementedError:
+        enc = tokenizer(text, truncation=True, max_length=max_length)
+        start = len(tokenizer(text[:prompt_chars], add_special_tokens=True)["input_ids"])
+        return {"input_ids": enc["input_ids"], "start": min(start, len(enc["input_ids"]))}
+    ids = enc["input_ids"]
+    # Tokeny specjalne dodane przez tokenizer (BOS) mają offset (0, 0)
+    start = next(
+        (i for i, (a, b) in enumerate(enc["offset_mapping"]) if a >= prompt_chars and b > a),
+        len(ids),
+    )
+    return {"input_ids": ids, "start": start}
+
+
+def tokenize_example(
+    tokenizer: Any,
+    example: Dict[str, Any],
+    max_length: int,
+    template: str = PROMPT_TEMPLATE,
+    response_only: bool = True,
+) -> Dict[str, List[int]]:
+    """input_ids/labels bez paddingu (obcięte do max_length); response_only: -100 na prompcie."""
+    text = format_example(example, tokenizer.eos_token, template)
+    if not response_only:
+        ids = tokenizer(text, truncation=True, max_length=max_length)["input_ids"]
+        return {"input_ids": ids, "labels": list(ids)}
+    prompt_chars = len(template.format(instruction=example["instruction"]))
+    enc = response_start(tokenizer, text, prompt_chars, max_length)
+    ids, start = enc["input_ids"], enc["start"]
+    return {"input_ids": ids, "labels": [IGNORE_INDEX] * start + ids[start:]}
+
+
+def plan_packs(lengths: Sequence[int], max_length: int) -> List[List[int]]:
+    """
+    Best-fit decreasing: indeksy przykładów per sekwencja. Przykład trafia do sekwencji
+    z najmniejszym wolnym miejscem, które go mieści (wyszukiwanie binarne) — O(n log n).
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    packs: List[List[int]] = []
+    free: List[int] = []       # posortowane wolne miejsca
+    free_pack: List[int] = []  # indeks sekwencji dla free[k]
+    for i in order:
+        length = min(lengths[i], max_length)
+        k = bisect.bisect_left(free, length)
+        if k == len(free):
+            packs.append([i])
+            remaining, pack_idx = max_length - length, len(packs) - 1
+        else:
+            remaining, pack_idx = free.pop(k) - length, free_pack.pop(k)
+            packs[pack_idx].append(i)
+        if remaining > 0:
+            k = bisect.bisect_left(free, remaining)
+            free.insert(k, remaining)
+            free_pack.insert(k, pack_idx)
+    return packs
+
+
+def pack_examples(examples: Sequence[Dict[str, List[int]]], plan: Sequence[Sequence[int]], max_length: int) -> Iterator[Dict[str, List[int]]]:
+    """Sklejone sekwencje wg planu: input_ids, labels (-100 na początku przykładów), position_ids."""
+    for pack in plan:
+        input_ids: List[int] = []
+        labels: List[int] = []
+        position_ids: List[int] = []
+        for i in pack:
+            ids = examples[i]["input_ids"][:max_length]
+            lab = list(examples[i]["labels"][:max_length])
+            lab[0] = IGNORE_INDEX
+            input_ids.extend(ids)
+            labels.extend(lab)
+            position_ids.extend(range(len(ids)))
+        yield {"input_ids": input_ids, "labels": labels, "position_ids": position_ids}
+
+
+def tokenize_dataset(
+    dataset: Any,
+    tokenizer: Any,
+    max_length: int,
+    num_proc: Optional[int] = None,
+    template: str = PROMPT_TEMPLATE,
+    response_only: bool = True,
+) -> Any:
+    """datasets.Dataset (instruction/response) -> input_ids/labels bez paddingu (do PaddingCollator)."""
+    return dataset.map(
+        lambda ex: tokenize_example(tokenizer, ex, max_length, template, response_only),
+        remove_columns=dataset.column_names,
+        num_proc=num_proc,
+    )
+
+
+def build_packed_dataset(
+    dataset: Any,
+    tokenizer: Any,
+    max_length: int,
+    num_proc: Optional[int] = None,
+    template: str = PROMPT_TEMPLATE,
+    response_only: bool = True,
+) -> Any:
+    """datasets.Dataset (instruction/response) -> spakowany Dataset (input_ids/labels/position_ids)."""
+    from datasets import Dataset
+
+    tokenized = tokenize_dataset(dataset, tokenizer, max_length, num_proc, template, response_only)
+    lengths = tokenized.map(
+        lambda batch: {"length": [len(ids) for ids in batch["input_ids"]]},
+        batched=True,
+        remove_columns=tokenized.column_names,
+    )["length"]
+    plan = plan_packs(lengths, max_length)
+    return Dataset.from_list(list(pack_examples(tokenized, plan, max_length)))
+
+
+def _round_up(n: int, multiple: Optional[int]) -> int:
+    return n if not multiple else (n + multiple - 1) // multiple * multiple
+
+
+def _segments(position_ids: Sequence[int]) -> List[int]:
+    """Długości przykładów w sekwencji (nowy przykład zaczyna się od position_id == 0)."""
+    starts = [i for i, p in enumerate(position_ids) if p == 0] + [len(position_ids)]
+    return [b - a for a, b in zip(starts, starts[1:])]
+
+
+def block_causal_mask(seq_lens_batch: Sequence[Sequence[int]], length: int, dtype: torch.dtype = torch.float32) -> torch.Tensor:
+    """
+    Addytywna maska (B, 1, L, L): 0 gdzie wolno patrzeć (ten sam przykład, pozycja <= bieżącej),
+    min(dtype) w pozostałych miejscach. Pozycje paddingu widzą tylko siebie (bez NaN w softmax).
+    """
+    allowed = torch.zeros(len(seq_lens_batch), length, length, dtype=torch.bool)
+    causal = torch.ones(length, length, dtype=torch.bool).tril()
+    for b, seq_lens in enumerate(seq_lens_batch):
+        start = 0
+        for n in seq_lens:
+            allowed[b, start:start + n, start:start + n] = causal[:n, :n]
+            start += n
+        idx = torch.arange(start, length)
+        allowed[b, idx, idx] = True
+    mask = torch.zeros(allowed.shape, dtype=dtype)
+    mask.masked_fill_(~allowed, torch.finfo(dtype).min)
+    return mask[:, None]
+
+
+class PackedCollator:
+    """
+    Batch ze spakowanych sekwencji.
+    mode="mask":    padding do najdłuższej (wielokrotność pad_to_multiple_of) + maska 4D.
+    mode="flatten": jeden wiersz z całego batcha, tylko position_ids (flash_attention_2).
+    """
+
+    def __init__(self, pad_token_id: int, mode: str = "mask", dtype: torch.dtype = torch.float32, pad_to_multiple_of: Optional[int] = 8):
+        if mode not in ("mask", "flatten"):
+            raise ValueError(f"PackedCollator: nieznany tryb {mode!r}")
+        self.pad_token_id = pad_token_id
+        self.mode = mode
+        self.dtype = dtype
+        self.pad_to_multiple_of = pad_to_multiple_of
+
+    def __call__(self, features: List[Dict[str, Any]]) -> Dict[str, torch.Tensor]:
+        if self.mode == "flatten":
+            return {
+                key: torch.tensor([[x for f in features for x in f[key]]], dtype=torch.long)
+                for key in ("input_ids", "labels", "position_ids")
+            }
+        length = _round_up(max(len(f["input_ids"]) for f in features), self.pad_to_multiple_of)
+        input_ids = torch.full((len(features), length), self.pad_token_id, dtype=torch.long)
+        labels = torch.full((len(features), length), IGNORE_INDEX, dtype=torch.long)
+        position_ids = torch.zeros((len(features), length), dtype=torch.long)
+        for b, f in enumerate(features):
+            n = len(f["input_ids"])
+            input_ids[b, :n] = torch.tensor(f["input_ids"])
+            labels[b, :n] = torch.tensor(f["labels"])
+            position_ids[b, :n] = torch.tensor(f["position_ids"])
+        return {
+            "input_ids": input_ids,
+            "labels": labels,
+            "position_ids": position_ids,
+            "attention_mask": block_causal_mask([_segments(f["position_ids"]) for f in features], length, self.dtype),
+        }
+
+
+class PaddingCollator:
+    """Dynamiczny padding do najdłuższego przykładu w batchu (bez pakowania)."""
+
+    def __init__(self, pad_token_id: int, pad_to_multiple_of: Optional[int] = 8):
+        self.pad_token_id = pad_token_id
+        self.pad_to_multiple_of = pad_to_multiple_of
+
+    def __call__(self, features: List[Dict[str, Any]]) -> Dict[str, torch.Tensor]:
+        length = _round_up(max(len(f["input_ids"]) for f in features), self.pad_to_multiple_of)
+        batch = {
+            "input_ids": torch.full((len(features), length), self.pad_token_id, dtype=torch.long),
+            "labels": torch.full((len(features), length), IGNORE_INDEX, dtype=torch.long),
+            "attention_mask": torch.zeros((len(features), length), dtype=torch.long),
+        }
+        for b, f in enumerate(features):
+            n = len(f["input_ids"])
+            batch["input_ids"][b, :n] = torch.tensor(f["input_ids"])
+            batch["labels"][b, :n] = torch.tensor(f["labels"])
+            batch["attention_mask"][b, :n] = 1
+        return batch
+
+
+def length_grouped_batches(lengths: Sequence[int], batch_size: int, seed: int = 42, mega_batch_mult: int = 50) -> List[List[int]]:
+    """
+    Batche o podobnych długościach: losowe "mega-batche" (batch_size * mega_batch_mult)
+    sortowane po długości i cięte na batche; kolejność batchy losowa (jak group_by_length).
+    """
+    rng = random.Random(seed)
+    indices = list(range(len(lengths)))
+    rng.shuffle(indices)
+    mega = batch_size * mega_batch_mult
+    batches: List[List[int]] = []
+    for start in range(0, len(indices), mega):
+        chunk = sorted(indices[start:start + mega], key=lambda i: lengths[i], reverse=True)
+        batches.extend(chunk[k:k + batch_size] for k in range(0, len(chunk), batch_size))
+    rng.shuffle(batches)
+    return batches
+
+
+def token_efficiency(real_tokens: Iterable[int], padded_positions: Iterable[int]) -> float:
+    """Udział prawdziwych tokenów we wszystkich przetwarzanych pozycjach."""
+    real, total = sum(real_tokens), sum(padded_positions)
+    return real / total if total else 0.0
@@ -0,0 +1,296 @@
+"""
+Profil przepustowości i pamięci treningu (GPU i CPU):
+- StepProfiler: czasy faz kroku (data — oczekiwanie na batch, compute — forward/backward,
+  optimizer — krok optymalizatora, other — logowanie/ewaluacja/zapis), tokeny prawdziwe
+  (bez paddingu), pozycje, tokeny w lossie, szczytowa pamięć; rekord JSONL na krok optymalizatora.
+- CountingCollator: zlicza tokeny batchy w collatorze (wymaga dataloader_num_workers=0 — przy
+  workerach liczniki zostają w podprocesach i metryki tokenów są puste).
+- ProfilerCallback: to samo w transformers.Trainer (zdarzenia on_step_begin /
+  on_pre_optimizer_step / on_step_end); podsumowanie na końcu treningu.
+- Pętla własna:
+      prof = StepProfiler("profile.jsonl")
+      for batch in prof.iter_batches(loader):
+          loss = model(**batch).loss; loss.backward()
+          prof.lap("compute"); optimizer.step(); optimizer.zero_grad()
+          prof.lap("optimizer"); prof.step()
+
+CLI: python ml/profiler.py summary profile.jsonl [inny.jsonl]   # drugi plik => porównanie A/B
+"""
+from __future__ import annotations
+
+import json
+import resource
+import statistics
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import torch
+
+try:
+    import psutil
+except ImportError:  # pamięć bieżąca tylko z psutil; szczyt z resource działa bez niego
+    psutil = None
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ml.packing import IGNORE_INDEX
+
+PHASES = ("data", "compute", "optimizer", "other")
+# ru_maxrss: KB na Linuksie, bajty na macOS
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def _mb(n_bytes: float) -> float:
+    return round(n_bytes / 1024 ** 2, 1)
+
+
+class StepProfiler:
+    def __init__(self, path: Optional[Path] = None, sync_cuda: bool = True, warmup_steps: int = 1):
+        self.path = Path(path) if path else None
+        self.sync_cuda = sync_cuda and torch.cuda.is_available()
+        self.warmup_steps = warmup_steps
+        self.records: List[Dict[str, Any]] = []
+        # Liczniki per batch w kolejności collatora — dataloader pobiera batch z wyprzedzeniem,
+        # więc krok zabiera tyle najstarszych wpisów, ile miał mikro-batchy
+        self._pending: deque = deque()
+        self._mark = 0
+        self._file = None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("w", encoding="utf-8")
+        self._reset_step()
+        self._last = self._now()
+
+    def _now(self) -> float:
+        if self.sync_cuda:
+            torch.cuda.synchronize()
+        return time.perf_counter()
+
+    def _reset_step(self) -> None:
+        self._phases = dict.fromkeys(PHASES, 0.0)
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+
+    def reset_clock(self) -> None:
+        self._last = self._now()
+
+    def lap(self, phase: str) -> None:
+        """Czas od poprzedniego lap() przypisany fazie phase."""
+        now = self._now()
+        self._phases[phase] += now - self._last
+        self._last = now
+
+    def count(self, real_tokens: int, positions: int, loss_tokens: int) -> None:
+        self._pending.append((real_tokens, positions, loss_tokens))
+
+    def count_batch(self, features: List[Dict[str, Any]], batch: Dict[str, torch.Tensor]) -> None:
+        self.count(
+            sum(len(f["input_ids"]) for f in features),
+            batch["input_ids"].numel(),
+            int((batch["labels"] != IGNORE_INDEX).sum()) if "labels" in batch else 0,
+        )
+
+    def mark(self) -> None:
+        self._mark = len(self._pending)
+
+    def discard_since_mark(self) -> None:
+        """Batche spoza treningu (ewaluacja po mark()) nie wchodzą do liczników kroków."""
+        while len(self._pending) > self._mark:
+            self._pending.pop()
+
+    def _take(self, batches: Optional[int]) -> Dict[str, int]:
+        n = len(self._pending) if batches is None else min(batches, len(self._pending))
+        counts = {"real_tokens": 0, "positions": 0, "loss_tokens": 0, "batches": n}
+        for _ in range(n):
+            real, positions, loss = self._pending.popleft()
+            counts["real_tokens"] += real
+            counts["positions"] += positions
+            counts["loss_tokens"] += loss
+        return counts
+
+    def iter_batches(self, loader: Iterable[Dict[str, torch.Tensor]], count: bool = True) -> Iterator[Dict[str, torch.Tensor]]:
+        """
+        Pętla własna: czas oczekiwania na batch = faza data. count=True liczy tokeny z batcha
+        (maska 2D; przy masce 4D pakowania wszystkie pozycje) — dokładnie: collator opakowany
+        w CountingCollator i count=False.
+        """
+        self.reset_clock()
+        for batch in loader:
+            self.lap("data")
+            if not count:
+                yield batch
+                continue
+            positions = batch["input_ids"].numel()
+            labels = batch.get("labels")
+            # Bez listy cech: prawdziwe tokeny = pozycje z etykietą lub maską uwagi 2D
+            mask = batch.get("attention_mask")
+            real = int(mask.sum()) if mask is not None and mask.dim() == 2 else positions
+            self.count(real, positions, int((labels != IGNORE_INDEX).sum()) if labels is not None else 0)
+            yield batch
+
+    def _memory(self) -> Dict[str, Any]:
+        mem: Dict[str, Any] = {"peak_rss_mb": _mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT)}
+        if psutil is not None:
+            mem["rss_mb"] = _mb(psutil.Process().memory_info().rss)
+        if torch.cuda.is_available():
+            mem["cuda_peak_allocated_mb"] = _mb(torch.cuda.max_memory_allocated())
+            mem["cuda_peak_reserved_mb"] = _mb(torch.cuda.max_memory_reserved())
+        return mem
+
+    def step(self, step: Optional[int] = None, batches: Optional[int] = None, **extra: Any) -> Dict[str, Any]:
+        """Zamyka krok (batches — liczba mikro-batchy kroku, None = wszystkie zliczone): rekord JSONL."""
+        step_s = sum(self._phases.values())
+        counts = self._take(batches)
+        record: Dict[str, Any] = {
+            "step": step if step is not None else len(self.records) + 1,
+            "step_s": round(step_s, 6),
+            **{f"{phase}_s": round(t, 6) for phase, t in self._phases.items()},
+            **counts,
+            "padding_ratio": round(1 - counts["real_tokens"] / counts["positions"], 4) if counts["positions"] else None,
+            "tokens_per_s": round(counts["real_tokens"] / step_s, 1) if step_s and counts["real_tokens"] else None,
+            **self._memory(),
+            **extra,
+        }
+        self.records.append(record)
+        if self._file:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+        self._reset_step()
+        return record
+
+    def summary(self) -> Dict[str, Any]:
+        return summarize(self.records, self.warmup_steps)
+
+    def close(self) -> Dict[str, Any]:
+        result = self.summary()
+        if self._file:
+            self._file.write(json.dumps({"summary": result}) + "\n")
+            self._file.close()
+            self._file = None
+        return result
+
+
+def summarize(records: List[Dict[str, Any]], warmup_steps: int = 1) -> Dict[str, Any]:
+    """Podsumowanie kroków po rozgrzewce (pierwsze kroki: kompilacja, alokacje, cache)."""
+    steps = [r for r in records if "step_s" in r]
+    measured = steps[warmup_steps:] or steps
+    if not measured:
+        return {}
+    total_s = sum(r["step_s"] for r in measured)
+    real = sum(r["real_tokens"] for r in measured)
+    positions = sum(r["positions"] for r in measured)
+    out: Dict[str, Any] = {
+        "steps": len(measured),
+        "warmup_steps": len(steps) - len(measured),
+        "step_s_mean": round(total_s / len(measured), 6),
+        "step_s_p50": round(statistics.median(r["step_s"] for r in measured), 6),
+        **{f"{p}_share": round(sum(r[f"{p}_s"] for r in measured) / total_s, 4) if total_s else None for p in PHASES},
+        "real_tokens": real,
+        "loss_tokens": sum(r["loss_tokens"] for r in measured),
+        "tokens_per_s": round(real / total_s, 1) if total_s and real else None,
+        "padding_ratio": round(1 - real / positions, 4) if positions else None,
+    }
+    for key in ("peak_rss_mb", "rss_mb", "cuda_peak_allocated_mb", "cuda_peak_reserved_mb"):
+        values = [r[key] for r in measured if key in r]
+        if values:
+            out[key] = max(values)
+    return out
+
+
+class CountingCollator:
+    """Opakowanie collatora: każdy batch doliczany do bieżącego kroku profilera."""
+
+    def __init__(self, collator: Callable[[List[Dict[str, Any]]], Dict[str, torch.Tensor]], profiler: StepProfiler):
+        self.collator = collator
+        self.profiler = profiler
+
+    def __call__(self, features: List[Dict[str, Any]]) -> Dict[str, torch.Tensor]:
+        batch = self.collator(features)
+        self.profiler.count_batch(features, batch)
+        return batch
+
+
+def _format_summary(summary: Dict[str, Any]) -> str:
+    shares = " ".join(f"{p} {summary[f'{p}_share']:.0%}" for p in PHASES if summary.get(f"{p}_share") is not None)
+    mem = summary.get("cuda_peak_allocated_mb") or summary.get("peak_rss_mb")
+    return (
+        f"{summary.get('tokens_per_s') or 0:,.0f} tokenów/s, krok {summary['step_s_mean'] * 1000:.1f} ms "
+        f"({shares}), padding {summary.get('padding_ratio') or 0:.1%}, pamięć {mem} MB"
+    )
+
+
+try:
+    from transformers import TrainerCallback
+except ImportError:  # profiler pętli własnej działa bez transformers
+    TrainerCallback = object  # type: ignore[misc,assignment]
+
+
+class ProfilerCallback(TrainerCallback):
+    """
+    Callback transformers.Trainer. Faza data = od końca poprzedniego kroku (lub logowania/
+    ewaluacji/zapisu) do on_step_begin — Trainer pobiera wtedy wszystkie mikro-batche kroku.
+    """
+
+    def __init__(self, profiler: StepProfiler):
+        self.profiler = profiler
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self.profiler.reset_clock()
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        self.profiler.lap("data")
+
+    def on_pre_optimizer_step(self, args, state, control, **kwargs):
+        self.profiler.lap("compute")
+
+    def on_step_end(self, args, state, control, **kwargs):
+        self.profiler.lap("optimizer")
+        self.profiler.step(state.global_step, batches=args.gradient_accumulation_steps)
+        self.profiler.mark()
+
+    def on_log(self, args, state, control, **kwargs):
+        self.profiler.lap("other")
+
+    def on_evaluate(self, args, state, control, **kwargs):
+        self.profiler.lap("other")
+        self.profiler.discard_since_mark()
+
+    def on_save(self, args, state, control, **kwargs):
+        self.profiler.lap("other")
+
+    def on_train_end(self, args, state, control, **kwargs):
+        summary = self.profiler.close()
+        if summary:
+            print(f"⏱️  {_format_summary(summary)}")
+
+
+def _load(path: Path) -> List[Dict[str, Any]]:
+    with Path(path).open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Podsumowanie profilu treningu (JSONL)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    summary = sub.add_parser("summary", help="Podsumowanie pliku; dwa pliki => porównanie A/B")
+    summary.add_argument("paths", type=Path, nargs="+")
+    summary.add_argument("--warmup-steps", type=int, default=1)
+    args = parser.parse_args()
+
+    results = [summarize(_load(p), args.warmup_steps) for p in args.paths[:2]]
+    for path, result in zip(args.paths, results):
+        print(f"{path}: {_format_summary(result)}")
+    if len(results) == 2 and results[0].get("tokens_per_s") and results[1].get("tokens_per_s"):
+        a, b = results
+        print(f"B/A: tokeny/s x{b['tokens_per_s'] / a['tokens_per_s']:.3f}, "
+              f"krok x{b['step_s_mean'] / a['step_s_mean']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,662 @@
+"""
+Lokalny serwer generacji (API zgodne z OpenAI) z ciągłym batchowaniem:
+- Model bazowy ładowany raz (ml/generation.py: load_model / tiny_model); adaptery LoRA w puli
+  LRU (ml/adapters.py) — żądanie wybiera adapter polem "model" albo "adapter", wiersze z różnymi
+  adapterami idą w jednym forwardzie, nowy checkpoint można podmienić w biegu (POST /v1/adapters).
+- Wątek silnika: nowe żądania dołączają do biegnącego batcha po każdym kroku dekodowania
+  (prefill nowych, scalenie cache KV z lewym paddingiem do wspólnej długości); zakończone
+  wiersze wypadają z batcha, puste kolumny z lewej są przycinane.
+- Parametry per żądanie: max_tokens, temperature, top_p, stop, seed.
+- Strumieniowanie (SSE, "stream": true): tekst wysyłany przyrostowo; fragment, który może być
+  początkiem sekwencji stop albo niepełnym znakiem UTF-8, czeka na kolejne tokeny.
+- Metryki (GET /metrics): kolejka, rozmiar batcha, TTFT i opóźnienie (p50/p95/p99), tokeny/s;
+  per adapter (porównanie champion/challenger) i stan puli adapterów.
+
+Endpointy: POST /v1/completions (prompt surowy), POST /v1/chat/completions i POST /generate
+(instrukcja w szablonie treningowym), GET /v1/models, /health, /metrics, GET/POST /v1/adapters.
+Wersja modelu (baza+adapter) w nagłówku X-Model-Version (docs/system_architecture.md).
+
+Użycie:
+    python ml/server.py --model meta-llama/Llama-3.1-8B-Instruct --adapter results_rtx4090/final
+    python ml/server.py --model mistralai/Mistral-7B-Instruct-v0.3 \
+        --adapter champion=results_mistral_standard/final --adapter challenger=results_mistral_no_quant/final
+    python ml/server.py --tiny --port 8000           # CPU, mały losowy model (testy)
+    python ml/server.py --tiny --tiny-adapters 3     # + losowe adaptery tiny-0..2
+Obciążenie: scripts/load_test_server.py.
+"""
+from __future__ import annotations
+
+import json
+import queue
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+import torch
+import torch.nn.functional as F
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ml.adapters import AdapterPool
+from ml.generation import STOP_SEQUENCES
+from ml.packing import PROMPT_TEMPLATE
+
+METRICS_WINDOW = 1000  # ostatnie żądania w percentylach
+RATE_WINDOW_S = 10.0  # okno tokenów/s
+
+
+@dataclass
+class Request:
+    prompt_ids: List[int]
+    max_tokens: int = 200
+    temperature: float = 0.8
+    top_p: float = 0.9
+    stop: Sequence[str] = ()
+    seed: Optional[int] = None
+    adapter: Optional[str] = None  # nazwa z puli; None = model bazowy
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:24])
+    events: "queue.Queue[Optional[str]]" = field(default_factory=queue.Queue)  # delty tekstu, None = koniec
+    generated: List[int] = field(default_factory=list)
+    text: str = ""
+    sent: int = 0  # znaki tekstu już wysłane
+    finish_reason: Optional[str] = None
+    error: Optional[str] = None
+    arrived: float = field(default_factory=time.perf_counter)
+    first_token: Optional[float] = None
+    finished: Optional[float] = None
+    generator: Optional[torch.Generator] = None
+    slot: Optional[str] = None  # slot adaptera przypięty w silniku
+
+    def timings(self) -> Dict[str, Optional[float]]:
+        return {
+            "ttft_s": round(self.first_token - self.arrived, 4) if self.first_token else None,
+            "latency_s": round(self.finished - self.arrived, 4) if self.finished else None,
+        }
+
+
+def _percentiles(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(values)
+    return {f"p{q}": round(ordered[min(len(ordered) - 1, q * len(ordered) // 100)], 4) for q in (50, 95, 99)}
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = self.completed = self.errors = 0
+        self.prompt_tokens = self.generated_tokens = 0
+        self.ttft: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self.latency: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self.token_times: Deque[tuple] = deque()  # (czas, tokeny) kroków dekodowania
+        self.batch_sizes: Deque[int] = deque(maxlen=METRICS_WINDOW)
+        self.queue_depth = self.active = 0
+        self.per_adapter: Dict[str, Dict[str, Any]] = {}
+
+    def step(self, tokens: int, batch: int) -> None:
+        now = time.perf_counter()
+        with self.lock:
+            self.generated_tokens += tokens
+            self.token_times.append((now, tokens))
+            while self.token_times and now - self.token_times[0][0] > RATE_WINDOW_S:
+                self.token_times.popleft()
+            self.batch_sizes.append(batch)
+
+    def finish(self, request: Request) -> None:
+        with self.lock:
+            self.completed += 1
+            if request.error:
+                self.errors += 1
+            if request.first_token:
+                self.ttft.append(request.first_token - request.arrived)
+            self.latency.append(request.finished - request.arrived)
+            stats = self.per_adapter.setdefault(
+                request.adapter or "base",
+                {"completed": 0, "errors": 0, "generated_tokens": 0, "latency": deque(maxlen=METRICS_WINDOW)},
+            )
+            stats["completed"] += 1
+            stats["errors"] += bool(request.error)
+            stats["generated_tokens"] += len(request.generated)
+            stats["latency"].append(request.finished - request.arrived)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            now = time.perf_counter()
+            recent = [n for t, n in self.token_times if now - t <= RATE_WINDOW_S]
+            span = min(RATE_WINDOW_S, time.time() - self.started)
+            return {
+                "uptime_s": round(time.time() - self.started, 1),
+                "queue_depth": self.queue_depth,
+                "active_requests": self.active,
+                "requests": self.requests,
+                "completed": self.completed,
+                "errors": self.errors,
+                "prompt_tokens": self.prompt_tokens,
+                "generated_tokens": self.generated_tokens,
+                "tokens_per_s": round(sum(recent) / span, 1) if span > 0 else None,
+                "mean_batch_size": round(sum(self.batch_sizes) / len(self.batch_sizes), 2) if self.batch_sizes else None,
+                "ttft_s": _percentiles(self.ttft),
+                "latency_s": _percentiles(self.latency),
+                "adapters": {
+                    name: dict({k: v for k, v in stats.items() if k != "latency"}, latency_s=_percentiles(stats["latency"]))
+                    for name, stats in self.per_adapter.items()
+                },
+            }
+
+
+# --- cache KV batcha ----------------------------------------------------------------
+# DynamicCache: warstwy z keys/values [batch, heads, seq, head_dim]; wiersze wyrównane do prawej
+
+
+def _pad_left(cache: Any, n: int) -> None:
+    if n:
+        for layer in cache.layers:
+            layer.keys = F.pad(layer.keys, (0, 0, n, 0))
+            layer.values = F.pad(layer.values, (0, 0, n, 0))
+
+
+def _concat(cache: Any, other: Any) -> None:
+    for layer, extra in zip(cache.layers, other.layers):
+        layer.keys = torch.cat([layer.keys, extra.keys])
+        layer.values = torch.cat([layer.values, extra.values])
+
+
+def _trim_left(cache: Any, n: int) -> None:
+    if n:
+        for layer in cache.layers:
+            layer.keys = layer.keys[:, :, n:]
+            layer.values = layer.values[:, :, n:]
+
+
+class Engine:
+    """Pętla ciągłego batchowania w osobnym wątku; submit() z wątków HTTP."""
+
+    def __init__(
+        self, model: Any, tokenizer: Any, max_batch: int = 16, max_prompt_tokens: int = 2048, pool: Optional[AdapterPool] = None
+    ):
+        self.pool = pool or AdapterPool(model.eval())
+        self.tokenizer = tokenizer
+        self.max_batch = max_batch
+        self.max_prompt_tokens = max_prompt_tokens
+        self.pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.eos_ids = {tokenizer.eos_token_id} - {None}
+        self.device = next(model.parameters()).device
+        self.metrics = Metrics()
+        self.pending: "queue.Queue[Request]" = queue.Queue()
+        self.waiting: Deque[Request] = deque()  # czekają na miejsce w puli adapterów
+        self.stop_event = threading.Event()
+        # Stan biegnącego batcha
+        self.active: List[Request] = []
+        self.cache: Any = None
+        self.mask: Optional[torch.Tensor] = None
+        self.positions: Optional[torch.Tensor] = None  # pozycja ostatniego tokenu per wiersz
+        self.last_tokens: Optional[torch.Tensor] = None
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self) -> "Engine":
+        self.thread.start()
+        return self
+
+    def shutdown(self) -> None:
+        self.stop_event.set()
+        self.thread.join(timeout=5)
+
+    def submit(self, request: Request) -> Request:
+        request.prompt_ids = request.prompt_ids[-self.max_prompt_tokens:]
+        if request.seed is not None:
+            request.generator = torch.Generator().manual_seed(request.seed)
+        with self.metrics.lock:
+            self.metrics.requests += 1
+            self.metrics.prompt_tokens += len(request.prompt_ids)
+            self.metrics.queue_depth += 1
+        self.pending.put(request)
+        return request
+
+    # --- pętla ----------------------------------------------------------------------
+
+    def _loop(self) -> None:
+        while not self.stop_event.is_set():
+            admitted: List[Request] = []
+            try:
+                admitted = self._admit()
+                if not self.active and not admitted:
+                    continue
+                if admitted:
+                    self._prefill(admitted)
+                if self.active:
+                    self._decode_step()
+            except Exception as e:  # błąd modelu kończy bieżące żądania, serwer działa dalej
+                for request in self.active + admitted:
+                    if request.finish_reason is None:  # przyjęte w tym kroku mogą nie być jeszcze w batchu
+                        request.error = f"{type(e).__name__}: {e}"
+                        self._finish(request, "error")
+                self.active, self.cache = [], None
+                with self.metrics.lock:
+                    self.metrics.active = 0
+
+    def _admit(self) -> List[Request]:
+        candidates: List[Request] = list(self.waiting)
+        self.waiting.clear()
+        if not self.active and not candidates:
+            try:  # bezczynny silnik czeka na pierwsze żądanie
+                candidates.append(self.pending.get(timeout=0.1))
+            except queue.Empty:
+                return []
+        while len(self.active) + len(candidates) < self.max_batch:
+            try:
+                candidates.append(self.pending.get_nowait())
+            except queue.Empty:
+                break
+        admitted: List[Request] = []
+        for r in candidates:
+            # Adapter spoza puli, a wszystkie sloty zajęte przez batch — czeka na zwolnienie
+            if not self.pool.can_acquire(r.adapter):
+                self.waiting.append(r)
+                continue
+            with self.metrics.lock:
+                self.metrics.queue_depth -= 1
+            try:
+                r.slot = self.pool.acquire(r.adapter)
+            except Exception as e:
+                r.error = f"adapter {r.adapter}: {type(e).__name__}: {e}"
+                self._finish(r, "error")
+                continue
+            admitted.append(r)
+        return admitted
+
+    def _forward(self, requests: Sequence[Request], **kwargs: Any) -> Any:
+        return self.pool.model(**kwargs, **self.pool.forward_kwargs([r.slot for r in requests]))
+
+    @torch.no_grad()
+    def _prefill(self, requests: List[Request]) -> None:
+        from transformers import DynamicCache
+
+        width = max(len(r.prompt_ids) for r in requests)
+        input_ids = torch.full((len(requests), width), self.pad_id, dtype=torch.long)
+        mask = torch.zeros((len(requests), width), dtype=torch.long)
+        for b, r in enumerate(requests):
+            input_ids[b, width - len(r.prompt_ids):] = torch.tensor(r.prompt_ids)
+            mask[b, width - len(r.prompt_ids):] = 1
+        input_ids, mask = input_ids.to(self.device), mask.to(self.device)
+        positions = (mask.cumsum(-1) - 1).clamp(min=0)
+        cache = DynamicCache()
+        out = self._forward(
+            requests, input_ids=input_ids, attention_mask=mask, position_ids=positions,
+            past_key_values=cache, use_cache=True, logits_to_keep=1,
+        )
+        tokens = self._sample(out.logits[:, -1], requests)
+        if self.active:
+            # Wspólna długość: krótszy cache (i maska) dopełniany z lewej
+            length = self.mask.shape[1]
+            if width < length:
+                _pad_left(out.past_key_values, length - width)
+                mask = F.pad(mask, (length - width, 0))
+            elif width > length:
+                _pad_left(self.cache, width - length)
+                self.mask = F.pad(self.mask, (width - length, 0))
+            _concat(self.cache, out.past_key_values)
+            self.mask = torch.cat([self.mask, mask])
+            self.positions = torch.cat([self.positions, positions[:, -1]])
+            self.last_tokens = torch.cat([self.last_tokens, tokens])
+        else:
+            self.cache, self.mask, self.positions, self.last_tokens = out.past_key_values, mask, positions[:, -1], tokens
+        self.active.extend(requests)
+        self._accept(len(self.active) - len(requests), tokens)
+
+    @torch.no_grad()
+    def _decode_step(self) -> None:
+        self.mask = torch.cat([self.mask, self.mask.new_ones((len(self.active), 1))], dim=-1)
+        self.positions = self.positions + 1
+        out = self._forward(
+            self.active, input_ids=self.last_tokens[:, None], attention_mask=self.mask, position_ids=self.positions[:, None],
+            past_key_values=self.cache, use_cache=True,
+        )
+        self.cache = out.past_key_values
+        self.last_tokens = self._sample(out.logits[:, -1], self.active)
+        self._accept(0, self.last_tokens)
+
+    def _sample(self, logits: torch.Tensor, requests: Sequence[Request]) -> torch.Tensor:
+        logits = logits.float()
+        tokens = logits.argmax(-1)
+        for row, r in enumerate(requests):
+            if r.temperature <= 0:
+                continue
+            probs = torch.softmax(logits[row] / r.temperature, dim=-1)
+            if r.top_p < 1.0:
+                sorted_probs, order = probs.sort(descending=True)
+                sorted_probs = sorted_probs * (sorted_probs.cumsum(-1) - sorted_probs < r.top_p)
+                tokens[row] = order[torch.multinomial(sorted_probs.cpu(), 1, generator=r.generator).to(order.device)]
+            else:
+                tokens[row] = torch.multinomial(probs.cpu(), 1, generator=r.generator).to(tokens.device)
+        return tokens
+
+    def _accept(self, offset: int, tokens: torch.Tensor) -> None:
+        """Tokeny wierszy od `offset`: strumień, warunki stopu, usunięcie zakończonych z batcha."""
+        now = time.perf_counter()
+        done = []
+        for row in range(offset, len(self.active)):
+            r = self.active[row]
+            token = int(tokens[row - offset])
+            if r.first_token is None:
+                r.first_token = now
+            if token in self.eos_ids:
+                done.append((row, "stop"))
+                continue
+            r.generated.append(token)
+            r.text = self.tokenizer.decode(r.generated, skip_special_tokens=True)
+            cut = min((r.text.find(s) for s in r.stop if s and s in r.text), default=-1)
+            if cut >= 0:
+                r.text = r.text[:cut]
+                done.append((row, "stop"))
+            elif len(r.generated) >= r.max_tokens:
+                done.append((row, "length"))
+            else:
+                self._stream(r, final=False)
+        self.metrics.step(len(self.active) - offset, len(self.active))
+        if done:
+            for row, reason in done:
+                self._finish(self.active[row], reason)
+            finished = {row for row, _ in done}
+            keep = [row for row in range(len(self.active)) if row not in finished]
+            self.active = [self.active[row] for row in keep]
+            if keep:
+                self._compact(keep)
+            else:
+                self.cache = self.mask = self.positions = self.last_tokens = None
+        with self.metrics.lock:
+            self.metrics.active = len(self.active)
+
+    def _compact(self, keep: List[int]) -> None:
+        """Zostają wiersze `keep`; kolumny z lewej, których nie widzi żaden wiersz, są usuwane."""
+        index = torch.tensor(keep, device=self.device)
+        self.cache.batch_select_indices(index)
+        self.mask, self.positions, self.last_tokens = self.mask[index], self.positions[index], self.last_tokens[index]
+        empty = int((self.mask.sum(0) == 0).int().cumprod(0).sum())
+        if empty:
+            _trim_left(self.cache, empty)
+            self.mask = self.mask[:, empty:]
+
+    def _stream(self, r: Request, final: bool) -> None:
+        text = r.text
+        if not final:
+            # Wstrzymaj możliwy początek sekwencji stop i niepełny znak (U+FFFD)
+            hold = max((len(s) - 1 for s in r.stop), default=0)
+            end = len(text) - hold
+            while end > r.sent and text[end - 1] == "�":
+                end -= 1
+            text = text[:max(end, r.sent)]
+        if len(text) > r.sent:
+            r.events.put(text[r.sent:])
+            r.sent = len(text)
+
+    def _finish(self, r: Request, reason: str) -> None:
+        r.finish_reason = reason
+        r.finished = time.perf_counter()
+        if r.first_token is None:
+            r.first_token = r.finished
+        self._stream(r, final=True)
+        self.pool.release(r.slot)
+        r.slot = None
+        r.events.put(None)
+        self.metrics.finish(r)
+
+
+# --- HTTP ---------------------------------------------------------------------------
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "SatyrAI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def app(self) -> "Server":
+        return self.server.app  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.app.verbose:
+            super().log_message(format, *args)
+
+    def _json(self, status: int, payload: Dict[str, Any], version: Optional[str] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Model-Version", version or self.app.model_version)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._json(200, {"status": "ok", "model": self.app.model_version, "adapters": self.app.engine.pool.names()})
+        elif self.path == "/metrics":
+            self._json(200, dict(self.app.engine.metrics.snapshot(), adapter_pool=self.app.engine.pool.describe()))
+        elif self.path == "/v1/models":
+            models = [self.app.model_version] + self.app.engine.pool.names()
+            self._json(200, {"object": "list", "data": [{"id": m, "object": "model", "owned_by": "satyrai"} for m in models]})
+        elif self.path == "/v1/adapters":
+            self._json(200, self.app.engine.pool.describe())
+        else:
+            self._json(404, {"error": {"message": f"nieznana ścieżka {self.path}"}})
+
+    def do_POST(self) -> None:
+        routes = {"/v1/completions": "completion", "/v1/chat/completions": "chat", "/generate": "generate", "/v1/adapters": "adapter"}
+        kind = routes.get(self.path)
+        if kind is None:
+            self._json(404, {"error": {"message": f"nieznana ścieżka {self.path}"}})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if kind == "adapter":  # rejestracja / podmiana checkpointu adaptera
+                self.app.engine.pool.register(body["name"], body["path"])
+                self._json(200, self.app.engine.pool.describe())
+                return
+            request = self.app.build_request(kind, body)
+        except (ValueError, KeyError, TypeError) as e:
+            self._json(400, {"error": {"message": str(e), "type": "invalid_request_error"}})
+            return
+        self.app.engine.submit(request)
+        if body.get("stream"):
+            self._stream(kind, request)
+        else:
+            text = "".join(iter(request.events.get, None))
+            self._json(500 if request.error else 200, self.app.response(kind, request, text), self.app.version(request))
+
+    def _stream(self, kind: str, request: Request) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.send_header("X-Model-Version", self.app.version(request))
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for delta in iter(request.events.get, None):
+                self._event(self.app.chunk(kind, request, delta, None))
+            self._event(self.app.chunk(kind, request, "", request.finish_reason))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # klient rozłączony; żądanie kończy się w silniku normalnie
+
+    def _event(self, payload: Dict[str, Any]) -> None:
+        self.wfile.write(b"data: " + json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n\n")
+        self.wfile.flush()
+
+
+class Server:
+    def __init__(
+        self,
+        engine: Engine,
+        model_version: str,
+        template: str = PROMPT_TEMPLATE,
+        verbose: bool = False,
+        default_adapter: Optional[str] = None,
+    ):
+        self.engine = engine
+        self.model_version = model_version
+        self.template = template
+        self.verbose = verbose
+        self.default_adapter = default_adapter
+        self.httpd: Optional[ThreadingHTTPServer] = None
+
+    def version(self, request: Request) -> str:
+        return f"{self.model_version}+{request.adapter}" if request.adapter else self.model_version
+
+    def resolve_adapter(self, body: Dict[str, Any]) -> Optional[str]:
+        """Pole "adapter" albo "model" (API OpenAI): nazwa adaptera, model bazowy albo domyślny."""
+        name = body.get("adapter") or body.get("model")
+        if not name:
+            return self.default_adapter
+        if name in (self.model_version, "base"):
+            return None
+        name = name.removeprefix(self.model_version + "+")  # "model" z odpowiedzi serwera
+        available = self.engine.pool.names()
+        if name not in available:
+            raise ValueError(f"nieznany model {name!r} (dostępne: {', '.join([self.model_version] + available)})")
+        return name
+
+    def build_request(self, kind: str, body: Dict[str, Any]) -> Request:
+        if kind == "completion":
+            prompt = body["prompt"]
+            if not isinstance(prompt, str):
+                raise ValueError("prompt: oczekiwany tekst")
+        elif kind == "chat":
+            users = [m["content"] for m in body["messages"] if m.get("role") == "user"]
+            if not users:
+                raise ValueError("messages: brak wiadomości użytkownika")
+            prompt = self.template.format(instruction=users[-1])
+        else:
+            prompt = self.template.format(instruction=body.get("instruction") or body["prompt"])
+        stop = body.get("stop")
+        stop = [stop] if isinstance(stop, str) else list(stop or [])
+        if kind != "completion":
+            stop = stop or list(STOP_SEQUENCES)
+        prompt_ids = self.engine.tokenizer(prompt)["input_ids"]
+        if not prompt_ids:
+            raise ValueError("pusty prompt")
+        return Request(
+            prompt_ids=prompt_ids,
+            max_tokens=int(body.get("max_tokens") or body.get("max_new_tokens") or 200),
+            temperature=float(body.get("temperature", 0.8)),
+            top_p=float(body.get("top_p", 0.9)),
+            stop=stop,
+            seed=body.get("seed"),
+            adapter=self.resolve_adapter(body),
+        )
+
+    def _usage(self, request: Request) -> Dict[str, int]:
+        prompt, completion = len(request.prompt_ids), len(request.generated)
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+    def response(self, kind: str, request: Request, text: str) -> Dict[str, Any]:
+        if request.error:
+            return {"error": {"message": request.error, "type": "server_error"}}
+        base = {"id": request.id, "created": int(time.time()), "model": self.version(request), "usage": self._usage(request)}
+        if kind == "chat":
+            choice = {"index": 0, "message": {"role": "assistant", "content": text.strip()}, "finish_reason": request.finish_reason}
+            return dict(base, object="chat.completion", choices=[choice])
+        if kind == "completion":
+            return dict(base, object="text_completion", choices=[{"index": 0, "text": text, "finish_reason": request.finish_reason}])
+        return dict(base, text=text.strip(), finish_reason=request.finish_reason, timings=request.timings())
+
+    def chunk(self, kind: str, request: Request, delta: str, finish_reason: Optional[str]) -> Dict[str, Any]:
+        base = {"id": request.id, "created": int(time.time()), "model": self.version(request)}
+        if kind == "chat":
+            return dict(base, object="chat.completion.chunk", choices=[{"index": 0, "delta": {"content": delta} if delta else {}, "finish_reason": finish_reason}])
+        chunk = dict(base, object="text_completion", choices=[{"index": 0, "text": delta, "finish_reason": finish_reason}])
+        if finish_reason is not None:
+            chunk["usage"] = self._usage(request)
+        return chunk
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.app = self  # type: ignore[attr-defined]
+        return self.httpd
+
+    def start_background(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serwer w wątku w tle (testy, load test); zwraca bazowy URL."""
+        httpd = self.serve(host, port)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        return f"http://{host}:{httpd.server_address[1]}"
+
+    def shutdown(self) -> None:
+        if self.httpd is not None:
+            self.httpd.shutdown()
+        self.engine.shutdown()
+
+
+def build_server(
+    tiny: bool = False,
+    model: str = "meta-llama/Llama-3.1-8B-Instruct",
+    adapters: Sequence[str] = (),
+    dtype: str = "bfloat16",
+    max_batch: int = 16,
+    verbose: bool = False,
+    max_adapters: int = 4,
+    tiny_adapters: int = 0,
+) -> Server:
+    """`adapters`: specyfikacje "nazwa=katalog" (albo sam katalog); pierwszy jest domyślny."""
+    from ml.adapters import parse_adapter_specs, random_adapters
+    from ml.generation import load_model, tiny_model
+
+    if tiny:
+        lm, tokenizer = tiny_model(ROOT / "results_cpu_smoke")
+        version = "tiny-llama-random"
+    else:
+        lm, tokenizer = load_model(model, None, dtype)
+        version = model
+    registry = parse_adapter_specs(adapters)
+    if tiny and tiny_adapters:
+        names = [f"tiny-{i}" for i in range(tiny_adapters)]
+        registry.update(random_adapters(lm, ROOT / "results_cpu_smoke" / "adapters", names))
+    pool = AdapterPool(lm.eval(), registry, max_loaded=max_adapters)
+    engine = Engine(lm, tokenizer, max_batch=max_batch, pool=pool).start()
+    return Server(engine, version, verbose=verbose, default_adapter=next(iter(parse_adapter_specs(adapters)), None))
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serwer generacji SatyrAI (API OpenAI, ciągłe batchowanie)")
+    parser.add_argument("--model", default="meta-llama/Llama-3.1-8B-Instruct")
+    parser.add_argument(
+        "--adapter", action="append", default=[],
+        help="adapter LoRA: katalog albo nazwa=katalog (wielokrotnie; pierwszy domyślny)",
+    )
+    parser.add_argument("--max-adapters", type=int, default=4, help="adapterów w pamięci naraz (LRU)")
+    parser.add_argument("--dtype", default="bfloat16")
+    parser.add_argument("--tiny", action="store_true", help="mały losowy model na CPU (testy)")
+    parser.add_argument("--tiny-adapters", type=int, default=0, help="losowe adaptery tiny-N przy --tiny")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=16, help="maks. żądań w biegnącym batchu")
+    parser.add_argument("--verbose", action="store_true", help="log każdego żądania HTTP")
+    args = parser.parse_args()
+
+    server = build_server(
+        args.tiny, args.model, args.adapter, args.dtype, args.max_batch, args.verbose, args.max_adapters, args.tiny_adapters
+    )
+    httpd = server.serve(args.host, args.port)
+    adapters = server.engine.pool.names()
+    print(f"🚀 {server.model_version} na http://{args.host}:{args.port} (batch do {args.max_batch})")
+    if adapters:
+        print(f"   adaptery: {', '.join(adapters)} (w pamięci do {args.max_adapters}, domyślny: {server.default_adapter or 'baza'})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
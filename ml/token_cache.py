@@ -0,0 +1,319 @@
+"""
+Tokenizacja offline do płaskich tablic mapowanych w pamięć (zamiast load_dataset + .map
+przy każdym starcie treningu):
+- data/token_cache/<klucz>/tokens.bin (uint32, wszystkie przykłady sklejone),
+  offsets.bin (uint64, n+1 — początek przykładu i w tokens), loss_mask.bin (uint8, 1 = token
+  liczony w lossie), attributes.bin (uint32, n x ATTRIBUTES — kody źródła/języka/tonu
+  z metadata rekordu; słowniki w meta.json, dla ml/mixture.py), meta.json.
+- Klucz: odcisk tokenizera (serializacja backendu fast tokenizera + eos), szablon promptu,
+  max_length, maskowanie promptu (response_only) i skrót zawartości pliku danych — zmiana
+  któregokolwiek => nowy katalog.
+- Budowa: przykłady tokenizowane w puli procesów (wszystkie rdzenie), zapis strumieniowy do
+  katalogu tymczasowego i atomowe os.replace.
+- Odczyt: np.memmap bez kopiowania; TokenCacheDataset / PackedTokenDataset podają
+  przykłady do PaddingCollator / PackedCollator (ml/packing.py).
+
+CLI (etap offline, np. przed wysłaniem paczki na GPU):
+    python ml/token_cache.py build --data export_training/data/train_dataset.jsonl \\
+        --tokenizer mistralai/Mistral-7B-Instruct-v0.3 --max-length 2048
+Konfiguracja: config.yaml, sekcja `token_cache`.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import torch
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ml.packing import IGNORE_INDEX, PROMPT_TEMPLATE, plan_packs, pack_examples, tokenize_example
+
+CONFIG = ROOT / "config" / "config.yaml"
+TOKEN_CACHE_DIR = ROOT / "data" / "token_cache"
+CACHE_VERSION = 3
+CHUNK_LINES = 1000
+# Pola metadata rekordu (create_instruction_dataset.py) zapisywane jako kody per przykład
+ATTRIBUTES = ("source", "language", "tone")
+
+
+def _cache_root() -> Path:
+    cfg: Dict[str, Any] = {}
+    if CONFIG.exists():
+        cfg = (yaml.safe_load(CONFIG.read_text(encoding="utf-8")) or {}).get("token_cache", {})
+    return ROOT / cfg["dir"] if cfg.get("dir") else TOKEN_CACHE_DIR
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with Path(path).open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def tokenizer_fingerprint(tokenizer: Any) -> str:
+    """Skrót słownika/reguł tokenizera (rewizja bez polegania na nazwie modelu)."""
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    spec = backend.to_str() if backend is not None else json.dumps(tokenizer.get_vocab(), sort_keys=True)
+    h = hashlib.sha256(spec.encode("utf-8"))
+    h.update(str(tokenizer.eos_token).encode("utf-8"))
+    return h.hexdigest()
+
+
+def cache_key(
+    data_path: Path, tokenizer: Any, max_length: int, template: str = PROMPT_TEMPLATE, response_only: bool = True
+) -> Dict[str, Any]:
+    return {
+        "version": CACHE_VERSION,
+        "data": str(Path(data_path).name),
+        "data_digest": file_digest(data_path),
+        "tokenizer": getattr(tokenizer, "name_or_path", ""),
+        "tokenizer_fingerprint": tokenizer_fingerprint(tokenizer),
+        "template": template,
+        "max_length": max_length,
+        "response_only": response_only,
+    }
+
+
+def _key_dir(root: Path, key: Dict[str, Any]) -> Path:
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return root / f"{Path(key['data']).stem}-{digest}"
+
+
+# --- budowa (pula procesów) ---------------------------------------------------------
+
+_worker_tokenizer: Any = None
+_worker_max_length = 0
+_worker_template = PROMPT_TEMPLATE
+_worker_response_only = True
+
+
+def _init_worker(tokenizer_name: str, revision: Optional[str], max_length: int, template: str, response_only: bool) -> None:
+    global _worker_tokenizer, _worker_max_length, _worker_template, _worker_response_only
+    from transformers import AutoTokenizer
+
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    _worker_tokenizer = AutoTokenizer.from_pretrained(tokenizer_name, revision=revision, use_fast=True)
+    _worker_max_length = max_length
+    _worker_template = template
+    _worker_response_only = response_only
+
+
+def record_attributes(record: Dict[str, Any]) -> Tuple[str, ...]:
+    """(źródło, język, ton) z metadata rekordu; brak pola => ""; ton to lista — pierwszy element."""
+    metadata = record.get("metadata") or {}
+    values = []
+    for field in ATTRIBUTES:
+        value = metadata.get(field)
+        if isinstance(value, list):
+            value = value[0] if value else None
+        values.append(str(value) if value is not None else "")
+    return tuple(values)
+
+
+def _tokenize_chunk(lines: List[bytes]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Tuple[str, ...]]]:
+    """Linie JSONL -> (długości, tokeny, maska lossu, atrybuty przykładów) dla całego kawałka."""
+    lengths, tokens, masks, attributes = [], [], [], []
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        tok = tokenize_example(
+            _worker_tokenizer, record, _worker_max_length, _worker_template, _worker_response_only
+        )
+        lengths.append(len(tok["input_ids"]))
+        tokens.extend(tok["input_ids"])
+        masks.extend(label != IGNORE_INDEX for label in tok["labels"])
+        attributes.append(record_attributes(record))
+    return (
+        np.asarray(lengths, dtype=np.uint64), np.asarray(tokens, dtype=np.uint32), np.asarray(masks, dtype=np.uint8),
+        attributes,
+    )
+
+
+def _chunks(path: Path, size: int) -> Iterator[List[bytes]]:
+    chunk: List[bytes] = []
+    with Path(path).open("rb") as f:
+        for line in f:
+            chunk.append(line)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def build_cache(
+    data_path: Path,
+    tokenizer_name: str,
+    max_length: int,
+    revision: Optional[str] = None,
+    root: Optional[Path] = None,
+    num_proc: Optional[int] = None,
+    force: bool = False,
+    template: str = PROMPT_TEMPLATE,
+    response_only: bool = True,
+) -> Path:
+    """Tokenizuje plik JSONL (instruction/response) do katalogu cache; zwraca ten katalog."""
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_name, revision=revision, use_fast=True)
+    key = cache_key(data_path, tokenizer, max_length, template, response_only)
+    key["revision"] = revision
+    out = _key_dir(Path(root or _cache_root()), key)
+    if (out / "meta.json").exists() and not force:
+        return out
+
+    tmp = out.with_name(out.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    start = time.time()
+    num_records = num_tokens = 0
+    vocab: Dict[str, Dict[str, int]] = {field: {} for field in ATTRIBUTES}
+    with (tmp / "tokens.bin").open("wb") as ft, (tmp / "loss_mask.bin").open("wb") as fm, \
+            (tmp / "offsets.bin").open("wb") as fo, (tmp / "attributes.bin").open("wb") as fa, \
+            Pool(num_proc or os.cpu_count(), _init_worker, (tokenizer_name, revision, max_length, template, response_only)) as pool:
+        fo.write(np.zeros(1, dtype=np.uint64).tobytes())
+        # imap zachowuje kolejność przykładów z pliku
+        for lengths, tokens, masks, attributes in pool.imap(_tokenize_chunk, _chunks(data_path, CHUNK_LINES)):
+            fo.write((np.cumsum(lengths, dtype=np.uint64) + np.uint64(num_tokens)).tobytes())
+            ft.write(tokens.tobytes())
+            fm.write(masks.tobytes())
+            codes = [[vocab[f].setdefault(v, len(vocab[f])) for f, v in zip(ATTRIBUTES, row)] for row in attributes]
+            fa.write(np.asarray(codes, dtype=np.uint32).reshape(-1, len(ATTRIBUTES)).tobytes())
+            num_records += len(lengths)
+            num_tokens += len(tokens)
+    meta = dict(
+        key, num_records=num_records, num_tokens=num_tokens, built_at=time.time(), build_s=round(time.time() - start, 2),
+        attributes={field: list(codes) for field, codes in vocab.items()},  # kolejność = kody
+    )
+    (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    shutil.rmtree(out, ignore_errors=True)
+    os.replace(tmp, out)
+    return out
+
+
+# --- odczyt -------------------------------------------------------------------------
+
+
+class TokenCache:
+    """Tablice cache zmapowane w pamięć (tylko odczyt, bez kopiowania)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        self.offsets = np.memmap(self.path / "offsets.bin", dtype=np.uint64, mode="r")
+        # Pusty plik nie daje się zmapować
+        self.tokens = self._map("tokens.bin", np.uint32)
+        self.loss_mask = self._map("loss_mask.bin", np.uint8)
+
+    def _map(self, name: str, dtype: Any) -> np.ndarray:
+        path = self.path / name
+        return np.memmap(path, dtype=dtype, mode="r") if path.stat().st_size else np.zeros(0, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets).astype(np.int64)
+
+    def attributes(self) -> Dict[str, Tuple[np.ndarray, List[str]]]:
+        """Pole metadata -> (kod per przykład, słownik kodów)."""
+        codes = self._map("attributes.bin", np.uint32).reshape(len(self), len(ATTRIBUTES))
+        return {field: (codes[:, k], self.meta["attributes"][field]) for k, field in enumerate(ATTRIBUTES)}
+
+    def __getitem__(self, i: int) -> Dict[str, np.ndarray]:
+        a, b = int(self.offsets[i]), int(self.offsets[i + 1])
+        input_ids = self.tokens[a:b].astype(np.int64)
+        labels = np.where(self.loss_mask[a:b].astype(bool), input_ids, IGNORE_INDEX)
+        return {"input_ids": input_ids, "labels": labels}
+
+
+def load_or_build(
+    data_path: Path,
+    tokenizer_name: str,
+    max_length: int,
+    revision: Optional[str] = None,
+    num_proc: Optional[int] = None,
+    template: str = PROMPT_TEMPLATE,
+    response_only: bool = True,
+) -> TokenCache:
+    """Cache dla pliku danych (budowany przy pierwszym użyciu, później tylko mapowany)."""
+    return TokenCache(build_cache(
+        data_path, tokenizer_name, max_length,
+        revision=revision, num_proc=num_proc, template=template, response_only=response_only,
+    ))
+
+
+class TokenCacheDataset(torch.utils.data.Dataset):
+    """Pojedyncze przykłady (dla PaddingCollator / group_by_length)."""
+
+    def __init__(self, cache: TokenCache):
+        self.cache = cache
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def __getitem__(self, i: int) -> Dict[str, np.ndarray]:
+        return self.cache[i]
+
+
+class PackedTokenDataset(torch.utils.data.Dataset):
+    """Spakowane sekwencje (dla PackedCollator); plan liczony z offsets, treść czytana leniwie."""
+
+    def __init__(self, cache: TokenCache, max_length: int):
+        self.cache = cache
+        self.max_length = max_length
+        self.plan = plan_packs(cache.lengths().tolist(), max_length)
+
+    def __len__(self) -> int:
+        return len(self.plan)
+
+    def __getitem__(self, i: int) -> Dict[str, List[int]]:
+        return next(pack_examples(self.cache, [self.plan[i]], self.max_length))
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cache tokenów treningowych (memmap)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    build = sub.add_parser("build", help="Tokenizuj plik(i) JSONL do cache")
+    build.add_argument("--data", type=Path, nargs="+", required=True)
+    build.add_argument("--tokenizer", required=True)
+    build.add_argument("--revision")
+    build.add_argument("--max-length", type=int, default=2048)
+    build.add_argument("--full-loss", action="store_true", help="loss także na tokenach promptu")
+    build.add_argument("--num-proc", type=int)
+    build.add_argument("--force", action="store_true")
+    sub.add_parser("list", help="Zbudowane cache")
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        for data in args.data:
+            path = build_cache(
+                data, args.tokenizer, args.max_length,
+                revision=args.revision, num_proc=args.num_proc, force=args.force, response_only=not args.full_loss,
+            )
+            meta = TokenCache(path).meta
+            print(f"✅ {data} -> {path} ({meta['num_records']} przykładów, {meta['num_tokens']:,} tokenów, {meta['build_s']}s)")
+    else:
+        for meta_path in sorted(_cache_root().glob("*/meta.json")):
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            print(f"{meta_path.parent.name}: {meta['tokenizer']} max_length={meta['max_length']} "
+                  f"{meta['num_records']} przykładów, {meta['num_tokens']:,} tokenów")
+
+
+if __name__ == "__main__":
+    main()
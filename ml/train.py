@@ -0,0 +1,480 @@
+"""
+Wspólny launcher treningu LoRA (zamiast pięciu skryptów train_*.py różniących się detalami):
+- Konfiguracja JSON: config/training/<nazwa>_config.json (w paczce eksportu: training_configs/,
+  kopiowane przez scripts/prepare_training_export.py — nie edytować ręcznie).
+  Sekcje model_name / training_args / lora_config jak dotąd, plus opcjonalne: data (ścieżki,
+  szablon promptu, dane syntetyczne), model (kwantyzacja, dtype, attention, losowy model),
+  max_length, packing, collator, seed. Brakujące pola biorą wartości z DEFAULTS.
+- Dane: cache tokenów memmap (ml/token_cache.py) + pakowanie/dynamiczny padding (ml/packing.py).
+- Profil cpu_smoke: mały losowy model Llama, tokenizer BPE uczony na danych treningowych,
+  syntetyczne dane z ziarna — powtarzalny pomiar przepustowości na CPU (A/B zmian).
+- Po treningu: <output_dir>/launch_metrics.json (czas, tokeny/s, loss, skrót konfiguracji)
+  i <output_dir>/profile.jsonl (ml/profiler.py: fazy kroku, padding, pamięć — per krok).
+- Mieszanka źródeł (sekcja mixture): wagi per źródło/język/ton i curriculum długości,
+  próbkowane na bieżąco z cache (ml/mixture.py) — zmiana proporcji bez przebudowy danych.
+- Ładowanie danych (sekcja dataloader): kolacja w workerach, ograniczony prefetch, kopiowanie
+  na GPU z buforów pinned w tle (ml/dataloading.py).
+
+Użycie:
+    python ml/train.py --config mistral_standard
+    python ml/train.py --config cpu_smoke --set training_args.max_steps=50
+    python ml/train.py --config llama_3_1_8b --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import dataclasses
+import hashlib
+import json
+import math
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ml.packing import PROMPT_TEMPLATE, PackedCollator, PaddingCollator
+
+CONFIG_DIRS = (ROOT / "config" / "training", ROOT / "training_configs")
+DATA_CANDIDATES = ("data", "data/curated", "export_training/data", "../data")
+
+DEFAULTS: Dict[str, Any] = {
+    "model_name": None,
+    "tokenizer": None,  # domyślnie model_name; przy model.random_init — BPE uczony na danych
+    "data": {
+        "train": None,  # None => autowykrywanie (DATA_CANDIDATES)
+        "eval": None,
+        "prompt_template": PROMPT_TEMPLATE,
+        "response_only": True,  # loss tylko na tokenach odpowiedzi (+ EOS)
+        "synthetic": None,  # {"num_examples": N, "seed": S} => dane syntetyczne zamiast plików
+    },
+    "max_length": 2048,
+    "packing": True,
+    "collator": {"mode": "mask", "pad_to_multiple_of": 8},
+    # ml/mixture.py; None => równomierne tasowanie. Np. {"weights": {"language": {"pl": 3.0}},
+    # "epoch_size": None, "curriculum": {"start": 0.3, "epochs": 1.0, "stages": 10}}
+    "mixture": None,
+    "model": {
+        "quantization": "none",  # none | 4bit | 8bit
+        "torch_dtype": "bfloat16",
+        "attn_implementation": "sdpa",
+        "trust_remote_code": True,
+        "random_init": None,  # kwargs AutoConfig.for_model (model_type + rozmiary) => losowe wagi
+    },
+    "training_args": {
+        "output_dir": "./results",
+        "report_to": "none",
+        "logging_first_step": True,
+    },
+    "lora_config": {
+        "r": 16,
+        "lora_alpha": 32,
+        "target_modules": ["q_proj", "k_proj", "v_proj", "o_proj"],
+        "lora_dropout": 0.05,
+        "bias": "none",
+        "task_type": "CAUSAL_LM",
+    },
+    "dataloader": {
+        "enabled": True,  # ml/dataloading.py: PrefetchLoader zamiast DataLoadera Trainera
+        "num_workers": 2,  # procesy kolacji (0 = w wątku prefetchu)
+        "prefetch": 4,  # batche gotowe na zapas (kolejka ograniczona)
+        "pin_memory": True,  # bufory pinned wielokrotnego użytku (tylko CUDA)
+    },
+    "profile": {
+        "enabled": True,  # ml/profiler.py: <output_dir>/profile.jsonl (czasy faz, tokeny/s, padding, pamięć)
+        "path": None,
+        "warmup_steps": 1,
+        "sync_cuda": True,
+    },
+    "seed": 42,
+}
+
+# Argumenty TrainingArguments przemianowane między wersjami transformers (stara -> nowa nazwa);
+# konfiguracja może używać dowolnej, launcher dopasowuje je do zainstalowanej wersji
+RENAMED_ARGS = {"evaluation_strategy": "eval_strategy"}
+
+
+# --- konfiguracja -------------------------------------------------------------------
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    out = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = _merge(out[key], value)
+        else:
+            out[key] = value
+    return out
+
+
+def find_config(name: str) -> Path:
+    path = Path(name)
+    if path.exists():
+        return path
+    for directory in CONFIG_DIRS:
+        for candidate in (f"{name}_config.json", f"{name}.json", name):
+            if (directory / candidate).exists():
+                return directory / candidate
+    raise FileNotFoundError(f"Brak konfiguracji {name!r} w {', '.join(str(d) for d in CONFIG_DIRS)}")
+
+
+def apply_override(config: Dict[str, Any], assignment: str) -> None:
+    """--set a.b.c=wartość (wartość jako JSON, w razie błędu jako tekst)."""
+    path, _, raw = assignment.partition("=")
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = raw
+    node = config
+    keys = path.split(".")
+    for key in keys[:-1]:
+        node = node.setdefault(key, {})
+    node[keys[-1]] = value
+
+
+def load_config(name: str, overrides: Sequence[str] = ()) -> Dict[str, Any]:
+    path = find_config(name)
+    config = _merge(DEFAULTS, json.loads(path.read_text(encoding="utf-8")))
+    for assignment in overrides:
+        apply_override(config, assignment)
+    config["_path"] = str(path)
+    return config
+
+
+def config_digest(config: Dict[str, Any]) -> str:
+    public = {k: v for k, v in config.items() if not k.startswith("_")}
+    return hashlib.sha256(json.dumps(public, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+# --- dane ---------------------------------------------------------------------------
+
+
+def discover_data(config: Dict[str, Any]) -> Dict[str, Optional[Path]]:
+    data = config["data"]
+    if data["train"]:
+        return {"train": Path(data["train"]), "eval": Path(data["eval"]) if data["eval"] else None}
+    for base in DATA_CANDIDATES:
+        train = Path(base) / "train_dataset.jsonl"
+        if train.exists():
+            evaluation = Path(base) / "eval_dataset.jsonl"
+            return {"train": train, "eval": evaluation if evaluation.exists() else None}
+    raise FileNotFoundError(f"Nie znaleziono train_dataset.jsonl (szukano w: {', '.join(DATA_CANDIDATES)})")
+
+
+SYNTHETIC_WORDS = (
+    "rząd sejm premier minister ustawa budżet podatek wybory partia opozycja koalicja debata "
+    "reforma gospodarka inflacja prezydent senat kampania sondaż media obywatel urząd władza"
+).split()
+# Metadata przykładów syntetycznych (źródło, język, ton) — dominujący feed jak w prawdziwych danych
+SYNTHETIC_SOURCES = (
+    ("thinktank_us", "en", "commentary"),
+    ("satyra_pl", "pl", "satire"),
+    ("thinktank_us", "en", "commentary"),
+    ("blog_pl", "pl", "commentary"),
+)
+
+
+def write_synthetic_dataset(path: Path, num_examples: int, seed: int) -> Path:
+    """Powtarzalne przykłady instruction/response o log-normalnych długościach (profil smoke)."""
+    if path.exists():
+        return path
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(num_examples):
+            topic = " ".join(rng.choices(SYNTHETIC_WORDS, k=rng.randint(2, 6)))
+            body = " ".join(rng.choices(SYNTHETIC_WORDS, k=max(5, int(rng.lognormvariate(math.log(60), 0.7)))))
+            record = {"instruction": f"Napisz satyryczny komentarz o: {topic}", "response": body.capitalize() + "."}
+            source, language, tone = SYNTHETIC_SOURCES[i % len(SYNTHETIC_SOURCES)]
+            record["metadata"] = {"source": source, "language": language, "tone": [tone]}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return path
+
+
+def resolve_data(config: Dict[str, Any]) -> Dict[str, Optional[Path]]:
+    synthetic = config["data"]["synthetic"]
+    if not synthetic:
+        return discover_data(config)
+    out = Path(config["training_args"]["output_dir"]) / "smoke_data"
+    seed = synthetic.get("seed", 0)
+    n = synthetic["num_examples"]
+    return {
+        "train": write_synthetic_dataset(out / f"train_{n}_{seed}.jsonl", n, seed),
+        "eval": write_synthetic_dataset(out / f"eval_{n}_{seed}.jsonl", max(1, n // 10), seed + 1),
+    }
+
+
+def train_smoke_tokenizer(train_file: Path, vocab_size: int, out_dir: Path) -> str:
+    """Byte-level BPE uczony na pliku treningowym (deterministyczny, bez pobierania z Hub)."""
+    if (out_dir / "tokenizer.json").exists():
+        return str(out_dir)
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import PreTrainedTokenizerFast
+
+    from ml.packing import format_example
+
+    tok = Tokenizer(models.BPE(unk_token="<unk>"))
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=vocab_size,
+        special_tokens=["<unk>", "<s>", "</s>", "<pad>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+    )
+    with train_file.open(encoding="utf-8") as f:
+        texts = [format_example(json.loads(line)) for line in f if line.strip()]
+    tok.train_from_iterator(texts, trainer)
+    fast = PreTrainedTokenizerFast(
+        tokenizer_object=tok, bos_token="<s>", eos_token="</s>", unk_token="<unk>", pad_token="<pad>"
+    )
+    fast.save_pretrained(str(out_dir))
+    return str(out_dir)
+
+
+def resolve_tokenizer_name(config: Dict[str, Any], files: Dict[str, Optional[Path]]) -> str:
+    if config["tokenizer"]:
+        return config["tokenizer"]
+    random_init = config["model"]["random_init"]
+    if random_init:
+        vocab_size = random_init.get("vocab_size", 512)
+        out = Path(config["training_args"]["output_dir"]) / "tokenizer" / f"{files['train'].stem}_{vocab_size}"
+        return train_smoke_tokenizer(files["train"], vocab_size, out)
+    return config["model_name"]
+
+
+def build_datasets(config: Dict[str, Any], tokenizer_name: str, files: Dict[str, Optional[Path]]):
+    from ml.token_cache import PackedTokenDataset, TokenCacheDataset, load_or_build
+
+    max_length = config["max_length"]
+    datasets = {}
+    for split, path in files.items():
+        if path is None:
+            continue
+        cache = load_or_build(
+            path, tokenizer_name, max_length,
+            template=config["data"]["prompt_template"], response_only=config["data"]["response_only"],
+        )
+        if split == "train" and config["mixture"]:
+            from ml.mixture import MixtureDataset, MixtureSampler
+
+            sampler = MixtureSampler(
+                cache.lengths(), cache.attributes(), **config["mixture"],
+                max_length=max_length if config["packing"] else None, seed=config["seed"],
+            )
+            datasets[split] = MixtureDataset(cache, sampler)
+            datasets[split].real_tokens = sampler.epoch_tokens()  # type: ignore[attr-defined]
+            continue
+        datasets[split] = PackedTokenDataset(cache, max_length) if config["packing"] else TokenCacheDataset(cache)
+        datasets[split].real_tokens = int(cache.lengths().sum())  # type: ignore[attr-defined]
+    return datasets
+
+
+def build_collator(config: Dict[str, Any], pad_token_id: int, dtype: Any):
+    collator = config["collator"]
+    if config["packing"]:
+        return PackedCollator(pad_token_id, mode=collator["mode"], dtype=dtype, pad_to_multiple_of=collator["pad_to_multiple_of"])
+    return PaddingCollator(pad_token_id, pad_to_multiple_of=collator["pad_to_multiple_of"])
+
+
+def training_arguments(args: Dict[str, Any]):
+    from transformers import TrainingArguments
+
+    supported = {f.name for f in dataclasses.fields(TrainingArguments)}
+    args = dict(args)
+    for old, new in RENAMED_ARGS.items():
+        for src, dst in ((old, new), (new, old)):
+            if src in args and src not in supported and dst in supported:
+                args.setdefault(dst, args.pop(src))
+    # transformers 5: group_by_length => train_sampling_strategy="group_by_length"
+    if "group_by_length" in args and "group_by_length" not in supported:
+        if args.pop("group_by_length"):
+            args.setdefault("train_sampling_strategy", "group_by_length")
+    return TrainingArguments(**args)
+
+
+def _dtype_kwarg() -> str:
+    import transformers
+
+    return "dtype" if int(transformers.__version__.split(".")[0]) >= 5 else "torch_dtype"
+
+
+# --- model --------------------------------------------------------------------------
+
+
+def load_model(config: Dict[str, Any], tokenizer: Any):
+    import torch
+    from peft import LoraConfig, get_peft_model
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    spec = config["model"]
+    dtype = getattr(torch, spec["torch_dtype"])
+    if spec["random_init"]:
+        torch.manual_seed(config["seed"])
+        model_config = AutoConfig.for_model(
+            **dict({"vocab_size": len(tokenizer), "max_position_embeddings": config["max_length"]}, **spec["random_init"]),
+            pad_token_id=tokenizer.pad_token_id,
+            attn_implementation=spec["attn_implementation"],
+        )
+        model = AutoModelForCausalLM.from_config(model_config, **{_dtype_kwarg(): dtype})
+    else:
+        kwargs: Dict[str, Any] = {
+            _dtype_kwarg(): dtype,
+            "device_map": "auto",
+            "trust_remote_code": spec["trust_remote_code"],
+            "attn_implementation": spec["attn_implementation"],
+            "pad_token_id": tokenizer.pad_token_id,
+        }
+        if spec["quantization"] in ("4bit", "8bit"):
+            from transformers import BitsAndBytesConfig
+
+            kwargs["quantization_config"] = (
+                BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_use_double_quant=True,
+                    bnb_4bit_quant_type="nf4",
+                    bnb_4bit_compute_dtype=dtype,
+                )
+                if spec["quantization"] == "4bit"
+                else BitsAndBytesConfig(load_in_8bit=True)
+            )
+        elif spec["quantization"] != "none":
+            raise ValueError(f"Nieznana kwantyzacja: {spec['quantization']!r}")
+        model = AutoModelForCausalLM.from_pretrained(config["model_name"], **kwargs)
+    model.config.use_cache = False
+
+    gradient_checkpointing = config["training_args"].get("gradient_checkpointing", False)
+    if spec["quantization"] != "none":
+        from peft.utils import prepare_model_for_kbit_training
+
+        model = prepare_model_for_kbit_training(model, use_gradient_checkpointing=gradient_checkpointing)
+    elif gradient_checkpointing:
+        # Wejście z requires_grad — inaczej checkpointing z zamrożonymi wagami gubi gradienty LoRA
+        model.enable_input_require_grads()
+
+    model = get_peft_model(model, LoraConfig(**config["lora_config"]))
+    model.print_trainable_parameters()
+    return model, dtype
+
+
+# --- uruchomienie -------------------------------------------------------------------
+
+
+def run(config: Dict[str, Any], dry_run: bool = False) -> Dict[str, Any]:
+    from transformers import AutoTokenizer, Trainer, set_seed
+
+    set_seed(config["seed"])
+    files = resolve_data(config)
+    print(f"📁 Dane: {files['train']} (eval: {files['eval']})")
+    tokenizer_name = resolve_tokenizer_name(config, files)
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_name, use_fast=True)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "right"
+
+    start = time.perf_counter()
+    datasets = build_datasets(config, tokenizer_name, files)
+    data_s = time.perf_counter() - start
+    train = datasets["train"]
+    print(f"📊 Train: {len(train)} {'sekwencji' if config['packing'] else 'przykładów'}, "
+          f"{train.real_tokens:,} tokenów ({data_s:.1f}s)")
+    if config["mixture"]:
+        from ml.mixture import format_mixture
+
+        print("🎛️  Mieszanka (udział naturalny→po wagach):\n" + format_mixture(train.sampler))
+
+    args = dict(config["training_args"])
+    args.setdefault("seed", config["seed"])
+    args.setdefault("group_by_length", not config["packing"])
+    if "eval" not in datasets:
+        args["eval_strategy"] = "no"
+        args["load_best_model_at_end"] = False
+    elif args.get("eval_steps") and "eval_strategy" not in args and "evaluation_strategy" not in args:
+        args["eval_strategy"] = "steps"
+    if dry_run:
+        print(json.dumps({k: v for k, v in config.items() if not k.startswith("_")}, indent=2, ensure_ascii=False))
+        return {}
+
+    model, dtype = load_model(config, tokenizer)
+    output_dir = Path(args["output_dir"])
+    collator = build_collator(config, tokenizer.pad_token_id, dtype)
+    loader = config["dataloader"]
+    callbacks = []
+    profiler = None
+    if config["profile"]["enabled"]:
+        from ml.profiler import CountingCollator, ProfilerCallback, StepProfiler
+
+        if args.get("dataloader_num_workers") and not loader["enabled"]:
+            print("⚠️  dataloader_num_workers > 0: tokeny liczone w workerach — profil bez metryk tokenów")
+        profile = config["profile"]
+        profiler = StepProfiler(
+            profile["path"] or output_dir / "profile.jsonl",
+            sync_cuda=profile["sync_cuda"],
+            warmup_steps=profile["warmup_steps"],
+        )
+        if not loader["enabled"]:  # PrefetchLoader liczy tokeny sam (także z workerami)
+            collator = CountingCollator(collator, profiler)
+        callbacks.append(ProfilerCallback(profiler))
+    trainer_cls = Trainer
+    trainer_kwargs: Dict[str, Any] = {}
+    if loader["enabled"] or config["mixture"]:
+        from ml.dataloading import PrefetchTrainer
+
+        trainer_cls = PrefetchTrainer
+        options = {k: v for k, v in loader.items() if k != "enabled"} if loader["enabled"] else None
+        trainer_kwargs = {"loader_options": options, "profiler": profiler}
+    trainer = trainer_cls(
+        model=model,
+        args=training_arguments(args),
+        train_dataset=train,
+        eval_dataset=datasets.get("eval"),
+        data_collator=collator,
+        callbacks=callbacks,
+        **trainer_kwargs,
+    )
+    print("🚀 Trening...")
+    result = trainer.train(resume_from_checkpoint=args.get("resume_from_checkpoint"))
+    runtime = result.metrics.get("train_runtime", 0.0)
+    # Tokeny przetworzone: ułamek epok * prawdziwe tokeny w epoce (padding nie liczy się)
+    tokens = train.real_tokens * (trainer.state.epoch or 0.0)
+    metrics = {
+        "config": config["_path"],
+        "config_digest": config_digest(config),
+        "steps": trainer.state.global_step,
+        "epochs": trainer.state.epoch,
+        "train_runtime_s": runtime,
+        "train_loss": result.training_loss,
+        "tokens": int(tokens),
+        "tokens_per_s": tokens / runtime if runtime else None,
+        "data_prep_s": round(data_s, 3),
+    }
+    if profiler is not None:
+        metrics["profile"] = profiler.summary()
+    if getattr(trainer, "train_loader", None) is not None:
+        metrics["dataloader"] = trainer.train_loader.summary()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / "launch_metrics.json").write_text(json.dumps(metrics, indent=2), encoding="utf-8")
+    print(f"📈 {metrics['tokens_per_s'] or 0:,.0f} tokenów/s, loss {result.training_loss:.4f}, {runtime:.1f}s")
+
+    if args.get("save_strategy") != "no":
+        trainer.save_model(str(output_dir / "final"))
+        tokenizer.save_pretrained(str(output_dir / "final"))
+        print(f"💾 Model: {output_dir / 'final'}")
+    return metrics
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Trening LoRA z konfiguracji JSON")
+    parser.add_argument("--config", required=True, help="nazwa (config/training/<nazwa>_config.json) lub ścieżka")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KLUCZ=WARTOŚĆ",
+                        help="nadpisanie pola, np. training_args.max_steps=10 (wielokrotnie)")
+    parser.add_argument("--dry-run", action="store_true", help="przygotuj dane i pokaż konfigurację bez treningu")
+    args = parser.parse_args(argv)
+    run(load_config(args.config, args.overrides), dry_run=args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Segmentacja transkrypcji pod eksport treningowy:
+- Podział na zdania (granice .!?… z ochroną polskich skrótów: np., tzw., m.in., prof. ...).
+- Liczenie tokenów tokenizerem modelu docelowego (transformers, batch) lub heurystyką
+  znakową, gdy tokenizer nie jest dostępny.
+- Pakowanie zdań w okna <= max_seq_length - reserve_tokens z nakładką overlap_tokens,
+  dwoma wskaźnikami — czas liniowy względem liczby zdań.
+- Wyjście: rekordy w schemacie data/raw (source/feed/type/.../data{id,title,link,summary,...}).
+
+Konfiguracja: config.yaml, sekcja `segmentation`.
+"""
+from __future__ import annotations
+
+import math
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+CONFIG = ROOT / "config" / "config.yaml"
+
+DEFAULTS: Dict[str, Any] = {
+    "tokenizer": None,
+    "max_seq_length": 2048,
+    "reserve_tokens": 256,
+    "overlap_tokens": 64,
+}
+
+# Kandydat na granicę: znak końca zdania (+ cudzysłów/nawias) i biały znak
+BOUNDARY_RE = re.compile(r"[.!?…]+[\"'”»)]*\s+")
+LAST_WORD_RE = re.compile(r"(\S+)$")
+ABBREVIATIONS = {
+    "np", "tzw", "m.in", "itd", "itp", "tj", "ok", "r", "w", "ul", "al", "godz", "wg",
+    "dr", "prof", "mgr", "inż", "hab", "św", "ks", "gen", "płk", "por", "red", "zob",
+    "tys", "mln", "mld", "zł", "proc", "nr", "s", "str", "ds", "cdn",
+}
+# Heurystyka dla polskiego tekstu na tokenizerach BPE (Llama/Mistral): ~3 znaki / token
+CHARS_PER_TOKEN = 3.0
+
+
+def load_segmentation_config() -> Dict[str, Any]:
+    cfg = dict(DEFAULTS)
+    if CONFIG.exists():
+        data = yaml.safe_load(CONFIG.read_text(encoding="utf-8")) or {}
+        cfg.update(data.get("segmentation") or {})
+    return cfg
+
+
+def split_sentences(text: str) -> List[str]:
+    """Dzieli tekst na zdania; kropka po skrócie lub liczbie porządkowej nie kończy zdania."""
+    text = re.sub(r"\s+", " ", text or "").strip()
+    if not text:
+        return []
+    sentences: List[str] = []
+    start = 0
+    for match in BOUNDARY_RE.finditer(text):
+        end = match.end()
+        nxt = text[end:end + 1]
+        if not nxt:
+            break
+        chunk = text[start:match.start() + 1]
+        word = LAST_WORD_RE.search(chunk)
+        token = word.group(1).rstrip(".").lower() if word else ""
+        if match.group(0)[0] == "." and (token in ABBREVIATIONS or token.isdigit()):
+            continue
+        if nxt.islower():
+            continue
+        sentences.append(text[start:end].strip())
+        start = end
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+class TokenCounter:
+    """
+    Liczy tokeny tokenizerem modelu docelowego (bez tokenów specjalnych).
+    Bez transformers / przy błędzie ładowania — heurystyka len/CHARS_PER_TOKEN (zaokrąglona w górę).
+    """
+
+    def __init__(self, tokenizer_name: Optional[str] = None):
+        self.tokenizer = None
+        if tokenizer_name:
+            try:
+                from transformers import AutoTokenizer  # type: ignore
+
+                self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+            except Exception as e:  # noqa: BLE001
+                print(f"[segmenter] brak tokenizera {tokenizer_name} ({e}) — heurystyka znakowa")
+
+    def __call__(self, text: str) -> int:
+        return self.counts([text])[0]
+
+    def counts(self, texts: Sequence[str]) -> List[int]:
+        if not texts:
+            return []
+        if self.tokenizer is not None:
+            ids = self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+            return [len(x) for x in ids]
+        return [max(1, math.ceil(len(t) / CHARS_PER_TOKEN)) for t in texts]
+
+
+def pack_windows(
+    counts: Sequence[int], max_tokens: int, overlap_tokens: int = 0
+) -> Iterator[Tuple[int, int]]:
+    """
+    Okna [i, j) o sumie counts <= max_tokens (element dłuższy niż limit tworzy własne okno).
+    Kolejne okno cofa się o elementy mieszczące się w overlap_tokens, o ile zakładka razem
+    z elementem j mieści się w max_tokens — każde okno wychodzi poza koniec poprzedniego.
+    Dwa wskaźniki => O(n).
+    """
+    n = len(counts)
+    i = 0
+    while i < n:
+        total = 0
+        j = i
+        while j < n and (j == i or total + counts[j] <= max_tokens):
+            total += int(counts[j])
+            j += 1
+        yield i, j
+        if j >= n:
+            break
+        back = 0
+        k = j
+        while k - 1 > i and back + counts[k - 1] <= overlap_tokens and back + counts[k - 1] + counts[j] <= max_tokens:
+            k -= 1
+            back += int(counts[k])
+        i = k
+
+
+def _split_long(sentence: str, count: int, max_tokens: int) -> List[str]:
+    """Zdanie dłuższe niż okno dzielimy po słowach na ~równe części."""
+    words = sentence.split()
+    parts = min(len(words), math.ceil(count / max_tokens))
+    if parts <= 1:
+        return [sentence]
+    size = math.ceil(len(words) / parts)
+    return [" ".join(words[k:k + size]) for k in range(0, len(words), size)]
+
+
+def segment_text(
+    text: str,
+    count_tokens: TokenCounter,
+    max_tokens: int,
+    overlap_tokens: int = 0,
+) -> Iterator[Tuple[str, int]]:
+    """Generator (tekst okna, liczba tokenów) dla jednej transkrypcji."""
+    sentences = split_sentences(text)
+    counts = count_tokens.counts(sentences)
+    pieces: List[str] = []
+    piece_counts: List[int] = []
+    for sentence, count in zip(sentences, counts):
+        if count > max_tokens:
+            parts = _split_long(sentence, count, max_tokens)
+            pieces.extend(parts)
+            piece_counts.extend(count_tokens.counts(parts))
+        else:
+            pieces.append(sentence)
+            piece_counts.append(count)
+    for i, j in pack_windows(piece_counts, max_tokens, overlap_tokens):
+        yield " ".join(pieces[i:j]), sum(piece_counts[i:j])
+
+
+def transcript_records(
+    transcript: Dict[str, Any],
+    count_tokens: TokenCounter,
+    max_tokens: int,
+    overlap_tokens: int = 0,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Rekordy data/raw dla transkrypcji z data/youtube/<video_id>.json.
+    ID segmentu: <video_id>_seg_<indeks w obrębie wideo> (stabilne między uruchomieniami).
+    """
+    video_id = transcript["video_id"]
+    text = transcript["transcript"]["text"]
+    for idx, (window, num_tokens) in enumerate(
+        segment_text(text, count_tokens, max_tokens, overlap_tokens)
+    ):
+        yield {
+            "source": transcript["channel"],
+            "feed": transcript["url"],
+            "type": "video_transcript",
+            "country": "PL",
+            "license": "fair_use",
+            "data": {
+                "id": f"{video_id}_seg_{idx}",
+                "title": transcript["title"],
+                "link": transcript["url"],
+                "summary": window,
+                "published": transcript.get("upload_date"),
+                "raw": {
+                    "video_id": video_id,
+                    "channel": transcript.get("channel_key"),
+                    "segment_index": idx,
+                    "num_tokens": num_tokens,
+                    "segment_text": window,
+                },
+            },
+        }
+
+
+def build_segmenter(cfg: Optional[Dict[str, Any]] = None) -> Tuple[TokenCounter, int, int]:
+    """(licznik tokenów, budżet okna, nakładka) z konfiguracji `segmentation`."""
+    cfg = cfg or load_segmentation_config()
+    max_tokens = int(cfg["max_seq_length"]) - int(cfg["reserve_tokens"])
+    if max_tokens <= 0:
+        raise ValueError("segmentation: reserve_tokens >= max_seq_length")
+    return TokenCounter(cfg.get("tokenizer")), max_tokens, int(cfg["overlap_tokens"])
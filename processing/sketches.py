@@ -0,0 +1,337 @@
+"""
+Jednoprzebiegowa analityka datasetów w ograniczonej pamięci (wspólna dla
+datasets/analyze_instruction_dataset.py, scripts/check_data.py i datasets/stats_report.py):
+- RunningStats — liczność, średnia (Welford), min/max.
+- TDigest — kwantyle długości (mediana, p90, p99...) z ~delta centroidów (merging t-digest,
+  funkcja skali k1), błąd względny najmniejszy na ogonach.
+- HyperLogLog — liczba unikalnych wartości (2^p rejestrów, błąd ~1.04/sqrt(2^p); p=14 => ~0.8%).
+- Log2Histogram — histogram długości w tokenach (przedziały [2^i, 2^(i+1))).
+- DatasetSketch — komplet powyższych per nazwane pole + liczniki kategorii i próbka
+  (reservoir sampling). Wszystkie szkice mają merge(), więc shardy można liczyć osobno.
+
+Tokeny: processing.segmenter.TokenCounter (tokenizer modelu z config.yaml lub heurystyka),
+liczone paczkami po batch_size rekordów.
+"""
+from __future__ import annotations
+
+import collections
+import hashlib
+import json
+import math
+import random
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from processing.segmenter import TokenCounter, load_segmentation_config
+
+
+class RunningStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def merge(self, other: "RunningStats") -> None:
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+
+class TDigest:
+    """Merging t-digest (Dunning): centroidy (średnia, waga) + bufor nowych punktów."""
+
+    def __init__(self, delta: float = 200.0, buffer_size: int = 2000) -> None:
+        self.delta = delta
+        self.buffer_size = buffer_size
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self._buffer: List[float] = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x: float) -> None:
+        self._buffer.append(x)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        if len(self._buffer) >= self.buffer_size:
+            self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.delta / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _compress(self, extra: Iterable[Tuple[float, float]] = ()) -> None:
+        points = sorted(
+            list(zip(self.means, self.weights)) + [(x, 1.0) for x in self._buffer] + list(extra)
+        )
+        self._buffer = []
+        if not points:
+            return
+        total = sum(w for _, w in points)
+        means: List[float] = []
+        weights: List[float] = []
+        cur_mean, cur_weight = points[0]
+        done = 0.0
+        k_lo = self._k(0.0)
+        for mean, weight in points[1:]:
+            # Centroid może rosnąć, dopóki obejmuje <= 1 jednostkę funkcji skali
+            if self._k((done + cur_weight + weight) / total) - k_lo <= 1.0:
+                cur_mean += (mean - cur_mean) * weight / (cur_weight + weight)
+                cur_weight += weight
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                done += cur_weight
+                k_lo = self._k(done / total)
+                cur_mean, cur_weight = mean, weight
+        means.append(cur_mean)
+        weights.append(cur_weight)
+        self.means, self.weights, self.count = means, weights, total
+
+    def merge(self, other: "TDigest") -> None:
+        other._compress()
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(zip(other.means, other.weights))
+
+    def quantile(self, q: float) -> float:
+        self._compress()
+        if not self.means:
+            return math.nan
+        if len(self.means) == 1:
+            return self.means[0]
+        target = q * self.count
+        # Środki centroidów leżą w skumulowanej wadze: cum + w/2; interpolacja liniowa,
+        # na krańcach do min/max
+        cum = 0.0
+        prev_pos, prev_mean = 0.0, self.min
+        for mean, weight in zip(self.means, self.weights):
+            pos = cum + weight / 2
+            if target <= pos:
+                span = pos - prev_pos
+                frac = (target - prev_pos) / span if span > 0 else 0.0
+                return prev_mean + (mean - prev_mean) * frac
+            prev_pos, prev_mean = pos, mean
+            cum += weight
+        span = self.count - prev_pos
+        frac = (target - prev_pos) / span if span > 0 else 1.0
+        return prev_mean + (self.max - prev_mean) * frac
+
+
+class HyperLogLog:
+    def __init__(self, p: int = 14) -> None:
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value: str) -> None:
+        x = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+        idx = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.p != self.p:
+            raise ValueError("HyperLogLog: różne precyzje")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def __len__(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Mały zakres: linear counting
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class Log2Histogram:
+    """Liczniki w przedziałach [0, 1), [1, 2), [2, 4), ... [2^i, 2^(i+1))."""
+
+    def __init__(self) -> None:
+        self.bins: Dict[int, int] = collections.Counter()
+
+    def add(self, x: float) -> None:
+        self.bins[0 if x < 1 else int(math.log2(x)) + 1] += 1
+
+    def merge(self, other: "Log2Histogram") -> None:
+        self.bins.update(other.bins)
+
+    @staticmethod
+    def label(i: int) -> str:
+        return "0" if i == 0 else f"{2 ** (i - 1)}-{2 ** i - 1}"
+
+    def items(self) -> List[Tuple[str, int]]:
+        return [(self.label(i), self.bins[i]) for i in sorted(self.bins)]
+
+
+class FieldSketch:
+    """Rozkład liczbowego pola: statystyki + kwantyle + histogram log2."""
+
+    def __init__(self) -> None:
+        self.stats = RunningStats()
+        self.digest = TDigest()
+        self.hist = Log2Histogram()
+
+    def add(self, x: float) -> None:
+        self.stats.add(x)
+        self.digest.add(x)
+        self.hist.add(x)
+
+    def merge(self, other: "FieldSketch") -> None:
+        self.stats.merge(other.stats)
+        self.digest.merge(other.digest)
+        self.hist.merge(other.hist)
+
+    def summary(self, quantiles: Iterable[float] = (0.5, 0.9, 0.99)) -> Dict[str, Any]:
+        if not self.stats.count:
+            return {"count": 0}
+        out = {
+            "count": self.stats.count,
+            "mean": self.stats.mean,
+            "std": self.stats.std,
+            "min": self.stats.min,
+            "max": self.stats.max,
+        }
+        out.update({f"p{round(q * 100):d}": self.digest.quantile(q) for q in quantiles})
+        return out
+
+
+class DatasetSketch:
+    """Jednoprzebiegowy profil datasetu; pola tworzone przy pierwszym użyciu."""
+
+    def __init__(self, sample_size: int = 3, seed: int = 42) -> None:
+        self.records = 0
+        self.categories: Dict[str, collections.Counter] = collections.defaultdict(collections.Counter)
+        self.fields: Dict[str, FieldSketch] = collections.defaultdict(FieldSketch)
+        self.distinct: Dict[str, HyperLogLog] = collections.defaultdict(HyperLogLog)
+        self.sample_size = sample_size
+        self.samples: List[Tuple[int, Dict[str, Any]]] = []
+        self._rng = random.Random(seed)
+
+    def add_record(self, record: Dict[str, Any]) -> None:
+        """Liczy rekord i uwzględnia go w próbce (reservoir sampling, kolejność wejścia)."""
+        self.records += 1
+        if len(self.samples) < self.sample_size:
+            self.samples.append((self.records, record))
+        else:
+            j = self._rng.randrange(self.records)
+            if j < self.sample_size:
+                self.samples[j] = (self.records, record)
+
+    def count(self, name: str, value: Any) -> None:
+        self.categories[name][value] += 1
+
+    def observe(self, name: str, value: float) -> None:
+        self.fields[name].add(value)
+
+    def add_distinct(self, name: str, value: str) -> None:
+        self.distinct[name].add(value)
+
+    def sample(self) -> List[Dict[str, Any]]:
+        return [record for _, record in sorted(self.samples, key=lambda s: s[0])]
+
+    def merge(self, other: "DatasetSketch") -> None:
+        self.records += other.records
+        for name, counter in other.categories.items():
+            self.categories[name].update(counter)
+        for name, field in other.fields.items():
+            self.fields[name].merge(field)
+        for name, hll in other.distinct.items():
+            self.distinct[name].merge(hll)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "records": self.records,
+            "categories": {k: dict(v.most_common()) for k, v in self.categories.items()},
+            "fields": {k: v.summary() for k, v in self.fields.items()},
+            "token_histograms": {k: v.hist.items() for k, v in self.fields.items() if k.endswith("_tokens")},
+            "distinct": {k: len(v) for k, v in self.distinct.items()},
+        }
+
+
+def iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def build_token_counter(tokenizer: Optional[str] = "config") -> TokenCounter:
+    """"config" => tokenizer z sekcji segmentation; None/"" => heurystyka znakowa."""
+    if tokenizer == "config":
+        tokenizer = load_segmentation_config().get("tokenizer")
+    return TokenCounter(tokenizer or None)
+
+
+def sketch_records(
+    records: Iterable[Dict[str, Any]],
+    observe: Callable[[DatasetSketch, Dict[str, Any]], Dict[str, str]],
+    token_counter: Optional[TokenCounter] = None,
+    batch_size: int = 256,
+    sketch: Optional[DatasetSketch] = None,
+) -> DatasetSketch:
+    """
+    Jedno przejście: observe(sketch, rekord) aktualizuje liczniki i zwraca teksty
+    {pole: tekst}, dla których liczone są tokeny (pole "<pole>_tokens"). Pamięć: jedna paczka.
+    """
+    sketch = sketch or DatasetSketch()
+    batch: List[Tuple[str, str]] = []
+
+    def flush() -> None:
+        if token_counter is None or not batch:
+            batch.clear()
+            return
+        for (name, _), n in zip(batch, token_counter.counts([text for _, text in batch])):
+            sketch.observe(f"{name}_tokens", n)
+        batch.clear()
+
+    for record in records:
+        sketch.add_record(record)
+        for name, text in (observe(sketch, record) or {}).items():
+            batch.append((name, text))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return sketch
+
+
+def observe_instruction(sketch: DatasetSketch, record: Dict[str, Any]) -> Dict[str, str]:
+    """Rekord instruction datasetu (instruction/response/metadata)."""
+    metadata = record.get("metadata") or {}
+    instruction = record.get("instruction", "")
+    response = record.get("response", "")
+    sketch.count("language", metadata.get("language", "unknown"))
+    sketch.count("source", metadata.get("source", "unknown"))
+    sketch.observe("instruction_chars", len(instruction))
+    sketch.observe("response_chars", len(response))
+    sketch.add_distinct("instruction", instruction)
+    sketch.add_distinct("response", response)
+    return {"instruction": instruction, "response": response}
+
+
+def analyze_instruction_file(path: Path, tokenizer: Optional[str] = "config") -> DatasetSketch:
+    counter = build_token_counter(tokenizer) if tokenizer is not None else None
+    return sketch_records(iter_jsonl(path), observe_instruction, token_counter=counter)
@@ -0,0 +1,153 @@
+"""
+Przyrostowy eksport transkrypcji do data/raw (append-only):
+- Skanuje leniwie data/youtube/<video_id>.json (niezmienione pliki nie są nawet parsowane,
+  decyduje mtime/rozmiar zapisany w manifeście).
+- Klucz segmentu: (video_id, indeks segmentu) — ID rekordu <video_id>_seg_<indeks>.
+- Dopisuje tylko segmenty o indeksach, których jeszcze nie wyeksportowano.
+- Manifest (data/raw/youtube_transcripts.manifest.json) zapisywany atomowo po fsync JSONL;
+  po przerwaniu między zapisami ogon JSONL za zapamiętanym offsetem jest doczytywany
+  i wliczany do manifestu, więc ponowne uruchomienie nie tworzy duplikatów; niepełna ostatnia
+  linia (crash w trakcie zapisu) jest obcinana przed dopisywaniem.
+- Plik wyjściowy bez manifestu (eksport sprzed formatu przyrostowego, ID z globalnego licznika)
+  jest odkładany obok (*.jsonl.legacy) i eksport zaczyna się od zera.
+
+Wejście: data/youtube/*.json
+Wyjście: data/raw/youtube_transcripts.jsonl
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from processing.segmenter import build_segmenter, transcript_records
+
+IN_DIR = ROOT / "data" / "youtube"
+OUT_PATH = ROOT / "data" / "raw" / "youtube_transcripts.jsonl"
+MANIFEST_PATH = OUT_PATH.with_suffix(".manifest.json")
+
+SEG_ID_RE = re.compile(r"^(.+)_seg_(\d+)$")
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> Dict[str, Any]:
+    if not path.exists():
+        return {"offset": 0, "videos": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_manifest(manifest: Dict[str, Any], path: Path = MANIFEST_PATH) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def move_legacy_output(out_path: Path = OUT_PATH) -> None:
+    """Eksport bez manifestu ma ID segmentów z globalnego licznika — nie da się na nim wznowić."""
+    if not out_path.exists() or out_path.stat().st_size == 0:
+        return
+    legacy = out_path.with_suffix(".jsonl.legacy")
+    n = 1
+    while legacy.exists():
+        legacy = out_path.with_suffix(f".jsonl.legacy{n}")
+        n += 1
+    os.replace(out_path, legacy)
+    print(f"⚠️  {out_path.name} bez manifestu — przeniesiony do {legacy.name}, eksport od nowa")
+
+
+def recover_tail(manifest: Dict[str, Any], out_path: Path = OUT_PATH) -> None:
+    """Wlicza do manifestu rekordy dopisane po ostatnim zapisie manifestu (np. po crashu)."""
+    if not out_path.exists():
+        manifest["offset"] = 0
+        return
+    size = out_path.stat().st_size
+    if size <= manifest["offset"]:
+        return
+    videos = manifest["videos"]
+    with out_path.open("rb+") as f:
+        f.seek(manifest["offset"])
+        pos = manifest["offset"]
+        for line in f:
+            if not line.endswith(b"\n"):
+                # Niepełny rekord po crashu — obcięty, inaczej następny zapis skleiłby się z nim
+                f.truncate(pos)
+                size = pos
+                break
+            pos += len(line)
+            try:
+                rec_id = json.loads(line)["data"]["id"]
+            except (ValueError, KeyError):
+                continue
+            match = SEG_ID_RE.match(rec_id)
+            if not match:
+                continue
+            entry = videos.setdefault(match.group(1), {"exported": 0})
+            entry["exported"] = max(entry["exported"], int(match.group(2)) + 1)
+    manifest["offset"] = size
+
+
+def iter_changed_transcripts(
+    manifest: Dict[str, Any], in_dir: Path = IN_DIR
+) -> Iterator[Tuple[Path, Dict[str, Any]]]:
+    """Leniwie: (plik, transkrypcja) tylko dla plików nowych lub zmienionych od manifestu."""
+    videos = manifest["videos"]
+    for path in sorted(in_dir.glob("*.json")):
+        st = path.stat()
+        entry = videos.get(path.stem)
+        if entry and entry.get("mtime") == st.st_mtime and entry.get("size") == st.st_size:
+            continue
+        try:
+            transcript = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            continue
+        if not isinstance(transcript, dict) or "video_id" not in transcript:
+            continue
+        if not (transcript.get("transcript") or {}).get("text"):
+            continue
+        yield path, transcript
+
+
+def export_transcripts(in_dir: Path = IN_DIR, out_path: Path = OUT_PATH) -> int:
+    """Dopisuje nowe segmenty do out_path; zwraca liczbę dopisanych rekordów."""
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_path.with_suffix(".manifest.json")
+    if not manifest_path.exists():
+        move_legacy_output(out_path)
+    manifest = load_manifest(manifest_path)
+    recover_tail(manifest, out_path)
+    videos = manifest["videos"]
+
+    count_tokens, max_tokens, overlap_tokens = build_segmenter()
+    written = 0
+    with out_path.open("a", encoding="utf-8") as fout:
+        for path, transcript in iter_changed_transcripts(manifest, in_dir):
+            video_id = transcript["video_id"]
+            entry = videos.setdefault(video_id, {"exported": 0})
+            new = 0
+            for rec in transcript_records(transcript, count_tokens, max_tokens, overlap_tokens):
+                if rec["data"]["raw"]["segment_index"] < entry["exported"]:
+                    continue
+                fout.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                new += 1
+            fout.flush()
+            os.fsync(fout.fileno())
+            st = path.stat()
+            entry.update(exported=entry["exported"] + new, mtime=st.st_mtime, size=st.st_size)
+            manifest["offset"] = out_path.stat().st_size
+            save_manifest(manifest, manifest_path)
+            written += new
+    return written
+
+
+def main() -> None:
+    written = export_transcripts()
+    print(f"Zapisano: {OUT_PATH} (nowe segmenty={written})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark ładowania danych (ml/dataloading.py): czy kroki treningu czekają na batch.
+- Dane: cache tokenów profilu cpu_smoke (syntetyczne przykłady + tokenizer BPE, bez pobierania
+  z Hub), przeskalowane do --max-length / --num-examples; pakowanie z maską 4D jak w treningu.
+- Krok treningu symulowany: --compute-ms (sleep = wątek główny czeka na GPU; krok LoRA 7B przy
+  4x2048 tokenów na RTX 4090 to rząd sekund). Raport podaje też koszt samej kolacji batcha —
+  przy mniejszym zapasie potrzeba więcej workerów (i rdzeni).
+- Porównanie: zwykły DataLoader (kolacja w pętli treningowej) vs PrefetchLoader dla kolejnych
+  num_workers / prefetch.
+- Raport po rozgrzewce: średnie i p99 oczekiwanie na batch, kroki "głodne" i sprawność =
+  czas compute / czas kroku. Głodny krok: PrefetchLoader — kolejka pusta w chwili pobrania
+  (batch jeszcze niegotowy); zwykły DataLoader — oczekiwanie > --starved-ms. Samo oczekiwanie
+  przy pełnej kolejce to przejęcie GIL od wątku prefetchu (do 5 ms, sys.getswitchinterval).
+
+Użycie:
+    python scripts/benchmark_dataloading.py
+    python scripts/benchmark_dataloading.py --compute-ms 20 --workers 0 1 2 4 --prefetch 2 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import torch
+from torch.utils.data import DataLoader, RandomSampler
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ml.dataloading import PrefetchLoader
+from ml.train import build_collator, build_datasets, load_config, resolve_data, resolve_tokenizer_name
+
+
+def measure(loader, steps: int, warmup: int, compute_s: float):
+    waits = []
+    it = iter(loader)
+    start = None
+    starved_at_warmup = 0
+    for step in range(warmup + steps):
+        t0 = time.perf_counter()
+        if step == warmup:
+            start = t0
+            starved_at_warmup = loader.stats["starved"] if hasattr(loader, "stats") else 0
+        next(it)
+        if step >= warmup:
+            waits.append(time.perf_counter() - t0)
+        time.sleep(compute_s)
+    total = time.perf_counter() - start
+    starved = None
+    if hasattr(loader, "stats"):
+        starved = loader.stats["starved"] - starved_at_warmup
+        loader.close()
+    return waits, total, starved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prefetchu i workerów DataLoadera")
+    parser.add_argument("--config", default="cpu_smoke", help="konfiguracja launchera (dane, tokenizer, kolator)")
+    parser.add_argument("--max-length", type=int, default=2048)
+    parser.add_argument("--num-examples", type=int, default=8000)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--compute-ms", type=float, default=200.0, help="symulowany czas kroku")
+    parser.add_argument("--steps", type=int, default=60)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--prefetch", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--starved-ms", type=float, default=1.0, help="próg głodnego kroku (zwykły DataLoader)")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    config = load_config(args.config, [
+        f"max_length={args.max_length}",
+        f'data.synthetic={{"num_examples": {args.num_examples}, "seed": 0}}',
+    ])
+    files = resolve_data(config)
+    files["eval"] = None
+    tokenizer_name = resolve_tokenizer_name(config, files)
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_name, use_fast=True)
+    pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+    train = build_datasets(config, tokenizer_name, files)["train"]
+    collator = build_collator(config, pad_id, torch.bfloat16 if args.device == "cuda" else torch.float32)
+    compute_s = args.compute_ms / 1000
+    steps = min(args.steps, len(train) // args.batch_size - args.warmup)  # jedna epoka, bez restartu iteratora
+    if steps <= 0:
+        sys.exit("Za mało danych na rozgrzewkę i pomiar (zwiększ --num-examples)")
+    start = time.perf_counter()
+    for k in range(5):
+        collator([train[i] for i in range(k * args.batch_size, (k + 1) * args.batch_size)])
+    collate_ms = (time.perf_counter() - start) / 5 * 1000
+    print(f"📊 {len(train)} sekwencji (max_length={args.max_length}, batch={args.batch_size}), {os.cpu_count()} CPU, {args.device}")
+    print(f"   kolacja: {collate_ms:.1f} ms/batch, compute: {args.compute_ms:.0f} ms/krok, "
+          f"{steps} kroków po {args.warmup} rozgrzewki")
+
+    runs = [("DataLoader (kolacja w pętli)", lambda: DataLoader(
+        train, batch_size=args.batch_size, sampler=RandomSampler(train, generator=torch.Generator().manual_seed(0)),
+        collate_fn=collator,
+    ))]
+    for workers in args.workers:
+        for prefetch in args.prefetch:
+            runs.append((f"Prefetch w={workers} q={prefetch}", lambda w=workers, q=prefetch: PrefetchLoader(
+                train, collator, args.batch_size, num_workers=w, prefetch=q, device=torch.device(args.device), seed=0,
+            )))
+
+    for name, make in runs:
+        waits, total, starved = measure(make(), steps, args.warmup, compute_s)
+        ms = sorted(1000 * w for w in waits)
+        if starved is None:
+            starved = sum(w > args.starved_ms for w in ms)
+        p99 = ms[min(len(ms) - 1, int(0.99 * len(ms)))]
+        status = "✅" if starved == 0 else "❌"
+        print(
+            f"   {status} {name:<30} oczekiwanie: śr. {statistics.mean(ms):7.2f} ms  p99 {p99:7.2f} ms  "
+            f"głodne kroki: {starved:>3}/{len(ms)}  sprawność: {compute_s * len(ms) / total:6.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Benchmark pakowania SFT na CPU (mały losowy model Llama, bez pobierania wag):
+- efektywność tokenów: padding do max_length vs dynamiczny padding z grupowaniem po długości
+  vs pakowanie (ml/packing.py) — na długościach z train_dataset.jsonl albo syntetycznych,
+- czas forward+backward każdej strategii na przeskalowanych długościach,
+- zgodność lossu: suma lossów tokenów w batchach spakowanych/z paddingiem == suma po
+  przykładach liczonych osobno (ta sama liczba tokenów z etykietą).
+
+Użycie:
+    python scripts/benchmark_packing.py                     # długości syntetyczne
+    python scripts/benchmark_packing.py --data data/curated/train_dataset.jsonl
+"""
+import argparse
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+import torch
+import torch.nn.functional as F
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ml.packing import (
+    IGNORE_INDEX,
+    PackedCollator,
+    PaddingCollator,
+    format_example,
+    length_grouped_batches,
+    pack_examples,
+    plan_packs,
+    token_efficiency,
+)
+from processing.sketches import iter_jsonl
+
+CHARS_PER_TOKEN = 3.5  # przybliżenie dla tekstu PL bez ładowania tokenizera
+
+
+def dataset_lengths(path: Path, max_length: int):
+    return [
+        min(max_length, max(2, math.ceil(len(format_example(rec)) / CHARS_PER_TOKEN)))
+        for rec in iter_jsonl(path)
+        if "instruction" in rec and "response" in rec
+    ]
+
+
+def synthetic_lengths(n: int, max_length: int, seed: int):
+    rng = random.Random(seed)
+    return [min(max_length, max(2, int(rng.lognormvariate(math.log(max_length / 4), 0.6)))) for _ in range(n)]
+
+
+def efficiency_report(lengths, max_length: int, batch_size: int, multiple: int = 8):
+    real = sum(lengths)
+    pad_max = len(lengths) * max_length
+
+    def padded(batches, size):
+        return sum(len(b) * min(max_length, -(-max(size(i) for i in b) // multiple) * multiple) for b in batches)
+
+    order = list(range(len(lengths)))
+    random.Random(0).shuffle(order)
+    dynamic = padded([order[k:k + batch_size] for k in range(0, len(order), batch_size)], lambda i: lengths[i])
+    grouped = padded(length_grouped_batches(lengths, batch_size), lambda i: lengths[i])
+    plan = plan_packs(lengths, max_length)
+    pack_lens = [sum(lengths[i] for i in p) for p in plan]
+    packed_order = list(range(len(plan)))
+    packed = padded([packed_order[k:k + batch_size] for k in range(0, len(plan), batch_size)], lambda i: pack_lens[i])
+    return {
+        "padding max_length": (pad_max, len(lengths)),
+        "dynamiczny padding": (dynamic, len(lengths)),
+        "group_by_length": (grouped, len(lengths)),
+        "pakowanie": (packed, len(plan)),
+    }, real
+
+
+def tiny_model(vocab_size: int, max_length: int, attn: str):
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    torch.manual_seed(0)
+    config = LlamaConfig(
+        vocab_size=vocab_size,
+        hidden_size=64,
+        intermediate_size=128,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=2,
+        max_position_embeddings=max_length,
+        attn_implementation=attn,
+    )
+    return LlamaForCausalLM(config)
+
+
+def token_loss_sum(model, batch):
+    """Suma (nie średnia) lossów tokenów z etykietą + ich liczba."""
+    labels = batch.pop("labels")
+    logits = model(**batch).logits[:, :-1]
+    targets = labels[:, 1:]
+    loss = F.cross_entropy(logits.reshape(-1, logits.size(-1)).float(), targets.reshape(-1), ignore_index=IGNORE_INDEX, reduction="sum")
+    return loss, int((targets != IGNORE_INDEX).sum())
+
+
+def run_strategy(model, batches, backward: bool):
+    total, tokens = 0.0, 0
+    start = time.perf_counter()
+    for batch in batches:
+        loss, n = token_loss_sum(model, dict(batch))
+        if backward:
+            model.zero_grad(set_to_none=True)
+            (loss / max(n, 1)).backward()
+        total += loss.item()
+        tokens += n
+    return total, tokens, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pakowania przykładów SFT (CPU)")
+    parser.add_argument("--data", type=Path, help="JSONL instruction/response (domyślnie: długości syntetyczne)")
+    parser.add_argument("--max-length", type=int, default=2048, help="max_length treningu (raport efektywności)")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--num-examples", type=int, default=2000, help="liczba przykładów syntetycznych")
+    parser.add_argument("--tiny-max-length", type=int, default=256, help="max_length w teście na małym modelu")
+    parser.add_argument("--tiny-examples", type=int, default=64)
+    parser.add_argument("--attn", default="sdpa", choices=["eager", "sdpa"])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.data:
+        lengths = dataset_lengths(args.data, args.max_length)
+        source = f"{args.data} (~{CHARS_PER_TOKEN} znaku/token)"
+    else:
+        lengths = synthetic_lengths(args.num_examples, args.max_length, args.seed)
+        source = "syntetyczne (log-normalne)"
+    if not lengths:
+        sys.exit("Brak przykładów")
+
+    report, real = efficiency_report(lengths, args.max_length, args.batch_size)
+    print(f"📊 {len(lengths)} przykładów, {source}, max_length={args.max_length}, batch={args.batch_size}")
+    print(f"   średnia długość: {real / len(lengths):.0f} tokenów")
+    for name, (positions, rows) in report.items():
+        print(f"   {name:<20} pozycje: {positions:>12,}  wiersze: {rows:>7,}  efektywność: {token_efficiency([real], [positions]):6.1%}")
+
+    # --- mały model: czas i zgodność lossu ---------------------------------------------
+    L = args.tiny_max_length
+    scale = L / args.max_length
+    rng = random.Random(args.seed)
+    sample = rng.sample(lengths, min(args.tiny_examples, len(lengths)))
+    vocab = 512
+    examples = []
+    for n in sample:
+        ids = [rng.randrange(3, vocab) for _ in range(max(2, int(n * scale)))]
+        examples.append({"input_ids": ids, "labels": list(ids)})
+    model = tiny_model(vocab, L, args.attn)
+    pad_id = 0
+
+    def batches_of(features, collator):
+        return [collator(features[k:k + args.batch_size]) for k in range(0, len(features), args.batch_size)]
+
+    strategies = {
+        "padding max_length": batches_of(examples, PaddingCollator(pad_id, pad_to_multiple_of=L)),
+        "group_by_length": [
+            PaddingCollator(pad_id)([examples[i] for i in b])
+            for b in length_grouped_batches([len(e["input_ids"]) for e in examples], args.batch_size)
+        ],
+        "pakowanie": batches_of(
+            list(pack_examples(examples, plan_packs([len(e["input_ids"]) for e in examples], L), L)),
+            PackedCollator(pad_id),
+        ),
+    }
+
+    model.eval()
+    with torch.no_grad():
+        reference, ref_tokens = 0.0, 0
+        for ex in examples:
+            loss, n = token_loss_sum(model, {"input_ids": torch.tensor([ex["input_ids"]]), "labels": torch.tensor([ex["labels"]])})
+            reference += loss.item()
+            ref_tokens += n
+
+    print(f"\n🧪 Mały model ({args.attn}, max_length={L}, {len(examples)} przykładów)")
+    print(f"   osobno: suma lossu {reference:.4f}, tokeny {ref_tokens}")
+    for name, batches in strategies.items():
+        with torch.no_grad():
+            total, tokens, _ = run_strategy(model.eval(), [dict(b) for b in batches], backward=False)
+        _, _, seconds = run_strategy(model.train(), [dict(b) for b in batches], backward=True)
+        positions = sum(b["input_ids"].numel() for b in batches)
+        diff = abs(total - reference) / max(abs(reference), 1e-9)
+        status = "✅" if tokens == ref_tokens and diff < 1e-4 else "❌"
+        print(
+            f"   {status} {name:<20} batche: {len(batches):>3}  pozycje: {positions:>7,}  "
+            f"fwd+bwd: {seconds:6.2f}s  loss różnica: {diff:.2e}  tokeny: {tokens}"
+        )
+
+
+if __name__ == "__main__":
+    main()
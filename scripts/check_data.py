@@ -1,28 +1,38 @@
 #!/usr/bin/env python3
 
 import json
-import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from processing.sketches import iter_jsonl, observe_instruction, sketch_records
 
 # Autowykrywanie ścieżki danych
-if os.path.exists('data/train_dataset.jsonl'):
+if Path('data/train_dataset.jsonl').exists():
     data_path = 'data'
-elif os.path.exists('export_training/data/train_dataset.jsonl'):
+elif Path('export_training/data/train_dataset.jsonl').exists():
     data_path = 'export_training/data'
 else:
     data_path = 'data'
 
 try:
-    with open(f'{data_path}/train_dataset.jsonl') as f:
-        train_count = sum(1 for _ in f)
-    with open(f'{data_path}/eval_dataset.jsonl') as f:
+    # Jedno przejście po train (licznik, języki, źródła, długości, przykład); eval tylko zliczany.
+    # Tokenów nie liczymy — szybki check bez ładowania tokenizera (pełna analiza:
+    # datasets/analyze_instruction_dataset.py).
+    train = sketch_records(iter_jsonl(Path(f'{data_path}/train_dataset.jsonl')), observe_instruction)
+    train_count = train.records
+    with open(f'{data_path}/eval_dataset.jsonl', 'rb') as f:
         eval_count = sum(1 for _ in f)
     print(f'✅ Dane znalezione w: {data_path}/')
     print(f'📊 Train samples: {train_count}')
     print(f'📊 Eval samples: {eval_count}')
     
     # Sprawdź przykładowy rekord treningowy
-    with open(f'{data_path}/train_dataset.jsonl', 'r', encoding='utf-8') as f:
-        sample = json.loads(f.readline())
+    samples = train.sample()
+    if samples:
+        sample = samples[0]
         print(f'\n📋 Przykładowy rekord treningowy:')
         instruction = sample["instruction"][:100]
         response = sample["response"][:100]
@@ -33,25 +43,18 @@ try:
             print(f'Source: {metadata.get("source", "N/A")}')
             print(f'Language: {metadata.get("language", "N/A")}')
             print(f'Topics: {metadata.get("topics", [])}')
-        
-    # Sprawdź rozkład języków
-    languages = {}
-    sources = {}
-    with open(f'{data_path}/train_dataset.jsonl', 'r', encoding='utf-8') as f:
-        for line in f:
-            record = json.loads(line)
-            if 'metadata' in record:
-                lang = record['metadata'].get('language', 'unknown')
-                source = record['metadata'].get('source', 'unknown')
-                languages[lang] = languages.get(lang, 0) + 1
-                sources[source] = sources.get(source, 0) + 1
     
+    if train_count:
+        response_chars = train.fields['response_chars'].summary()
+        print(f'\n📏 Długość odpowiedzi: mediana {response_chars["p50"]:.0f}, p99 {response_chars["p99"]:.0f} znaków')
+    
+    # Rozkład języków
     print(f'\n🌍 Rozkład języków:')
-    for lang, count in sorted(languages.items(), key=lambda x: x[1], reverse=True):
+    for lang, count in train.categories['language'].most_common():
         print(f'  {lang}: {count} ({count/train_count*100:.1f}%)')
     
     print(f'\n📰 Top 5 źródeł:')
-    for source, count in sorted(sources.items(), key=lambda x: x[1], reverse=True)[:5]:
+    for source, count in train.categories['source'].most_common(5):
         print(f'  {source}: {count} ({count/train_count*100:.1f}%)')
         
 except FileNotFoundError as e:
@@ -60,4 +63,4 @@ except FileNotFoundError as e:
 except json.JSONDecodeError as e:
     print(f'❌ Błąd parsowania JSON: {e}')
 except Exception as e:
-    print(f'❌ Nieoczekiwany błąd: {e}')
\ No newline at end of file
+    print(f'❌ Nieoczekiwany błąd: {e}')
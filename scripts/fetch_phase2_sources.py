@@ -8,7 +8,8 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.append(str(ROOT))
 
-from ingest.rss_fetcher import fetch_feed, rate_limit_sleep, slugify
+from ingest.rss_fetcher import fetch_new_entries, mark_seen, rate_limit_sleep, slugify
+from ingest.url_store import UrlStore
 import json
 
 # FAZA 2 - działające źródła
@@ -52,20 +53,22 @@ def fetch_phase2_sources():
     print("=== POBIERANIE ŹRÓDEŁ FAZY 2 ===\n")
     
     total_fetched = 0
+    store = UrlStore.from_config()
     
     for source in PHASE2_SOURCES:
         print(f"Fetching: {source['name']}")
         print(f"URL: {source['feed']}")
         
         try:
-            # Fetch articles from this source 
-            articles = list(fetch_feed(
-                url=source['feed'],
+            # Tylko artykuły nieznane z wcześniejszych uruchomień / innych fetcherów
+            articles = list(fetch_new_entries(
+                source['feed'],
+                store,
                 user_agent="SatyrAI-bot/0.1"
             ))
             
             if articles:
-                print(f"  ✅ Pobrano: {len(articles)} artykułów")
+                print(f"  ✅ Nowe: {len(articles)} artykułów")
                 total_fetched += len(articles)
                 
                 # Dodaj metadane do każdego artykułu
@@ -86,13 +89,16 @@ def fetch_phase2_sources():
                 output_file = ROOT / "data" / "raw" / f"phase2-{slug}.jsonl"
                 output_file.parent.mkdir(parents=True, exist_ok=True)
                 
-                with output_file.open('w', encoding='utf-8') as f:
+                with output_file.open('a', encoding='utf-8') as f:
                     for enriched in enriched_articles:
                         f.write(json.dumps(enriched, ensure_ascii=False) + '\n')
                 
-                print(f"  💾 Zapisano do: {output_file}")
+                # Do magazynu dopiero po zapisie — przy błędzie wpisy zostaną pobrane ponownie
+                mark_seen(store, articles)
+                store.commit()
+                print(f"  💾 Dopisano do: {output_file}")
             else:
-                print(f"  ❌ Brak artykułów")
+                print(f"  ❌ Brak nowych artykułów")
                 
         except Exception as e:
             print(f"  ❌ Błąd: {e}")
@@ -101,6 +107,7 @@ def fetch_phase2_sources():
         rate_limit_sleep(source['rate_limit_rps'])
         print()
     
+    store.close()
     print(f"=== PODSUMOWANIE FAZY 2 ===")
     print(f"Łącznie pobrano: {total_fetched} nowych artykułów")
     print(f"Lokalizacja: {ROOT}/data/raw/phase2-*.jsonl")
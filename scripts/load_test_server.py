@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test obciążeniowy serwera generacji (ml/server.py): przepustowość przy rosnącej współbieżności.
+- Klienci w wątkach wysyłają strumieniowe POST /generate (SSE); TTFT = pierwszy fragment
+  tekstu, opóźnienie = [DONE].
+- Raport per poziom: żądania/s, tokeny/s, TTFT i opóźnienie p50/p99 (SLO z
+  docs/system_architecture.md: P99 < 8 s), średni batch po stronie serwera (/metrics).
+- --tiny uruchamia serwer w tym procesie (mały losowy model na CPU), bez --url.
+- --adapters: żądania rozkładane po kolei na podane adaptery ("base" = model bazowy) — batche
+  mieszane; przy --tiny --tiny-adapters N powstają losowe adaptery tiny-0..N-1.
+
+Użycie:
+    python scripts/load_test_server.py --tiny --concurrency 1 4 16
+    python scripts/load_test_server.py --url http://127.0.0.1:8000 --prompts eval_prompts.txt --requests 200
+    python scripts/load_test_server.py --tiny --tiny-adapters 2 --adapters base tiny-0 tiny-1
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+SLO_P99_S = 8.0
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else float("nan")
+
+
+def one_request(url: str, prompt: str, max_tokens: int, seed: int, adapter=None):
+    start = time.perf_counter()
+    ttft = None
+    tokens = 0
+    payload = {"instruction": prompt, "max_tokens": max_tokens, "stream": True, "seed": seed}
+    if adapter:
+        payload["adapter"] = adapter
+    with requests.post(f"{url}/generate", json=payload, stream=True, timeout=600) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line.startswith(b"data: "):
+                continue
+            data = line[len(b"data: "):]
+            if data == b"[DONE]":
+                break
+            chunk = json.loads(data)
+            if ttft is None and chunk["choices"][0]["text"]:
+                ttft = time.perf_counter() - start
+            if "usage" in chunk:
+                tokens = chunk["usage"]["completion_tokens"]
+    latency = time.perf_counter() - start
+    return ttft if ttft is not None else latency, latency, tokens
+
+
+def run_level(url: str, prompts, concurrency: int, total: int, max_tokens: int, adapters=()):
+    results, errors = [], []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            try:
+                adapter = adapters[i % len(adapters)] if adapters else None
+                result = one_request(url, prompts[i % len(prompts)], max_tokens, seed=i, adapter=adapter)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                results.append(result)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test obciążeniowy serwera generacji")
+    parser.add_argument("--url", help="adres serwera (np. http://127.0.0.1:8000)")
+    parser.add_argument("--tiny", action="store_true", help="uruchom serwer z małym modelem w tym procesie")
+    parser.add_argument("--max-batch", type=int, default=16, help="batch serwera przy --tiny")
+    parser.add_argument("--prompts", type=Path, help="plik promptów (.txt / .jsonl)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=48, help="żądań na poziom współbieżności")
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--adapters", nargs="+", default=[], help="adaptery żądań po kolei (base = bez adaptera)")
+    parser.add_argument("--tiny-adapters", type=int, default=0, help="losowe adaptery przy --tiny")
+    parser.add_argument("--max-adapters", type=int, default=4, help="pojemność puli adapterów przy --tiny")
+    args = parser.parse_args()
+
+    server = None
+    if args.tiny:
+        from ml.server import build_server
+
+        server = build_server(
+            tiny=True, max_batch=args.max_batch, max_adapters=args.max_adapters, tiny_adapters=args.tiny_adapters
+        )
+        url = server.start_background()
+    elif args.url:
+        url = args.url.rstrip("/")
+    else:
+        sys.exit("Podaj --url albo --tiny")
+
+    if args.prompts:
+        from ml.generation import load_prompts
+
+        prompts = load_prompts(args.prompts)
+    else:
+        topics = ["inflacji", "podatków", "biurokracji", "wyborów", "budżetu", "reformy", "sondaży", "koalicji"]
+        prompts = [f"Napisz satyryczny komentarz o {t}" + " w Polsce" * (i % 3) for i, t in enumerate(topics * 4)]
+
+    version = requests.get(f"{url}/health", timeout=10).json()["model"]
+    print(f"🎯 {url} ({version}), {args.requests} żądań na poziom, max_tokens={args.max_tokens}")
+    if args.adapters:
+        print(f"   adaptery: {', '.join(args.adapters)}")
+    for concurrency in args.concurrency:
+        before = requests.get(f"{url}/metrics", timeout=10).json()
+        results, errors, wall = run_level(url, prompts, concurrency, args.requests, args.max_tokens, args.adapters)
+        metrics = requests.get(f"{url}/metrics", timeout=10).json()
+        if not results:
+            print(f"   ❌ c={concurrency}: brak udanych żądań ({errors[:1]})")
+            continue
+        ttft = [r[0] for r in results]
+        latency = [r[1] for r in results]
+        tokens = sum(r[2] for r in results)
+        p99 = percentile(latency, 0.99)
+        status = "✅" if p99 < SLO_P99_S and not errors else "❌"
+        print(
+            f"   {status} c={concurrency:<3} {len(results) / wall:6.2f} req/s  {tokens / wall:8.1f} tok/s  "
+            f"TTFT p50 {statistics.median(ttft):6.3f}s p99 {percentile(ttft, 0.99):6.3f}s  "
+            f"opóźnienie p50 {statistics.median(latency):6.3f}s p99 {p99:6.3f}s  "
+            f"batch śr. {metrics['mean_batch_size']}  błędy {len(errors)}"
+            + (f"  (tokeny serwera: {metrics['generated_tokens'] - before['generated_tokens']})" if errors else "")
+        )
+    if args.adapters:
+        pool = requests.get(f"{url}/v1/adapters", timeout=10).json()
+        print(f"📊 pula adapterów: w pamięci {', '.join(pool['loaded']) or '-'} (trafienia {pool['hits']}, "
+              f"ładowania {pool['loads']}, usunięte {pool['evictions']})")
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,31 @@
 Szybka transkrypcja Mentzena z modelem 'tiny'.
 """
 import json
+import sys
 from pathlib import Path
 from datetime import datetime
 
 ROOT = Path(__file__).resolve().parents[1]
-AUDIO_DIR = ROOT / "audio"
+sys.path.append(str(ROOT))
+
+from ingest.audio_cache import AudioCache
+from ingest.segment_store import segments_from_whisper, write_segments
+
+AUDIO_DIR = ROOT / "audio"  # stary układ — pliki są przenoszone do cache audio
 TRANSCRIPTS_DIR = ROOT / "data" / "youtube"
 
 def fast_transcribe():
     """Szybka transkrypcja z modelem tiny."""
     
     video_id = "2AjJtjXpZho" 
-    audio_file = AUDIO_DIR / f"{video_id}.mp3"
     transcript_file = TRANSCRIPTS_DIR / f"{video_id}.json"
     
-    if not audio_file.exists():
+    # Tylko cache (bez sieci): plik pobrany wcześniej przez mentzen_single_test / pipeline
+    audio_cache = AudioCache.from_config()
+    audio_file = audio_cache.fetch_audio(
+        video_id, "mp3", lambda d: None, legacy_path=AUDIO_DIR / f"{video_id}.mp3"
+    )
+    if not audio_file:
         print("❌ Brak pliku audio")
         return
     
@@ -35,6 +45,11 @@ def fast_transcribe():
         print("🎤 Rozpoczynam szybką transkrypcję...")
         result = model.transcribe(str(audio_file), language="pl")
         
+        # Pełne segmenty z czasami -> kolumnowy magazyn (kompaktowy, zamiast ucinać do 3)
+        seg_dir = write_segments(
+            video_id, segments_from_whisper(result), "whisper", meta={"channel_key": "mentzen"}
+        )
+        
         transcript_data = {
             "video_id": video_id,
             "title": "MENTZEN GRILLUJE #76: Ziobro kontratakuje",
@@ -44,7 +59,7 @@ def fast_transcribe():
             "channel_key": "mentzen",
             "transcript": {
                 "text": result["text"],
-                "segments": result["segments"][:3],  # Tylko 3 segmenty dla oszczędności
+                "segments_dir": str(seg_dir.relative_to(ROOT)),
                 "language": result["language"]
             },
             "processed_date": datetime.now().isoformat()
@@ -8,7 +8,12 @@ from pathlib import Path
 from datetime import datetime
 
 ROOT = Path(__file__).resolve().parents[1]
-AUDIO_DIR = ROOT / "audio"
+sys.path.append(str(ROOT))
+
+from ingest.audio_cache import AudioCache
+from ingest.segment_store import segments_from_whisper, write_segments
+
+AUDIO_DIR = ROOT / "audio"  # stary układ — pliki są przenoszone do cache audio
 TRANSCRIPTS_DIR = ROOT / "data" / "youtube"
 
 # Mentzen channel
@@ -108,7 +113,6 @@ def main():
     """Main function."""
     print("🚀 MENTZEN-ONLY TRANSCRIPTION PIPELINE\n")
     
-    AUDIO_DIR.mkdir(parents=True, exist_ok=True)
     TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
     
     # 1. Pobierz listę filmów
@@ -120,6 +124,7 @@ def main():
     print(f"🎯 Będziemy przetwarzać WSZYSTKIE {len(videos)} filmów (bez filtrowania)")
     
     # 2. Pobierz audio i transkrybuj
+    audio_cache = AudioCache.from_config()
     transcripts = []
     
     for i, video in enumerate(videos, 1):
@@ -131,20 +136,28 @@ def main():
             print("  ✅ Transkrypcja już istnieje")
             continue
         
-        # Pobierz audio
-        print("  ⬇️  Pobieranie audio...")
-        audio_file = AUDIO_DIR / f"{video['id']}.mp3"
-        
-        if not audio_file.exists():
-            if not download_audio(video['url'], AUDIO_DIR):
-                print("  ❌ Błąd pobierania audio")
-                continue
+        # Audio z cache (pobierane tylko przy braku wpisu)
+        print("  ⬇️  Audio (cache lub pobieranie)...")
+        audio_file = audio_cache.fetch_audio(
+            video['id'], "mp3",
+            lambda d: d / f"{video['id']}.mp3" if download_audio(video['url'], d) else None,
+            legacy_path=AUDIO_DIR / f"{video['id']}.mp3",
+        )
+        if not audio_file:
+            print("  ❌ Błąd pobierania audio")
+            continue
         
         # Transkrybuj
         print("  🎤 Transkrypcja...")
         transcript = transcribe_audio(audio_file, model_size="base")
         
         if transcript:
+            # Segmenty z czasami -> kolumnowy magazyn (do cięcia okien treningowych)
+            seg_dir = write_segments(
+                video['id'], segments_from_whisper(transcript), "whisper",
+                meta={"channel_key": "mentzen"}
+            )
+            
             # Zapisz transkrypcję z metadanymi
             full_transcript = {
                 "video_id": video['id'],
@@ -154,6 +167,7 @@ def main():
                 "channel": CHANNEL['name'],
                 "channel_key": "mentzen",
                 "transcript": transcript,
+                "segments_dir": str(seg_dir.relative_to(ROOT)),
                 "processed_date": datetime.now().isoformat()
             }
             
@@ -162,11 +176,6 @@ def main():
             
             transcripts.append(full_transcript)
             print("  ✅ Transkrypcja zapisana")
-            
-            # Usuń audio po transkrypcji (oszczędność miejsca)
-            if audio_file.exists():
-                audio_file.unlink()
-                print("  🗑️  Audio usunięte")
         
         print(f"  ⏱️  Postęp: {i}/{len(videos)}")
     
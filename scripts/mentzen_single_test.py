@@ -3,11 +3,17 @@ Test pojedynczego filmu z kanału Mentzena.
 """
 import json
 import subprocess
+import sys
 from pathlib import Path
 from datetime import datetime
 
 ROOT = Path(__file__).resolve().parents[1]
-AUDIO_DIR = ROOT / "audio"
+sys.path.append(str(ROOT))
+
+from ingest.audio_cache import AudioCache
+from ingest.segment_store import segments_from_whisper, write_segments
+
+AUDIO_DIR = ROOT / "audio"  # stary układ — pliki są przenoszone do cache audio
 TRANSCRIPTS_DIR = ROOT / "data" / "youtube"
 
 def download_and_transcribe_single_mentzen():
@@ -26,15 +32,14 @@ def download_and_transcribe_single_mentzen():
         print("✅ Transkrypcja już istnieje")
         return
     
-    # Pobierz audio
+    # Pobierz audio (cache — sieć tylko przy braku wpisu)
     print("⬇️ Pobieranie audio...")
-    audio_file = AUDIO_DIR / f"{video_id}.mp3"
     
-    if not audio_file.exists():
+    def download(target_dir):
         cmd = [
             "yt-dlp", "-x", "--audio-format", "mp3", 
             "--audio-quality", "0",
-            "-o", str(AUDIO_DIR / "%(id)s.%(ext)s"),
+            "-o", str(target_dir / "%(id)s.%(ext)s"),
             video_url
         ]
         
@@ -42,10 +47,17 @@ def download_and_transcribe_single_mentzen():
             result = subprocess.run(cmd, capture_output=True, timeout=300)
             if result.returncode != 0:
                 print(f"❌ Błąd pobierania: {result.stderr}")
-                return
+                return None
         except subprocess.TimeoutExpired:
             print("❌ Timeout pobierania")
-            return
+            return None
+        return target_dir / f"{video_id}.mp3"
+    
+    audio_file = AudioCache.from_config().fetch_audio(
+        video_id, "mp3", download, legacy_path=AUDIO_DIR / f"{video_id}.mp3"
+    )
+    if not audio_file:
+        return
     
     print(f"📊 Rozmiar audio: {audio_file.stat().st_size / 1024 / 1024:.1f} MB")
     
@@ -55,6 +67,9 @@ def download_and_transcribe_single_mentzen():
         import whisper
         model = whisper.load_model("base")
         result = model.transcribe(str(audio_file), language="pl")
+        seg_dir = write_segments(
+            video_id, segments_from_whisper(result), "whisper", meta={"channel_key": "mentzen"}
+        )
         
         # Zapisz
         transcript_data = {
@@ -66,7 +81,7 @@ def download_and_transcribe_single_mentzen():
             "channel_key": "mentzen",
             "transcript": {
                 "text": result["text"],
-                "segments": result["segments"][:5],  # Pierwsze 5 segmentów
+                "segments_dir": str(seg_dir.relative_to(ROOT)),
                 "language": result["language"]
             },
             "processed_date": datetime.now().isoformat()
@@ -79,10 +94,6 @@ def download_and_transcribe_single_mentzen():
         print(f"📖 Tekst ({len(result['text'])} znaków)")
         print(f"🔤 Pierwsze 200 znaków: {result['text'][:200]}...")
         
-        # Usuń audio
-        audio_file.unlink()
-        print("🗑️ Audio usunięte")
-        
         return transcript_data
         
     except Exception as e:
@@ -90,7 +101,6 @@ def download_and_transcribe_single_mentzen():
         return None
 
 if __name__ == "__main__":
-    AUDIO_DIR.mkdir(parents=True, exist_ok=True)
     TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
     
     print("🧪 TEST MENTZENA - POJEDYNCZY FILM\n")
@@ -59,6 +59,10 @@ def create_training_export():
     # 3. Przykładowe skrypty treningowe
     scripts_dir = EXPORT_DIR / "scripts"
     scripts_dir.mkdir()
+
+    # Moduły treningowe (pakowanie sekwencji) importowane przez skrypty z scripts/
+    shutil.copytree(ROOT / "ml", EXPORT_DIR / "ml", ignore=shutil.ignore_patterns("__pycache__"))
+    print("  ✅ ml/")
     
     # 4. Stwórz metadane eksportu
     metadata = {
@@ -190,7 +194,21 @@ with open('data/eval_dataset.jsonl') as f:
 "
 ```
 
-## 4. Modele do rozważenia
+## 4. Trening
+
+```bash
+# Jeden launcher, konfiguracje w training_configs/*.json
+python ml/train.py --config mistral_standard
+python ml/train.py --config llama_3_1_8b --set training_args.max_steps=100
+
+# Test dymny na CPU (mały losowy model) — porównanie przepustowości zmian
+python ml/train.py --config cpu_smoke
+
+# Inne proporcje źródeł/języków bez przebudowy danych (wagi mnożą naturalny udział)
+python ml/train.py --config mistral_standard --set 'mixture={"weights": {"language": {"pl": 3.0}}}'
+```
+
+## 5. Modele do rozważenia
 
 ### Dla RTX 5090 (24GB):
 - **Llama 3.1 8B** - najlepszy stosunek jakość/rozmiar
@@ -202,14 +220,14 @@ with open('data/eval_dataset.jsonl') as f:
 - **r=8, alpha=16** dla oszczędzania VRAM
 - **target_modules**: ["q_proj", "k_proj", "v_proj", "o_proj"]
 
-## 5. Monitorowanie
+## 6. Monitorowanie
 
 - Użyj **wandb** do trackingu metryk
 - Sprawdzaj **GPU utilization** (nvidia-smi)
 - **Eval loss** powinno spadać gładko
 - **Perplexity** to główna metryka
 
-## 6. Tips dla RTX 5090
+## 7. Tips dla RTX 5090
 
 - **Gradient checkpointing** = True (oszczędza VRAM)
 - **Batch size**: 4-8 (dostosuj do VRAM)
@@ -217,7 +235,7 @@ with open('data/eval_dataset.jsonl') as f:
 - **Learning rate**: 2e-4 (standard dla instruction tuning)
 - **Warmup**: 0.05 (5% kroków)
 
-## 7. Troubleshooting
+## 8. Troubleshooting
 
 - **OOM Error**: zmniejsz batch_size lub max_length
 - **Slow training**: sprawdź czy używasz CUDA
@@ -230,75 +248,12 @@ Powodzenia z treningiem! 🚀
         f.write(instructions)
 
 def create_training_configs(export_dir):
-    """Tworzy przykładowe konfiguracje treningu."""
-    
-    # Config dla Llama 3.1 8B
-    llama_config = {
-        "model_name": "meta-llama/Llama-3.1-8B-Instruct",
-        "training_args": {
-            "output_dir": "./results",
-            "num_train_epochs": 3,
-            "per_device_train_batch_size": 4,
-            "per_device_eval_batch_size": 4,
-            "gradient_accumulation_steps": 4,
-            "gradient_checkpointing": True,
-            "warmup_ratio": 0.05,
-            "learning_rate": 2e-4,
-            "fp16": True,
-            "logging_steps": 50,
-            "eval_steps": 500,
-            "save_steps": 1000,
-            "max_steps": 5000,
-            "remove_unused_columns": False,
-            "dataloader_pin_memory": False
-        },
-        "lora_config": {
-            "r": 16,
-            "lora_alpha": 32,
-            "target_modules": ["q_proj", "k_proj", "v_proj", "o_proj"],
-            "lora_dropout": 0.1,
-            "bias": "none",
-            "task_type": "CAUSAL_LM"
-        }
-    }
-    
-    # Config dla Mistral 7B
-    mistral_config = {
-        "model_name": "mistralai/Mistral-7B-Instruct-v0.3",
-        "training_args": {
-            "output_dir": "./results_mistral",
-            "num_train_epochs": 3,
-            "per_device_train_batch_size": 6,
-            "per_device_eval_batch_size": 6,
-            "gradient_accumulation_steps": 3,
-            "gradient_checkpointing": True,
-            "warmup_ratio": 0.05,
-            "learning_rate": 2e-4,
-            "fp16": True,
-            "logging_steps": 50,
-            "eval_steps": 500,
-            "save_steps": 1000,
-            "max_steps": 4000,
-            "remove_unused_columns": False
-        },
-        "lora_config": {
-            "r": 16,
-            "lora_alpha": 32,
-            "target_modules": ["q_proj", "k_proj", "v_proj", "o_proj"],
-            "lora_dropout": 0.1,
-            "bias": "none",
-            "task_type": "CAUSAL_LM"
-        }
-    }
-    
+    """Kopiuje konfiguracje treningu (czytane przez launcher ml/train.py)."""
     configs_dir = export_dir / "training_configs"
     configs_dir.mkdir()
     
-    with (configs_dir / "llama_3_1_8b_config.json").open('w') as f:
-        json.dump(llama_config, f, indent=2)
-    
-    with (configs_dir / "mistral_7b_config.json").open('w') as f:
-        json.dump(mistral_config, f, indent=2)
+    for config_path in sorted((ROOT / "config" / "training").glob("*.json")):
+        shutil.copy2(config_path, configs_dir / config_path.name)
     
     print(f"  ✅ training_configs/")
 
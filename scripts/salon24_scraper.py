@@ -1,345 +1,588 @@
-#!/usr/bin/env python3
-"""
-Salon24.pl Scraper - pobiera artykuły z polskich blogów prawicowych/libertariańskich
-Szanuje robots.txt (1s delay) i pobiera treści z kategorii polityka, gospodarka.
-"""
-
-import requests
-from bs4 import BeautifulSoup
-import time
-import json
-import re
-from datetime import datetime, timezone
-from pathlib import Path
-from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Optional
-import logging
-from dataclasses import dataclass
-
-@dataclass
-class BlogPost:
-    """Struktura danych dla pojedynczego postu z bloga"""
-    title: str
-    author: str
-    content: str
-    url: str
-    published_date: Optional[str] = None
-    category: str = "unknown"
-    blog_name: str = ""
-    word_count: int = 0
-
-class Salon24Scraper:
-    def __init__(self, output_dir: str = "data/raw", rate_limit: float = 1.0):
-        self.base_url = "http://www.salon24.pl"
-        self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.rate_limit = rate_limit  # robots.txt wymaga 1s
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (compatible; SatyrAI-Research/1.0; Educational research)',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'pl,en;q=0.7',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-        })
-        
-        # Konfiguracja kategorii do scrapowania
-        self.categories = {
-            "polityka": "/k/3,polityka",
-            "gospodarka": "/k/4,gospodarka",
-            "spoleczenstwo": "/k/6,spoleczenstwo"
-        }
-        
-        self.setup_logging()
-
-    def setup_logging(self):
-        """Konfiguracja logowania"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('salon24_scraper.log'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
-
-    def get_page(self, url: str) -> Optional[BeautifulSoup]:
-        """Pobiera stronę z respektowaniem rate limit"""
-        try:
-            time.sleep(self.rate_limit)  # Szanuj robots.txt
-            
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-            
-            # Sprawdź encoding
-            if response.encoding.lower() in ['iso-8859-1', 'windows-1252']:
-                response.encoding = 'utf-8'
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            return soup
-            
-        except Exception as e:
-            self.logger.error(f"Błąd pobierania {url}: {e}")
-            return None
-
-    def extract_blog_links_from_category(self, category_url: str) -> List[Dict[str, str]]:
-        """Wyciąga linki do blogów z kategorii"""
-        url = urljoin(self.base_url, category_url)
-        soup = self.get_page(url)
-        
-        if not soup:
-            return []
-        
-        blog_links = []
-        
-        # Szukaj różnych selektorów dla linków do blogów
-        selectors = [
-            'a[href*="/u/"]',  # linki do profili użytkowników
-            'a[href*="/"]',     # ogólne linki
-            '.blog-title a',   # tytuły blogów
-            '.author-link',    # linki autorów
-        ]
-        
-        for selector in selectors:
-            links = soup.select(selector)
-            for link in links:
-                href = link.get('href', '')
-                text = link.get_text(strip=True)
-                
-                # Filtruj tylko linki do blogów użytkowników
-                if '/u/' in href or '/blog/' in href:
-                    blog_links.append({
-                        'url': urljoin(self.base_url, href),
-                        'text': text,
-                        'type': 'user_blog'
-                    })
-        
-        # Deduplikacja
-        seen = set()
-        unique_links = []
-        for link in blog_links:
-            url = link['url']
-            if url not in seen and len(link['text']) > 3:
-                seen.add(url)
-                unique_links.append(link)
-        
-        self.logger.info(f"Znaleziono {len(unique_links)} linków do blogów w kategorii {category_url}")
-        return unique_links
-
-    def extract_posts_from_blog(self, blog_url: str, limit: int = 10) -> List[BlogPost]:
-        """Wyciąga posty z indywidualnego bloga"""
-        soup = self.get_page(blog_url)
-        if not soup:
-            return []
-        
-        posts = []
-        
-        # Różne selektory dla postów
-        post_selectors = [
-            'article',
-            '.post',
-            '.blog-post',
-            '.entry',
-            '[class*="post"]',
-            '.tile'
-        ]
-        
-        for selector in post_selectors:
-            post_elements = soup.select(selector)
-            
-            if post_elements:
-                self.logger.info(f"Znaleziono {len(post_elements)} postów używając selektora '{selector}'")
-                
-                for i, element in enumerate(post_elements[:limit]):
-                    post = self.extract_post_content(element, blog_url)
-                    if post and len(post.content) > 100:  # Minimum 100 znaków
-                        posts.append(post)
-                
-                break  # Użyj pierwszy działający selektor
-        
-        return posts
-
-    def extract_post_content(self, element, blog_url: str) -> Optional[BlogPost]:
-        """Wyciąga treść z elementu postu"""
-        try:
-            # Tytuł
-            title_selectors = ['h1', 'h2', 'h3', '.title', '[class*="title"]', 'a']
-            title = ""
-            for sel in title_selectors:
-                title_elem = element.select_one(sel)
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                    if len(title) > 10:  # Minimum sensowna długość tytułu
-                        break
-            
-            if not title:
-                return None
-            
-            # Autor (może być w różnych miejscach)
-            author_selectors = ['.author', '.by', '[class*="author"]', '.username']
-            author = ""
-            for sel in author_selectors:
-                author_elem = element.select_one(sel)
-                if author_elem:
-                    author = author_elem.get_text(strip=True)
-                    break
-            
-            # Jeśli nie ma autora, wyciągnij z URL
-            if not author:
-                url_match = re.search(r'/u/([^/]+)', blog_url)
-                if url_match:
-                    author = url_match.group(1)
-            
-            # Treść
-            content_selectors = ['.content', '.post-content', '.entry-content', 'p']
-            content_parts = []
-            
-            for sel in content_selectors:
-                content_elems = element.select(sel)
-                if content_elems:
-                    for elem in content_elems:
-                        text = elem.get_text(strip=True)
-                        if len(text) > 20:  # Pomijaj bardzo krótkie fragmenty
-                            content_parts.append(text)
-            
-            # Jeśli nie znaleziono content selektorów, weź cały tekst z elementu
-            if not content_parts:
-                content_parts = [element.get_text(strip=True)]
-            
-            content = " ".join(content_parts)
-            
-            # Link do pełnego postu
-            link_elem = element.select_one('a[href]')
-            post_url = blog_url
-            if link_elem:
-                href = link_elem.get('href', '')
-                if href.startswith('/'):
-                    post_url = urljoin(self.base_url, href)
-                elif href.startswith('http'):
-                    post_url = href
-            
-            # Data (opcjonalnie)
-            date_selectors = ['.date', '.published', '[class*="date"]', 'time']
-            published_date = None
-            for sel in date_selectors:
-                date_elem = element.select_one(sel)
-                if date_elem:
-                    published_date = date_elem.get_text(strip=True)
-                    break
-            
-            post = BlogPost(
-                title=title,
-                author=author or "unknown",
-                content=content,
-                url=post_url,
-                published_date=published_date,
-                category="salon24",
-                blog_name=blog_url.split('/')[-1] if '/' in blog_url else "unknown",
-                word_count=len(content.split())
-            )
-            
-            return post
-            
-        except Exception as e:
-            self.logger.error(f"Błąd wyciągania postu: {e}")
-            return None
-
-    def save_posts(self, posts: List[BlogPost], filename: str):
-        """Zapisuje posty do pliku JSONL"""
-        output_path = self.output_dir / f"{filename}.jsonl"
-        
-        with output_path.open('a', encoding='utf-8') as f:
-            for post in posts:
-                record = {
-                    "fetched_at": datetime.now(timezone.utc).isoformat(),
-                    "source": "salon24.pl",
-                    "title": post.title,
-                    "author": post.author,
-                    "content": post.content,
-                    "url": post.url,
-                    "published_date": post.published_date,
-                    "category": post.category,
-                    "blog_name": post.blog_name,
-                    "word_count": post.word_count,
-                    "lang": "pl"
-                }
-                f.write(json.dumps(record, ensure_ascii=False) + "\n")
-        
-        self.logger.info(f"Zapisano {len(posts)} postów do {output_path}")
-
-    def run_category_scraping(self, category: str, max_blogs: int = 20, posts_per_blog: int = 5):
-        """Uruchamia scraping dla danej kategorii"""
-        self.logger.info(f"🚀 Rozpoczynam scraping kategorii: {category}")
-        
-        category_url = self.categories.get(category)
-        if not category_url:
-            self.logger.error(f"Nieznana kategoria: {category}")
-            return
-        
-        # 1. Pobierz linki do blogów z kategorii
-        blog_links = self.extract_blog_links_from_category(category_url)
-        
-        if not blog_links:
-            self.logger.warning(f"Nie znaleziono blogów w kategorii {category}")
-            return
-        
-        # 2. Ogranicz liczbę blogów
-        blog_links = blog_links[:max_blogs]
-        
-        all_posts = []
-        
-        # 3. Iteruj przez blogi i pobierz posty
-        for i, blog_link in enumerate(blog_links, 1):
-            blog_url = blog_link['url']
-            blog_name = blog_link['text']
-            
-            self.logger.info(f"📝 [{i}/{len(blog_links)}] Scraping blog: {blog_name} ({blog_url})")
-            
-            posts = self.extract_posts_from_blog(blog_url, limit=posts_per_blog)
-            
-            if posts:
-                all_posts.extend(posts)
-                self.logger.info(f"   ✅ Pobrano {len(posts)} postów")
-            else:
-                self.logger.warning(f"   ❌ Brak postów z {blog_url}")
-        
-        # 4. Zapisz wszystkie posty
-        if all_posts:
-            filename = f"salon24-{category}"
-            self.save_posts(all_posts, filename)
-            
-            # Statystyki
-            total_words = sum(post.word_count for post in all_posts)
-            self.logger.info(f"📊 PODSUMOWANIE kategorii {category}:")
-            self.logger.info(f"   Blogów przeskanowanych: {len(blog_links)}")
-            self.logger.info(f"   Postów pobranych: {len(all_posts)}")
-            self.logger.info(f"   Łączna liczba słów: {total_words:,}")
-            self.logger.info(f"   Średnio słów na post: {total_words // len(all_posts) if all_posts else 0}")
-        else:
-            self.logger.warning(f"Brak postów do zapisania dla kategorii {category}")
-
-def main():
-    import argparse
-    
-    parser = argparse.ArgumentParser(description='Salon24.pl Scraper')
-    parser.add_argument('--category', choices=['polityka', 'gospodarka', 'spoleczenstwo', 'all'], 
-                       default='polityka', help='Kategoria do scrapowania')
-    parser.add_argument('--max-blogs', type=int, default=20, help='Maksymalna liczba blogów')
-    parser.add_argument('--posts-per-blog', type=int, default=5, help='Posty na blog')
-    parser.add_argument('--output-dir', default='data/raw', help='Folder wyjściowy')
-    parser.add_argument('--rate-limit', type=float, default=1.5, help='Opóźnienie między requestami (s)')
-    
-    args = parser.parse_args()
-    
-    scraper = Salon24Scraper(output_dir=args.output_dir, rate_limit=args.rate_limit)
-    
-    if args.category == 'all':
-        for category in scraper.categories.keys():
-            scraper.run_category_scraping(category, args.max_blogs, args.posts_per_blog)
-            print(f"\n{'='*60}\n")
-    else:
-        scraper.run_category_scraping(args.category, args.max_blogs, args.posts_per_blog)
-
-if __name__ == "__main__":
+#!/usr/bin/env python3
+"""
+Salon24.pl Scraper - pobiera artykuły z polskich blogów prawicowych/libertariańskich
+Szanuje robots.txt (1s delay) i pobiera treści z kategorii polityka, gospodarka.
+
+Tryb crawl (domyślny w main): kategorie Salon24 i serwisy z scraping_analysis.SITES_TO_ANALYZE
+(--sites) są pobierane w jednym uruchomieniu przez ingest/crawler.py — równolegle między
+hostami, z opóźnieniem per host z robots.txt (Crawl-delay) i limitem żądań per host.
+Ekstrakcja używa profili XPath z config/extraction_profiles.json (uczonych przez
+scraping_analysis.py); bez profilu — dotychczasowe kaskady selektorów BeautifulSoup.
+Posty są dopisywane do JSONL na bieżąco, a frontier i odwiedzone URL-e trafiają do
+checkpointu (--state-dir); ponowne uruchomienie wznawia przerwany crawl bez ponownego
+pobierania (po zakończonym crawlu checkpoint jest czyszczony, kategorie są pobierane od nowa).
+Artykuły i posty znane z wcześniejszych uruchomień (także z RSS) są pomijane na podstawie
+wspólnego magazynu URL-i (ingest/url_store.py) — artykuły jeszcze przed pobraniem.
+"""
+
+import requests
+from bs4 import BeautifulSoup
+import json
+import re
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+from typing import Any, Dict, Iterator, List, Optional
+import logging
+from dataclasses import dataclass
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ingest.crawler import Crawler, CrawlCheckpoint, CrawlRequest, run_crawler
+from ingest.extraction import ExtractionProfile, load_profiles
+from ingest.http_cache import get_cache
+from ingest.url_store import UrlStore, canonicalize_url
+from scraping_analysis import SITES_TO_ANALYZE
+
+# Priorytety frontiera: listingi przed blogami/artykułami
+PRIORITY_LISTING = 0
+PRIORITY_BLOG = 1
+PRIORITY_ARTICLE = 2
+
+@dataclass
+class BlogPost:
+    """Struktura danych dla pojedynczego postu z bloga"""
+    title: str
+    author: str
+    content: str
+    url: str
+    published_date: Optional[str] = None
+    category: str = "unknown"
+    blog_name: str = ""
+    word_count: int = 0
+
+class Salon24Scraper:
+    def __init__(self, output_dir: str = "data/raw", rate_limit: float = 1.0):
+        self.base_url = "http://www.salon24.pl"
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.rate_limit = rate_limit  # robots.txt wymaga 1s
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (compatible; SatyrAI-Research/1.0; Educational research)',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'pl,en;q=0.7',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        })
+        
+        # Konfiguracja kategorii do scrapowania
+        self.categories = {
+            "polityka": "/k/3,polityka",
+            "gospodarka": "/k/4,gospodarka",
+            "spoleczenstwo": "/k/6,spoleczenstwo"
+        }
+        
+        self.setup_logging()
+        
+        # Profil ekstrakcji (scraping_analysis.py); None => kaskady selektorów
+        self.profile: Optional[ExtractionProfile] = load_profiles().get("salon24")
+        # Cache HTTP: get_page i strony pobierane przez crawler
+        self.http_cache = get_cache()
+        # Magazyn znanych URL-i (ustawiany przez crawl)
+        self.url_store: Optional[UrlStore] = None
+
+    def setup_logging(self):
+        """Konfiguracja logowania"""
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler('salon24_scraper.log'),
+                logging.StreamHandler()
+            ]
+        )
+        self.logger = logging.getLogger(__name__)
+
+    def get_page(self, url: str) -> Optional[BeautifulSoup]:
+        """Pobiera stronę z respektowaniem rate limit"""
+        try:
+            # Szanuj robots.txt — opóźnienie tylko przed żądaniem sieciowym (nie przy trafieniu w cache)
+            response = self.http_cache.get(url, session=self.session, timeout=15, delay=self.rate_limit)
+            response.raise_for_status()
+            
+            # Sprawdź encoding
+            if response.encoding.lower() in ['iso-8859-1', 'windows-1252']:
+                response.encoding = 'utf-8'
+            
+            soup = BeautifulSoup(response.content, 'html.parser')
+            return soup
+            
+        except Exception as e:
+            self.logger.error(f"Błąd pobierania {url}: {e}")
+            return None
+
+    def extract_blog_links_from_category(self, category_url: str) -> List[Dict[str, str]]:
+        """Wyciąga linki do blogów z kategorii"""
+        url = urljoin(self.base_url, category_url)
+        soup = self.get_page(url)
+        
+        if not soup:
+            return []
+        
+        return self.blog_links_from_soup(soup, category_url)
+
+    def blog_links_from_soup(self, soup: BeautifulSoup, category_url: str) -> List[Dict[str, str]]:
+        """Linki do blogów z już pobranej strony kategorii"""
+        blog_links = []
+        
+        # Szukaj różnych selektorów dla linków do blogów
+        selectors = [
+            'a[href*="/u/"]',  # linki do profili użytkowników
+            '.blog-title a',   # tytuły blogów
+            '.author-link',    # linki autorów
+        ]
+        
+        for selector in selectors:
+            links = soup.select(selector)
+            for link in links:
+                href = link.get('href', '')
+                text = link.get_text(strip=True)
+                
+                # Filtruj tylko linki do blogów użytkowników
+                if '/u/' in href or '/blog/' in href:
+                    blog_links.append({
+                        'url': urljoin(self.base_url, href),
+                        'text': text,
+                        'type': 'user_blog'
+                    })
+        
+        # Deduplikacja
+        seen = set()
+        unique_links = []
+        for link in blog_links:
+            key = canonicalize_url(link['url'])
+            if key not in seen and len(link['text']) > 3:
+                seen.add(key)
+                unique_links.append(link)
+        
+        self.logger.info(f"Znaleziono {len(unique_links)} linków do blogów w kategorii {category_url}")
+        return unique_links
+
+    def extract_posts_from_blog(self, blog_url: str, limit: int = 10) -> List[BlogPost]:
+        """Wyciąga posty z indywidualnego bloga"""
+        soup = self.get_page(blog_url)
+        if not soup:
+            return []
+        
+        return self.posts_from_soup(soup, blog_url, limit)
+
+    def posts_from_soup(self, soup: BeautifulSoup, blog_url: str, limit: int = 10) -> List[BlogPost]:
+        """Posty z już pobranej strony bloga"""
+        posts = []
+        
+        # Różne selektory dla postów
+        post_selectors = [
+            'article',
+            '.post',
+            '.blog-post',
+            '.entry',
+            '[class*="post"]',
+            '.tile'
+        ]
+        
+        for selector in post_selectors:
+            post_elements = soup.select(selector)
+            
+            if post_elements:
+                self.logger.info(f"Znaleziono {len(post_elements)} postów używając selektora '{selector}'")
+                
+                for i, element in enumerate(post_elements[:limit]):
+                    post = self.extract_post_content(element, blog_url)
+                    if post and len(post.content) > 100:  # Minimum 100 znaków
+                        posts.append(post)
+                
+                break  # Użyj pierwszy działający selektor
+        
+        return posts
+
+    def extract_post_content(self, element, blog_url: str) -> Optional[BlogPost]:
+        """Wyciąga treść z elementu postu"""
+        try:
+            # Tytuł
+            title_selectors = ['h1', 'h2', 'h3', '.title', '[class*="title"]', 'a']
+            title = ""
+            for sel in title_selectors:
+                title_elem = element.select_one(sel)
+                if title_elem:
+                    title = title_elem.get_text(strip=True)
+                    if len(title) > 10:  # Minimum sensowna długość tytułu
+                        break
+            
+            if not title:
+                return None
+            
+            # Autor (może być w różnych miejscach)
+            author_selectors = ['.author', '.by', '[class*="author"]', '.username']
+            author = ""
+            for sel in author_selectors:
+                author_elem = element.select_one(sel)
+                if author_elem:
+                    author = author_elem.get_text(strip=True)
+                    break
+            
+            # Jeśli nie ma autora, wyciągnij z URL
+            if not author:
+                url_match = re.search(r'/u/([^/]+)', blog_url)
+                if url_match:
+                    author = url_match.group(1)
+            
+            # Treść
+            content_selectors = ['.content', '.post-content', '.entry-content', 'p']
+            content_parts = []
+            
+            for sel in content_selectors:
+                content_elems = element.select(sel)
+                if content_elems:
+                    for elem in content_elems:
+                        text = elem.get_text(strip=True)
+                        if len(text) > 20:  # Pomijaj bardzo krótkie fragmenty
+                            content_parts.append(text)
+            
+            # Jeśli nie znaleziono content selektorów, weź cały tekst z elementu
+            if not content_parts:
+                content_parts = [element.get_text(strip=True)]
+            
+            content = " ".join(content_parts)
+            
+            # Link do pełnego postu
+            link_elem = element.select_one('a[href]')
+            post_url = blog_url
+            if link_elem:
+                href = link_elem.get('href', '')
+                if href.startswith('/'):
+                    post_url = urljoin(self.base_url, href)
+                elif href.startswith('http'):
+                    post_url = href
+            
+            # Data (opcjonalnie)
+            date_selectors = ['.date', '.published', '[class*="date"]', 'time']
+            published_date = None
+            for sel in date_selectors:
+                date_elem = element.select_one(sel)
+                if date_elem:
+                    published_date = date_elem.get_text(strip=True)
+                    break
+            
+            return self.make_post(title, author, content, post_url, published_date, blog_url)
+            
+        except Exception as e:
+            self.logger.error(f"Błąd wyciągania postu: {e}")
+            return None
+
+    @staticmethod
+    def make_post(title: str, author: str, content: str, post_url: str,
+                  published_date: Optional[str], blog_url: str) -> BlogPost:
+        return BlogPost(
+            title=title,
+            author=author or "unknown",
+            content=content,
+            url=post_url,
+            published_date=published_date,
+            category="salon24",
+            blog_name=blog_url.split('/')[-1] if '/' in blog_url else "unknown",
+            word_count=len(content.split())
+        )
+
+    def posts_from_profile(self, content: bytes, blog_url: str, limit: int = 10) -> List[BlogPost]:
+        """Posty przez skompilowany profil XPath (jedno parsowanie lxml)"""
+        posts = []
+        for item in self.profile.extract_items(content, blog_url, limit=limit):
+            author = item["author"]
+            if not author:
+                url_match = re.search(r'/u/([^/]+)', blog_url)
+                author = url_match.group(1) if url_match else ""
+            if len(item["content"]) > 100:  # Minimum 100 znaków
+                posts.append(self.make_post(
+                    item["title"], author, item["content"], item["url"], item["published_date"], blog_url
+                ))
+        return posts
+
+    @staticmethod
+    def post_record(post: BlogPost, source: str = "salon24.pl") -> Dict[str, Any]:
+        """Rekord JSONL dla postu"""
+        return {
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+            "source": source,
+            "title": post.title,
+            "author": post.author,
+            "content": post.content,
+            "url": post.url,
+            "published_date": post.published_date,
+            "category": post.category,
+            "blog_name": post.blog_name,
+            "word_count": post.word_count,
+            "lang": "pl"
+        }
+
+    def save_posts(self, posts: List[BlogPost], filename: str):
+        """Zapisuje posty do pliku JSONL"""
+        output_path = self.output_dir / f"{filename}.jsonl"
+        
+        with output_path.open('a', encoding='utf-8') as f:
+            for post in posts:
+                f.write(json.dumps(self.post_record(post), ensure_ascii=False) + "\n")
+        
+        self.logger.info(f"Zapisano {len(posts)} postów do {output_path}")
+
+    # --- Tryb crawl (ingest/crawler.py) ---
+
+    def handle_category(self, req: CrawlRequest, response: requests.Response) -> Iterator[CrawlRequest]:
+        """Handler crawlera: strona kategorii -> żądania blogów"""
+        if self.profile and self.profile.links:
+            links = self.profile.extract_links(response.content, response.url)
+        else:
+            soup = BeautifulSoup(response.content, 'html.parser')
+            links = self.blog_links_from_soup(soup, req.meta["category_url"])
+        for link in links[:req.meta["max_blogs"]]:
+            yield CrawlRequest(
+                PRIORITY_BLOG,
+                url=link['url'],
+                kind="salon24_blog",
+                meta={"category": req.meta["category"], "posts_per_blog": req.meta["posts_per_blog"]},
+            )
+
+    def handle_blog(self, req: CrawlRequest, response: requests.Response) -> Iterator[Dict[str, Any]]:
+        """Handler crawlera: strona bloga -> rekordy postów"""
+        limit = req.meta["posts_per_blog"]
+        if self.profile and self.profile.item:
+            posts = self.posts_from_profile(response.content, req.url, limit=limit)
+        else:
+            posts = self.posts_from_soup(BeautifulSoup(response.content, 'html.parser'), req.url, limit=limit)
+        for post in posts:
+            # Post bez własnego linku dostaje URL bloga — wtedy nie ma po czym deduplikować
+            if self.url_store is not None and post.url != req.url and not self.url_store.add(post.url, "salon24_post"):
+                continue
+            record = self.post_record(post)
+            record["_file"] = f"salon24-{req.meta['category']}"
+            yield record
+
+    def category_seeds(self, categories: List[str], max_blogs: int, posts_per_blog: int) -> List[CrawlRequest]:
+        seeds = []
+        for category in categories:
+            category_url = self.categories.get(category)
+            if not category_url:
+                self.logger.error(f"Nieznana kategoria: {category}")
+                continue
+            seeds.append(CrawlRequest(
+                PRIORITY_LISTING,
+                url=urljoin(self.base_url, category_url),
+                kind="salon24_category",
+                meta={
+                    "category": category,
+                    "category_url": category_url,
+                    "max_blogs": max_blogs,
+                    "posts_per_blog": posts_per_blog,
+                },
+            ))
+        return seeds
+
+    def crawl(
+        self,
+        categories: List[str],
+        max_blogs: int = 20,
+        posts_per_blog: int = 5,
+        sites: Optional[Dict[str, Dict[str, Any]]] = None,
+        max_articles: int = 20,
+        max_per_host: int = 2,
+        state_dir: Optional[Path] = None,
+        fresh: bool = False,
+        url_store: Optional[UrlStore] = None,
+    ) -> Dict[str, int]:
+        """
+        Kategorie Salon24 (+ opcjonalnie inne serwisy) w jednym przebiegu crawlera.
+        Z state_dir: checkpointy i wznowienie przerwanego crawla (fresh=True zaczyna od nowa);
+        zakończony crawl czyści checkpoint, więc kolejne uruchomienie pobiera kategorie ponownie.
+        url_store: znane URL-e (domyślnie UrlStore.from_config()); fresh go nie czyści.
+        """
+        self.url_store = url_store or UrlStore.from_config()
+        checkpoint = CrawlCheckpoint(state_dir) if state_dir else None
+        if checkpoint is not None and fresh:
+            checkpoint.reset()
+        site_scraper = GenericSiteScraper(max_articles=max_articles)
+        handlers = {
+            "salon24_category": self.handle_category,
+            "salon24_blog": self.handle_blog,
+            "site_listing": site_scraper.handle_listing,
+            "site_article": site_scraper.handle_article,
+        }
+        files: Dict[str, Any] = {}
+        counts: Dict[str, List[int]] = {}
+
+        def write_record(record: Dict[str, Any]) -> None:
+            filename = record.pop("_file")
+            f = files.get(filename)
+            if f is None:
+                f = files[filename] = (self.output_dir / f"{filename}.jsonl").open('a', encoding='utf-8')
+                if checkpoint is not None:
+                    checkpoint.register_file(f)
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            stats = counts.setdefault(filename, [0, 0])
+            stats[0] += 1
+            stats[1] += record.get("word_count", 0)
+
+        crawler = Crawler(
+            handlers,
+            on_record=write_record,
+            user_agent=self.session.headers['User-Agent'],
+            default_delay=self.rate_limit,
+            max_per_host=max_per_host,
+            checkpoint=checkpoint,
+            url_store=self.url_store,
+            store_kinds={"site_article"},
+            http_cache=self.http_cache,
+        )
+        seeds = self.category_seeds(categories, max_blogs, posts_per_blog)
+        seeds += site_scraper.seeds(sites or {})
+        self.logger.info(f"🚀 Crawl: {len(seeds)} stron startowych, kategorie: {', '.join(categories)}")
+        try:
+            stats = run_crawler(crawler, seeds)
+        finally:
+            for f in files.values():
+                f.close()
+            if url_store is None:
+                self.url_store.close()
+
+        self.logger.info("📊 PODSUMOWANIE crawla:")
+        for filename, (posts, words) in sorted(counts.items()):
+            self.logger.info(f"   {filename}: {posts} postów, {words:,} słów")
+        self.logger.info(f"   Żądań: {stats['fetched']}, błędów: {stats['errors']}, zablokowanych przez robots.txt: {stats['disallowed']}, "
+                         f"pominiętych znanych: {stats['known']}")
+        return stats
+
+    def run_category_scraping(self, category: str, max_blogs: int = 20, posts_per_blog: int = 5,
+                              fresh: bool = False):
+        """Uruchamia scraping dla danej kategorii (przez crawler)"""
+        self.logger.info(f"🚀 Rozpoczynam scraping kategorii: {category}")
+        
+        if category not in self.categories:
+            self.logger.error(f"Nieznana kategoria: {category}")
+            return
+        
+        self.crawl([category], max_blogs, posts_per_blog,
+                   state_dir=self.output_dir / "crawl_state" / f"salon24-{category}", fresh=fresh)
+
+
+class GenericSiteScraper:
+    """Listingi i artykuły serwisów z scraping_analysis.SITES_TO_ANALYZE (poza Salon24)"""
+
+    LINK_SELECTORS = ['article a[href]', 'h2 a[href]', 'h3 a[href]', '[class*="post"] a[href]']
+
+    def __init__(self, max_articles: int = 20):
+        self.max_articles = max_articles
+        self.profiles = load_profiles()
+
+    def seeds(self, sites: Dict[str, Dict[str, Any]]) -> List[CrawlRequest]:
+        seeds = []
+        for site_name, config in sites.items():
+            if site_name == "salon24":
+                continue  # Salon24 pokrywają kategorie
+            for page in config["test_pages"]:
+                seeds.append(CrawlRequest(
+                    PRIORITY_LISTING,
+                    url=urljoin(config["base_url"], page),
+                    kind="site_listing",
+                    meta={"site": site_name},
+                ))
+        return seeds
+
+    def listing_urls(self, req: CrawlRequest, response: requests.Response) -> List[str]:
+        profile = self.profiles.get(req.meta["site"])
+        if profile and profile.links:
+            return [link['url'] for link in profile.extract_links(response.content, response.url)]
+        soup = BeautifulSoup(response.content, 'html.parser')
+        return [urljoin(response.url, link.get('href', '')) for link in soup.select(', '.join(self.LINK_SELECTORS))]
+
+    def handle_listing(self, req: CrawlRequest, response: requests.Response) -> Iterator[CrawlRequest]:
+        host = urlparse(response.url).netloc
+        found = 0
+        seen = {canonicalize_url(response.url)}
+        for url in self.listing_urls(req, response):
+            url = url.split('#')[0]
+            key = canonicalize_url(url)
+            if urlparse(url).netloc != host or key in seen:
+                continue
+            seen.add(key)
+            yield CrawlRequest(PRIORITY_ARTICLE, url=url, kind="site_article", meta=req.meta)
+            found += 1
+            if found >= self.max_articles:
+                break
+
+    def article_fields(self, req: CrawlRequest, response: requests.Response) -> Optional[Dict[str, Any]]:
+        profile = self.profiles.get(req.meta["site"])
+        if profile and profile.item:
+            for item in profile.extract_items(response.content, response.url, limit=3):
+                if len(item["content"]) >= 100:
+                    return item
+        soup = BeautifulSoup(response.content, 'html.parser')
+        title_elem = soup.select_one('h1')
+        container = soup.select_one('article') or soup
+        paragraphs = [p.get_text(strip=True) for p in container.select('p')]
+        author_elem = container.select_one('[class*="author"]')
+        date_elem = container.select_one('time')
+        return {
+            "title": title_elem.get_text(strip=True) if title_elem else "",
+            "author": author_elem.get_text(strip=True) if author_elem else "",
+            "content": " ".join(p for p in paragraphs if len(p) > 20),
+            "published_date": (date_elem.get('datetime') or date_elem.get_text(strip=True)) if date_elem else None,
+        }
+
+    def handle_article(self, req: CrawlRequest, response: requests.Response) -> Iterator[Dict[str, Any]]:
+        item = self.article_fields(req, response)
+        if not item or not item["title"] or len(item["content"]) < 100:
+            return
+        content = item["content"]
+        yield {
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+            "source": urlparse(response.url).netloc,
+            "title": item["title"],
+            "author": item["author"] or "unknown",
+            "content": content,
+            "url": response.url,
+            "published_date": item["published_date"],
+            "category": req.meta["site"],
+            "blog_name": "",
+            "word_count": len(content.split()),
+            "lang": "pl",
+            "_file": f"site-{req.meta['site']}",
+        }
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Salon24.pl Scraper')
+    parser.add_argument('--category', choices=['polityka', 'gospodarka', 'spoleczenstwo', 'all'], 
+                       default='polityka', help='Kategoria do scrapowania')
+    parser.add_argument('--max-blogs', type=int, default=20, help='Maksymalna liczba blogów')
+    parser.add_argument('--posts-per-blog', type=int, default=5, help='Posty na blog')
+    parser.add_argument('--output-dir', default='data/raw', help='Folder wyjściowy')
+    parser.add_argument('--rate-limit', type=float, default=1.5,
+                       help='Opóźnienie między requestami do hosta (s), gdy robots.txt nie podaje Crawl-delay')
+    parser.add_argument('--sites', action='store_true',
+                       help='Dołącz serwisy z scraping_analysis.SITES_TO_ANALYZE w tym samym przebiegu')
+    parser.add_argument('--max-articles', type=int, default=20, help='Artykuły na stronę listingu (--sites)')
+    parser.add_argument('--max-per-host', type=int, default=2, help='Maks. równoległych żądań do jednego hosta')
+    parser.add_argument('--state-dir', default=None,
+                       help='Katalog checkpointu (domyślnie <output-dir>/crawl_state/salon24)')
+    parser.add_argument('--fresh', action='store_true', help='Zignoruj checkpoint i zacznij crawl od nowa')
+    
+    args = parser.parse_args()
+    
+    scraper = Salon24Scraper(output_dir=args.output_dir, rate_limit=args.rate_limit)
+    
+    categories = list(scraper.categories.keys()) if args.category == 'all' else [args.category]
+    scraper.crawl(
+        categories,
+        max_blogs=args.max_blogs,
+        posts_per_blog=args.posts_per_blog,
+        sites=SITES_TO_ANALYZE if args.sites else None,
+        max_articles=args.max_articles,
+        max_per_host=args.max_per_host,
+        state_dir=Path(args.state_dir) if args.state_dir else Path(args.output_dir) / "crawl_state" / "salon24",
+        fresh=args.fresh,
+    )
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
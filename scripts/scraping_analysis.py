@@ -2,16 +2,26 @@
 """
 Analiza techniczna stron polskich blogów prawicowych/libertariańskich
 Testuje różne techniki scrapingu i określa najlepszą strategię dla każdego serwisu.
+Uczy też profile ekstrakcji (ingest/extraction.py) i zapisuje je do config/extraction_profiles.json.
+Strony idą przez cache HTTP (ingest/http_cache.py): ponowna analiza nie pobiera świeżych stron,
+a --offline odtwarza je z cache (np. zamrożonego snapshotu z --cache-dir) bez sieci.
 """
 
 import requests
 from bs4 import BeautifulSoup
-import time
 import json
+import sys
+from pathlib import Path
 from urllib.parse import urljoin, urlparse
 from typing import Dict, List, Optional
 import logging
 
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ingest.extraction import PROFILES_PATH, ExtractionProfile, learn_profile, merge_profiles, save_profiles
+from ingest.http_cache import configure as configure_http_cache, get_cache
+
 # Konfiguracja
 SITES_TO_ANALYZE = {
     "salon24": {
@@ -61,10 +71,8 @@ def get_page_with_delay(url: str, delay: float = 0) -> Optional[requests.Respons
     }
     
     try:
-        if delay > 0:
-            time.sleep(delay)
-        
-        response = requests.get(url, headers=headers, timeout=10)
+        # delay tylko przed rzeczywistym żądaniem — trafienia w cache są natychmiastowe
+        response = get_cache().get(url, headers=headers, timeout=10, delay=delay)
         response.raise_for_status()
         return response
     except Exception as e:
@@ -118,6 +126,9 @@ def analyze_page_structure(response: requests.Response, site_name: str) -> Dict:
     json_scripts = soup.find_all('script', string=lambda text: text and ('api' in text.lower() or 'json' in text.lower()))
     analysis["has_api_endpoints"] = len(json_scripts) > 0
     
+    # Profil ekstrakcji (XPath) wyuczony na tej stronie
+    analysis["profile"] = learn_profile(response.content, response.url, site_name).to_dict()
+    
     return analysis
 
 def detect_scraping_challenges(analysis: Dict) -> List[str]:
@@ -184,11 +195,24 @@ def recommend_scraping_strategy(analysis: Dict, challenges: List[str]) -> Dict:
     return strategy
 
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Analiza techniczna serwisów + uczenie profili ekstrakcji')
+    parser.add_argument('--offline', action='store_true', help='Tylko strony z cache HTTP (bez sieci)')
+    parser.add_argument('--cache-dir', default=None, help='Katalog cache HTTP (np. zamrożony snapshot)')
+    args = parser.parse_args()
+    http_cache = configure_http_cache(
+        mode='offline' if args.offline else None,
+        root=Path(args.cache_dir) if args.cache_dir else None,
+    )
+
     setup_logging()
     results = []
     
     print("🔍 Analiza techniczna polskich blogów prawicowych/libertariańskich\n")
     
+    profiles = {}
+    
     for site_name, config in SITES_TO_ANALYZE.items():
         print(f"📊 Analizuję: {site_name} ({config['base_url']})")
         
@@ -235,12 +259,19 @@ def main():
             print(f"      ⚠️  Wyzwania: {', '.join(challenges) if challenges else 'Brak'}")
             print(f"      💡 Metoda: {strategy['primary_method']}")
             print(f"      ⏱️  Rate limit: {strategy['rate_limit']}s")
+            print(f"      🧭 Profil: post={analysis['profile']['item']}, linki={analysis['profile']['links']}")
             print()
         
         # Określ strategię dla całego serwisu
         if site_results["pages"]:
             # Weź strategię z pierwszej działającej strony
             site_results["overall_strategy"] = site_results["pages"][0]["strategy"]
+            
+            # Profil serwisu: strony posortowane wg liczby znalezionych postów
+            pages = sorted(site_results["pages"], key=lambda p: p["analysis"]["articles"], reverse=True)
+            profiles[site_name] = merge_profiles([
+                ExtractionProfile.from_dict(p["analysis"]["profile"]) for p in pages
+            ])
         
         results.append(site_results)
     
@@ -250,6 +281,11 @@ def main():
         json.dump(results, f, ensure_ascii=False, indent=2)
     
     print(f"💾 Wyniki zapisane do: {output_file}")
+    print(f"🗄️  Cache HTTP ({http_cache.mode}): {http_cache.stats}")
+    
+    if profiles:
+        save_profiles(profiles)
+        print(f"🧭 Profile ekstrakcji ({', '.join(profiles)}) zapisane do: {PROFILES_PATH}")
     
     # Podsumowanie
     print("\n" + "="*60)
@@ -1,11 +1,20 @@
 """
 Test alternatywnych URL-i dla Fazy 2 + dodatkowe źródła zastępcze.
+Feedy i robots.txt idą przez cache HTTP (ingest/http_cache.py) — ponowne uruchomienie
+nie pobiera świeżych odpowiedzi; SATYRAI_HTTP_CACHE=offline odtwarza je bez sieci.
 """
-import requests
+import sys
 import time
+from pathlib import Path
+
 import feedparser
 from urllib.robotparser import RobotFileParser
 
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ingest.http_cache import get_cache
+
 # FAZA 2 - poprawione URL + alternatywy
 PHASE2_FEEDS = [
     {
@@ -45,8 +54,13 @@ def test_robots_txt(robots_url):
     """Test czy robots.txt pozwala na crawling."""
     try:
         rp = RobotFileParser()
-        rp.set_url(robots_url)
-        rp.read()
+        resp = get_cache().get(robots_url, timeout=10)
+        if resp.status_code in (401, 403):
+            rp.disallow_all = True
+        elif resp.status_code >= 400:
+            rp.allow_all = True
+        else:
+            rp.parse(resp.text.splitlines())
         can_fetch = rp.can_fetch("SatyrAI-bot", "/")
         return can_fetch, "OK"
     except Exception as e:
@@ -58,7 +72,7 @@ def test_rss_feed(feed_url):
         headers = {
             'User-Agent': 'SatyrAI-bot/0.1 (https://github.com/your-repo)'
         }
-        response = requests.get(feed_url, headers=headers, timeout=10)
+        response = get_cache().get(feed_url, headers=headers, timeout=10)
         
         if response.status_code != 200:
             return False, f"HTTP {response.status_code}", 0
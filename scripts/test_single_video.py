@@ -3,21 +3,26 @@ Test pojedynczego filmu YouTube - Stanowski.
 """
 import subprocess
 import json
+import sys
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
-AUDIO_DIR = ROOT / "audio"  
+sys.path.append(str(ROOT))
+
+from ingest.audio_cache import AudioCache
+
+AUDIO_DIR = ROOT / "audio"  # stary układ — pliki są przenoszone do cache audio
 OUTPUT_DIR = ROOT / "data" / "youtube"
 
 # Test z konkretnym filmem Stanowskiego
-TEST_VIDEO_URL = "https://www.youtube.com/watch?v=StNmA41ag8Q"  # Ten co już pobraliśmy
+TEST_VIDEO_ID = "StNmA41ag8Q"
+TEST_VIDEO_URL = f"https://www.youtube.com/watch?v={TEST_VIDEO_ID}"  # Ten co już pobraliśmy
 
-def test_whisper_transcription():
+def test_whisper_transcription(audio_file):
     """Test transkrypcji z już pobranym plikiem."""
     
     # Sprawdź czy mamy plik audio
-    audio_file = AUDIO_DIR / "StNmA41ag8Q.mp3"
-    if not audio_file.exists():
+    if not audio_file or not audio_file.exists():
         print("❌ Brak pliku audio - pobierz pierwszy")
         return
     
@@ -63,8 +68,8 @@ def test_whisper_transcription():
         print(f"❌ Błąd transkrypcji: {e}")
         return None
 
-def download_single_video():
-    """Pobiera pojedynczy film jako test."""
+def download_single_video(target_dir):
+    """Pobiera pojedynczy film jako test (do target_dir, zwraca ścieżkę mp3)."""
     print(f"📺 Pobieranie testu: {TEST_VIDEO_URL}")
     
     cmd = [
@@ -72,7 +77,7 @@ def download_single_video():
         "-x",
         "--audio-format", "mp3", 
         "--audio-quality", "0",
-        "-o", str(AUDIO_DIR / "%(id)s.%(ext)s"),
+        "-o", str(target_dir / "%(id)s.%(ext)s"),
         TEST_VIDEO_URL
     ]
     
@@ -80,32 +85,29 @@ def download_single_video():
         result = subprocess.run(cmd, capture_output=True, timeout=300)
         if result.returncode == 0:
             print("✅ Audio pobrane")
-            return True
+            return target_dir / f"{TEST_VIDEO_ID}.mp3"
         else:
             print(f"❌ Błąd pobierania: {result.stderr}")
-            return False
+            return None
     except Exception as e:
         print(f"❌ Błąd: {e}")
-        return False
+        return None
 
 def main():
     """Test pipeline."""
     print("🧪 TEST POJEDYNCZEGO FILMU YOUTUBE\n")
     
-    AUDIO_DIR.mkdir(parents=True, exist_ok=True)
-    
-    # Sprawdź czy mamy już audio
-    audio_file = AUDIO_DIR / "StNmA41ag8Q.mp3"
-    
-    if audio_file.exists():
-        print("✅ Audio już istnieje, przechodząc do transkrypcji")
-    else:
-        print("📥 Pobieranie audio...")
-        if not download_single_video():
-            return
+    # Audio z cache (pobierane tylko przy braku wpisu)
+    audio_cache = AudioCache.from_config()
+    audio_file = audio_cache.fetch_audio(
+        TEST_VIDEO_ID, "mp3", download_single_video,
+        legacy_path=AUDIO_DIR / f"{TEST_VIDEO_ID}.mp3",
+    )
+    if not audio_file:
+        return
     
     # Testuj transkrypcję
-    transcript = test_whisper_transcription()
+    transcript = test_whisper_transcription(audio_file)
     
     if transcript:
         print(f"\n🎉 TEST ZAKOŃCZONY POMYŚLNIE!")
@@ -2,6 +2,7 @@
 Półautomatyczna weryfikacja feedów z docs/whitelist.yaml:
 - Sprawdza robots.txt (czy feed jest dozwolony dla default user-agent).
 - Wysyła HEAD do feeda (fallback GET) by sprawdzić status/redirect.
+- robots.txt i feedy idą przez cache HTTP (ingest/http_cache.py); --offline bez sieci.
 - Generuje raport markdown (docs/verification_report.md).
 - Opcjonalnie może zaktualizować pole robots_ok w whitelist.yaml.
 Uwaga: licencji nie da się automatycznie potwierdzić — pozostaje ręczna inspekcja Terms/FAQ.
@@ -20,6 +21,10 @@ import requests
 import yaml
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ingest.http_cache import configure as configure_http_cache, get_cache
+
 WHITELIST = ROOT / "docs" / "whitelist.yaml"
 REPORT = ROOT / "docs" / "verification_report.md"
 
@@ -36,8 +41,13 @@ def check_robots(feed_url: str, user_agent: str = "*") -> Tuple[bool, str]:
     robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
     rp = RobotFileParser()
     try:
-        rp.set_url(robots_url)
-        rp.read()
+        resp = get_cache().get(robots_url, timeout=10)
+        if resp.status_code in (401, 403):
+            rp.disallow_all = True
+        elif resp.status_code >= 400:
+            rp.allow_all = True
+        else:
+            rp.parse(resp.text.splitlines())
         allowed = rp.can_fetch(user_agent, feed_url)
         return allowed, robots_url
     except Exception:
@@ -46,11 +56,11 @@ def check_robots(feed_url: str, user_agent: str = "*") -> Tuple[bool, str]:
 
 def head_feed(feed_url: str, timeout: float = 5.0) -> Tuple[int, str]:
     try:
-        resp = requests.head(feed_url, timeout=timeout, allow_redirects=True)
+        resp = get_cache().head(feed_url, timeout=timeout)
         return resp.status_code, resp.url
     except requests.RequestException:
         try:
-            resp = requests.get(feed_url, timeout=timeout, allow_redirects=True)
+            resp = get_cache().get(feed_url, timeout=timeout)
             return resp.status_code, resp.url
         except requests.RequestException:
             return 0, feed_url
@@ -79,7 +89,13 @@ def main() -> None:
     parser.add_argument("--update-robots", action="store_true", help="Aktualizuj robots_ok na podstawie sprawdzenia")
     parser.add_argument("--user-agent", default="*", help="User-Agent dla robots.txt")
     parser.add_argument("--timeout", type=float, default=5.0, help="Timeout dla zapytań HTTP")
+    parser.add_argument("--offline", action="store_true", help="Tylko odpowiedzi z cache HTTP (bez sieci)")
+    parser.add_argument("--cache-dir", default=None, help="Katalog cache HTTP (np. zamrożony snapshot)")
     args = parser.parse_args()
+    configure_http_cache(
+        mode="offline" if args.offline else None,
+        root=Path(args.cache_dir) if args.cache_dir else None,
+    )
 
     entries = load_whitelist()
     results = []
@@ -10,9 +10,18 @@ Przykład:
 Domyślna lista kanałów pochodzi z docs/youtube_channels.md (ręcznie wklejona poniżej).
 Skrypt:
 1) Pobiera najnowsze ID z kanału (yt-dlp, tryb playlisty /videos).
-2) Próbuje pobrać transkrypcję (YouTubeTranscriptApi) w jęz. pl, en (kolejność priorytetu).
+2) Pozyskuje transkrypcję równolegle: YouTubeTranscriptApi (pl, en wg priorytetu), auto-napisy
+   yt-dlp i — gdy brak manualnego transkryptu — spekulatywne pobranie audio dla Whispera.
+   Pierwsze wystarczająco dobre źródło wygrywa, pozostałe są anulowane.
 3) Zapisuje JSONL per kanał w data/youtube/<channel_slug>.jsonl (append).
 
+Tryb --long-audio: długie nagrania (podcasty > 30 min) są dekodowane do 16 kHz, przycinane
+detektorem mowy i transkrybowane fragmentami w puli procesów CPU (ingest/long_audio.py).
+Filtr --max-duration jest wtedy domyślnie wyłączony.
+
+Audio i zdekodowane PCM trafiają do wspólnego cache (ingest/audio_cache.py, data/audio_cache/),
+więc ponowna transkrypcja innym modelem Whisper nie pobiera filmów drugi raz.
+
 Uwaga: YouTube może nakładać limity (429). W razie problemów zwiększ --sleep lub zmniejsz --limit.
 """
 
@@ -23,15 +32,30 @@ import json
 import shlex
 import subprocess
 import sys
+import threading
 import time
 import tempfile
 import shutil
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound
 
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from ingest.audio_cache import AudioCache
+from ingest.captions import parse_caption_segments
+from ingest.long_audio import transcribe_long_audio
+from ingest.segment_store import (
+    segments_from_api,
+    segments_from_whisper,
+    segments_text,
+    write_segments,
+)
+
 # Kanały: nazwa i URL do sekcji /videos
 CHANNELS = [
     {"name": "Kto Wygrał", "url": "https://www.youtube.com/@KtoWygralOfficial/videos"},
@@ -189,15 +213,43 @@ def resolve_uploads_playlist_url(
     return None
 
 
+def run_cancellable(
+    cmd: List[str], timeout: float, cancel: Optional[threading.Event] = None
+) -> Optional[subprocess.CompletedProcess]:
+    """
+    subprocess.run(capture_output, text) z możliwością przerwania: gdy `cancel` zostanie
+    ustawiony, proces jest zabijany i zwracane jest None. Timeout jak w subprocess.run.
+    """
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            out, err = proc.communicate(timeout=0.25)
+            return subprocess.CompletedProcess(cmd, proc.returncode, out, err)
+        except subprocess.TimeoutExpired:
+            if cancel is not None and cancel.is_set():
+                proc.kill()
+                proc.communicate()
+                return None
+            if time.monotonic() > deadline:
+                proc.kill()
+                proc.communicate()
+                raise subprocess.TimeoutExpired(cmd, timeout)
+
+
 def download_audio(
     video_id: str,
     target_dir: Path,
     timeout: int = 120,
     extra_yt_dlp_args: Optional[List[str]] = None,
     max_retries: int = 3,
+    cancel: Optional[threading.Event] = None,
 ) -> Optional[Path]:
     """
     Pobiera audio z YouTube (bestaudio) do pliku w target_dir z retry logic.
+    Przerywa pobieranie (kill yt-dlp) gdy ustawiono `cancel`.
     """
     target_dir.mkdir(parents=True, exist_ok=True)
     out_template = target_dir / f"{video_id}.%(ext)s"
@@ -214,8 +266,12 @@ def download_audio(
     ] + extra + [url]
     
     for attempt in range(max_retries):
+        if cancel is not None and cancel.is_set():
+            return None
         try:
-            res = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+            res = run_cancellable(cmd, timeout, cancel)
+            if res is None:
+                return None
             if res.returncode == 0:
                 # Sprawdź czy plik został utworzony (priorytet dla popularnych formatów audio)
                 for ext in ("mp3", "m4a", "webm", "opus", "mp4"):
@@ -258,9 +314,10 @@ def download_audio(
 
 def transcribe_with_whisper(
     audio_path: Path, model_name: str, language: Optional[str], device: Optional[str]
-) -> Optional[str]:
+) -> Optional[List[Dict[str, Any]]]:
     """
     Transkrybuje audio używając Whisper (wymaga pakietu `whisper` i ffmpeg).
+    Zwraca segmenty {"start", "end", "text"}.
     """
     try:
         import whisper  # type: ignore
@@ -273,21 +330,54 @@ def transcribe_with_whisper(
             language=language,
             fp16=False if (device or "cpu") == "cpu" else True,
         )
-        return result.get("text", "").strip()
+        return segments_from_whisper(result) or None
     except Exception:
         print(f"[{audio_path.name}] whisper transcribe failed", file=sys.stderr)
         return None
 
 
+def transcribe_long_with_whisper(
+    audio_path: Path,
+    model_name: str,
+    language: Optional[str],
+    workers: Optional[int] = None,
+    chunk_seconds: float = 30.0,
+    pcm_path: Optional[Path] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Tryb long-audio: VAD + fragmenty transkrybowane równolegle na CPU.
+    pcm_path: zdekodowane PCM z cache audio (pomija ffmpeg).
+    """
+    try:
+        result = transcribe_long_audio(
+            audio_path,
+            model_name=model_name,
+            language=language,
+            workers=workers,
+            max_chunk_s=chunk_seconds,
+            pcm_path=pcm_path,
+        )
+    except Exception as e:
+        print(f"[{audio_path.name}] long-audio transcribe failed: {e}", file=sys.stderr)
+        return None
+    if not result:
+        return None
+    print(
+        f"[{audio_path.name}] mowa {result['speech_seconds']:.0f}s z {result['total_seconds']:.0f}s nagrania"
+    )
+    return result["segments"] or None
+
+
 def download_auto_caption(
     video_id: str,
     languages: List[str],
     target_dir: Path,
     timeout: int = 60,
     extra_yt_dlp_args: Optional[List[str]] = None,
-) -> Optional[str]:
+    cancel: Optional[threading.Event] = None,
+) -> Optional[List[Dict[str, Any]]]:
     """
-    Pobiera auto-napisy yt-dlp (vtt/srt) i zwraca tekst.
+    Pobiera auto-napisy yt-dlp (vtt/srt) i zwraca segmenty {"start", "end", "text"}.
     """
     target_dir.mkdir(parents=True, exist_ok=True)
     url = f"https://www.youtube.com/watch?v={video_id}"
@@ -307,44 +397,28 @@ def download_auto_caption(
             *extra,
             url,
         ]
-        res = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        res = run_cancellable(cmd, timeout, cancel)
+        if res is None:
+            return None
         if res.returncode != 0:
             continue
         for ext in ("vtt", "srt"):
             p = target_dir / f"{video_id}.{lang}.{ext}"
             if p.exists():
                 try:
-                    text = parse_caption_file(p)
-                    if text:
-                        return text
+                    segments = parse_caption_file(p)
+                    if segments:
+                        return segments
                 except Exception:
                     continue
     return None
 
 
-def parse_caption_file(path: Path) -> str:
+def parse_caption_file(path: Path) -> List[Dict[str, Any]]:
     """
-    Proste parsowanie VTT/SRT: usuwa linie czasów, numery, tagi HTML.
+    Strumieniowe parsowanie VTT/SRT z czasami cue i bez rolling duplikatów auto-napisów.
     """
-    import re
-
-    lines = path.read_text(encoding="utf-8", errors="ignore").splitlines()
-    out: List[str] = []
-    time_re = re.compile(r"^\d{1,2}:\d{2}:\d{2}")
-    time_vtt_re = re.compile(r"^\d{2}:\d{2}\.\d{3}")
-    for ln in lines:
-        if not ln.strip():
-            continue
-        if ln.strip().isdigit():
-            continue
-        if "-->" in ln:
-            continue
-        if time_re.match(ln) or time_vtt_re.match(ln):
-            continue
-        clean = re.sub(r"<[^>]+>", "", ln).strip()
-        if clean:
-            out.append(clean)
-    return " ".join(out).strip()
+    return parse_caption_segments(path)
 
 
 def fetch_metadata(
@@ -373,23 +447,27 @@ def fetch_metadata(
         return None
 
 
-def fetch_transcript(video_id: str, languages: List[str]) -> Optional[str]:
-    """
-    Próbuje pobrać transkrypt (manualny lub auto) w zadanych językach.
-    """
+def has_manual_transcript(transcripts: Any, languages: List[str]) -> bool:
     try:
-        transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
+        transcripts.find_manually_created_transcript(languages)
+        return True
     except Exception:
-        return None
+        return False
 
+
+def pick_transcript(
+    transcripts: Any, languages: List[str]
+) -> Optional[Tuple[List[Dict[str, Any]], str]]:
+    """
+    Z listy transkryptów wybiera manualny, potem auto (wg kolejności języków).
+    """
     # manualne
     for lang in languages:
         try:
             data = transcripts.find_transcript([lang]).fetch()
-            if data:
-                return " ".join(
-                    seg.get("text", "") for seg in data if seg.get("text")
-                ).strip()
+            segments = segments_from_api(data or [])
+            if segments:
+                return segments, "manual"
         except NoTranscriptFound:
             continue
         except Exception:
@@ -399,10 +477,9 @@ def fetch_transcript(video_id: str, languages: List[str]) -> Optional[str]:
     for lang in languages:
         try:
             data = transcripts.find_generated_transcript([lang]).fetch()
-            if data:
-                return " ".join(
-                    seg.get("text", "") for seg in data if seg.get("text")
-                ).strip()
+            segments = segments_from_api(data or [])
+            if segments:
+                return segments, "auto"
         except NoTranscriptFound:
             continue
         except Exception:
@@ -411,6 +488,142 @@ def fetch_transcript(video_id: str, languages: List[str]) -> Optional[str]:
     return None
 
 
+def fetch_transcript(
+    video_id: str, languages: List[str]
+) -> Optional[Tuple[List[Dict[str, Any]], str]]:
+    """
+    Próbuje pobrać transkrypt (manualny lub auto) w zadanych językach.
+    Zwraca (segmenty {"start", "end", "text"}, źródło "manual"/"auto") lub None.
+    """
+    try:
+        transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
+    except Exception:
+        return None
+    return pick_transcript(transcripts, languages)
+
+
+# Ranking sond: niższy = lepszy wynik. Audio (Whisper) tylko gdy tekst nie przyjdzie.
+PROBE_RANK = {"manual": 0, "auto": 1, "captions": 2, "audio": 3}
+
+
+def acquire_transcript(
+    video_id: str,
+    languages: List[str],
+    work_dir: Path,
+    use_auto_captions: bool = True,
+    speculative_audio: bool = True,
+    extra_yt_dlp_args: Optional[List[str]] = None,
+    audio_cache: Optional[AudioCache] = None,
+) -> Tuple[Optional[Tuple[List[Dict[str, Any]], str]], Optional[Path]]:
+    """
+    Równoległe pozyskanie transkryptu zamiast sekwencji API -> auto-napisy -> Whisper:
+    - od razu startują tanie sondy: list_transcripts (+fetch) i auto-napisy yt-dlp,
+    - gdy lista nie zawiera manualnego transkryptu (lub API zawiedzie), startuje
+      spekulatywne pobieranie audio dla Whispera,
+    - wygrywa pierwszy wynik, którego nie może już pobić żadna trwająca sonda
+      (PROBE_RANK); pozostałe są anulowane (kill procesów yt-dlp).
+    Zwraca ((segmenty, źródło) | None, ścieżka audio | None). Audio jest zwracane tylko
+    gdy żadne źródło tekstowe nie zadziałało — wtedy wywołujący uruchamia Whisper.
+    Z audio_cache sonda audio bierze plik z cache i pobiera tylko przy braku wpisu.
+    """
+    cancel = threading.Event()
+    listed = threading.Event()
+    # Najlepsze, co API może jeszcze zwrócić; spada do "auto" gdy lista nie ma manualnego
+    api_best = {"rank": PROBE_RANK["manual"]}
+
+    def api_probe() -> Optional[Tuple[List[Dict[str, Any]], str]]:
+        try:
+            transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
+        except Exception:
+            api_best["rank"] = len(PROBE_RANK)
+            listed.set()
+            return None
+        if not has_manual_transcript(transcripts, languages):
+            api_best["rank"] = PROBE_RANK["auto"]
+        listed.set()
+        return pick_transcript(transcripts, languages)
+
+    def caption_probe() -> Optional[Tuple[List[Dict[str, Any]], str]]:
+        segments = download_auto_caption(
+            video_id,
+            languages,
+            work_dir / "captions",
+            extra_yt_dlp_args=extra_yt_dlp_args,
+            cancel=cancel,
+        )
+        return (segments, "auto") if segments else None
+
+    def audio_probe() -> Optional[Path]:
+        def download(target_dir: Path) -> Optional[Path]:
+            return download_audio(
+                video_id,
+                target_dir,
+                extra_yt_dlp_args=extra_yt_dlp_args,
+                max_retries=3,
+                cancel=cancel,
+            )
+
+        if audio_cache is not None:
+            return audio_cache.fetch_audio(video_id, "bestaudio", download)
+        return download(work_dir / "audio")
+
+    def rank_of(name: str, result: Any = None) -> int:
+        if name == "api":
+            return PROBE_RANK[result[1]] if result else api_best["rank"]
+        return PROBE_RANK[name]
+
+    pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix=f"yt-{video_id}")
+    pending: Dict[Future, str] = {pool.submit(api_probe): "api"}
+    if use_auto_captions:
+        pending[pool.submit(caption_probe)] = "captions"
+    audio_started = not speculative_audio
+
+    best: Optional[Tuple[int, str, Any]] = None  # (rank, sonda, wynik)
+    try:
+        while pending or not audio_started:
+            if not audio_started and listed.is_set() and api_best["rank"] > PROBE_RANK["manual"]:
+                audio_started = True
+                pending[pool.submit(audio_probe)] = "audio"
+            if not pending:
+                # API jeszcze nie odpowiedziało na listę, a nic innego nie trwa
+                listed.wait(0.25)
+                if listed.is_set() and api_best["rank"] == PROBE_RANK["manual"]:
+                    break
+                continue
+
+            done, _ = wait(list(pending), timeout=0.25, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = pending.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:  # noqa: BLE001
+                    print(f"[{video_id}] sonda {name} nie powiodła się: {e}")
+                    result = None
+                if result is None:
+                    if name == "api":
+                        api_best["rank"] = len(PROBE_RANK)
+                    continue
+                rank = rank_of(name, result)
+                if best is None or rank < best[0]:
+                    best = (rank, name, result)
+
+            if best is not None and all(rank_of(n) >= best[0] for n in pending.values()):
+                if audio_started or best[0] < PROBE_RANK["audio"]:
+                    break
+    finally:
+        # Anuluj przegrane sondy: kill yt-dlp; wątek API kończy się sam w tle
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if best is None:
+        return None, None
+    _, name, result = best
+    if name == "audio":
+        return None, result
+    print(f"[{video_id}] wygrało źródło: {result[1]} (sonda {name})")
+    return result, None
+
+
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument(
@@ -434,7 +647,7 @@ def main() -> None:
     ap.add_argument(
         "--save-audio-dir",
         default=None,
-        help="Jeśli podasz ścieżkę, zachowa pobrane audio w tym folderze (debug/archiwum)",
+        help="Jeśli podasz ścieżkę, skopiuje audio z cache do tego folderu (debug/archiwum)",
     )
     ap.add_argument(
         "--use-auto-captions",
@@ -461,8 +674,25 @@ def main() -> None:
     ap.add_argument(
         "--max-duration",
         type=int,
-        default=30,
-        help="Pomiń filmy dłuższe niż X minut (filtr na metadanych, domyślnie 30)",
+        default=None,
+        help="Pomiń filmy dłuższe niż X minut (filtr na metadanych, domyślnie 30; 0 w trybie --long-audio)",
+    )
+    ap.add_argument(
+        "--long-audio",
+        action="store_true",
+        help="Długie nagrania: VAD + transkrypcja fragmentami w puli procesów CPU",
+    )
+    ap.add_argument(
+        "--long-audio-workers",
+        type=int,
+        default=None,
+        help="Liczba procesów Whisper w trybie --long-audio (domyślnie CPU/4)",
+    )
+    ap.add_argument(
+        "--chunk-seconds",
+        type=float,
+        default=30.0,
+        help="Maksymalna długość fragmentu audio w trybie --long-audio (s)",
     )
     ap.add_argument(
         "--published-after",
@@ -483,6 +713,8 @@ def main() -> None:
     args = ap.parse_args()
 
     langs = [x.strip() for x in args.langs.split(",") if x.strip()]
+    if args.max_duration is None:
+        args.max_duration = 0 if args.long_audio else 30
     extra_args = parse_extra_yt_dlp_args(args.yt_dlp_args)
     channels = CHANNELS
     if args.channels:
@@ -490,6 +722,7 @@ def main() -> None:
 
     out_dir = Path(args.output_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
+    audio_cache = AudioCache.from_config()
     now = datetime.now(timezone.utc).isoformat()
 
     for ch in channels:
@@ -510,6 +743,8 @@ def main() -> None:
             for i, vid in enumerate(ids, 1):
                 print(f"[{name}] przetwarzam film {i}/{len(ids)}: {vid}")
                 text = None
+                segments: Optional[List[Dict[str, Any]]] = None
+                source: Optional[str] = None
 
                 # Filtry metadanych (długość, data) jeśli nie tryb prosty
                 if not args.simple_whisper_only:
@@ -541,50 +776,72 @@ def main() -> None:
                             except Exception:
                                 pass
 
-                    print(f"[{name}] {vid}: szukam transkrypcji YouTube API...")
-                    text = fetch_transcript(vid, langs)
-                    if text:
-                        print(f"[{name}] {vid}: znaleziono transkrypcję z YouTube API (długość: {len(text)} znaków)")
-                    else:
-                        print(f"[{name}] {vid}: brak transkrypcji z YouTube API")
-                    if not text and args.use_auto_captions:
-                        print(f"[{name}] {vid}: próba pobrania auto-napisów...")
-                        with tempfile.TemporaryDirectory() as tmpdir:
-                            text = download_auto_caption(
-                                vid, langs, Path(tmpdir), extra_yt_dlp_args=extra_args
-                            )
-                        if text:
-                            print(f"[{name}] {vid}: znaleziono auto-napisy (długość: {len(text)} znaków)")
-                        else:
-                            print(f"[{name}] {vid}: brak auto-napisów")
-
-                # Whisper (fallback lub tryb prosty)
-                if (not text and args.whisper) or args.simple_whisper_only:
-                    print(f"[{name}] {vid}: rozpoczynam pobieranie audio dla Whisper...")
-                    with tempfile.TemporaryDirectory() as tmpdir:
-                        audio_path = download_audio(
-                            vid, Path(tmpdir), extra_yt_dlp_args=extra_args, max_retries=3
+                work = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+                work_dir = Path(work.name)
+                audio_path: Optional[Path] = None
+                try:
+                    if not args.simple_whisper_only:
+                        print(f"[{name}] {vid}: równoległe sondy: YouTube API / auto-napisy / audio...")
+                        found, audio_path = acquire_transcript(
+                            vid,
+                            langs,
+                            work_dir,
+                            use_auto_captions=args.use_auto_captions,
+                            speculative_audio=args.whisper,
+                            extra_yt_dlp_args=extra_args,
+                            audio_cache=audio_cache,
                         )
+                        if found:
+                            segments, source = found
+                            text = segments_text(segments)
+                            print(f"[{name}] {vid}: znaleziono transkrypcję ({source}, długość: {len(text)} znaków)")
+                        else:
+                            print(f"[{name}] {vid}: brak transkrypcji z YouTube API i auto-napisów")
+
+                    # Whisper (fallback lub tryb prosty)
+                    if (not text and args.whisper) or args.simple_whisper_only:
+                        if audio_path is None:
+                            print(f"[{name}] {vid}: audio dla Whisper (cache lub pobranie)...")
+                            audio_path = audio_cache.fetch_audio(
+                                vid,
+                                "bestaudio",
+                                lambda d: download_audio(vid, d, extra_yt_dlp_args=extra_args, max_retries=3),
+                            )
                         if audio_path:
                             print(f"[{name}] {vid}: pobrano audio {audio_path.name}, rozpoczynam transkrypcję Whisper...")
                             if args.save_audio_dir:
                                 dest_dir = Path(args.save_audio_dir)
                                 dest_dir.mkdir(parents=True, exist_ok=True)
-                                shutil.copy(audio_path, dest_dir / audio_path.name)
-                                print(f"[{name}] {vid}: zapisano audio do {dest_dir / audio_path.name}")
+                                dest = dest_dir / f"{vid}{audio_path.suffix}"
+                                shutil.copy(audio_path, dest)
+                                print(f"[{name}] {vid}: zapisano audio do {dest}")
                             whisper_lang = langs[0] if langs else None
-                            text = transcribe_with_whisper(
-                                audio_path,
-                                args.whisper_model,
-                                whisper_lang,
-                                args.whisper_device,
-                            )
-                            if text:
+                            if args.long_audio:
+                                segments = transcribe_long_with_whisper(
+                                    audio_path,
+                                    args.whisper_model,
+                                    whisper_lang,
+                                    workers=args.long_audio_workers,
+                                    chunk_seconds=args.chunk_seconds,
+                                    pcm_path=audio_cache.get_pcm(vid, audio_path),
+                                )
+                            else:
+                                segments = transcribe_with_whisper(
+                                    audio_path,
+                                    args.whisper_model,
+                                    whisper_lang,
+                                    args.whisper_device,
+                                )
+                            if segments:
+                                source = "whisper"
+                                text = segments_text(segments)
                                 print(f"[{name}] {vid}: transkrypcja Whisper zakończona (długość: {len(text)} znaków)")
                             else:
                                 print(f"[{name}] {vid}: transkrypcja Whisper nie powiodła się")
                         else:
                             print(f"[{name}] {vid}: nie udało się pobrać audio")
+                finally:
+                    work.cleanup()
                 if not text:
                     print(f"[{name}] {vid}: brak tekstu - pomijam")
                     time.sleep(args.sleep)
@@ -596,7 +853,13 @@ def main() -> None:
                     "video_id": vid,
                     "lang_pref": langs,
                     "transcript": text,
+                    "transcript_source": source,
                 }
+                if segments and source:
+                    seg_dir = write_segments(
+                        vid, segments, source, meta={"channel": name, "fetched_at": now}
+                    )
+                    rec["segments_dir"] = str(seg_dir.relative_to(ROOT))
                 f.write(json.dumps(rec, ensure_ascii=False) + "\n")
                 written += 1
                 print(f"[{name}] {vid}: zapisano transkrypcję (łącznie: {written}/{len(ids)})")
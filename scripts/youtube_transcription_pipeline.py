@@ -10,7 +10,13 @@ from datetime import datetime, timedelta
 import re
 
 ROOT = Path(__file__).resolve().parents[1]
-AUDIO_DIR = ROOT / "audio"
+sys.path.append(str(ROOT))
+
+from ingest.audio_cache import AudioCache
+from ingest.segment_store import segments_from_whisper, write_segments
+from processing.transcript_export import OUT_PATH as RAW_EXPORT_PATH, export_transcripts
+
+AUDIO_DIR = ROOT / "audio"  # stary układ — pliki są przenoszone do cache audio
 TRANSCRIPTS_DIR = ROOT / "data" / "youtube"
 MODELS_DIR = ROOT / "models"
 
@@ -32,7 +38,7 @@ CHANNELS = {
 
 def setup_directories():
     """Tworzy potrzebne katalogi."""
-    for directory in [AUDIO_DIR, TRANSCRIPTS_DIR, MODELS_DIR]:
+    for directory in [TRANSCRIPTS_DIR, MODELS_DIR]:
         directory.mkdir(parents=True, exist_ok=True)
     print("✅ Katalogi przygotowane")
 
@@ -182,6 +188,7 @@ def process_channel(channel_key, channel_info):
     print(f"🎯 Wybrano {len(political_videos)} filmów do transkrypcji")
     
     # 3. Pobierz audio i transkrybuj
+    audio_cache = AudioCache.from_config()
     transcripts = []
     
     for i, video in enumerate(political_videos[:5], 1):  # Limit 5 filmów na kanał
@@ -193,20 +200,28 @@ def process_channel(channel_key, channel_info):
             print("  ✅ Transkrypcja już istnieje")
             continue
         
-        # Pobierz audio
-        print("  ⬇️  Pobieranie audio...")
-        audio_file = AUDIO_DIR / f"{video['id']}.mp3"
-        
-        if not audio_file.exists():
-            if not download_audio(video['url'], AUDIO_DIR):
-                print("  ❌ Błąd pobierania audio")
-                continue
+        # Audio z cache (pobierane tylko przy braku wpisu)
+        print("  ⬇️  Audio (cache lub pobieranie)...")
+        audio_file = audio_cache.fetch_audio(
+            video['id'], "mp3",
+            lambda d: d / f"{video['id']}.mp3" if download_audio(video['url'], d) else None,
+            legacy_path=AUDIO_DIR / f"{video['id']}.mp3",
+        )
+        if not audio_file:
+            print("  ❌ Błąd pobierania audio")
+            continue
         
         # Transkrybuj
         print("  🎤 Transkrypcja...")
         transcript = transcribe_audio(audio_file, model_size="base")
         
         if transcript:
+            # Segmenty z czasami -> kolumnowy magazyn (do cięcia okien treningowych)
+            seg_dir = write_segments(
+                video['id'], segments_from_whisper(transcript), "whisper",
+                meta={"channel_key": channel_key}
+            )
+            
             # Zapisz transkrypcję z metadanymi
             full_transcript = {
                 "video_id": video['id'],
@@ -216,6 +231,7 @@ def process_channel(channel_key, channel_info):
                 "channel": channel_info['name'],
                 "channel_key": channel_key,
                 "transcript": transcript,
+                "segments_dir": str(seg_dir.relative_to(ROOT)),
                 "processed_date": datetime.now().isoformat()
             }
             
@@ -224,88 +240,21 @@ def process_channel(channel_key, channel_info):
             
             transcripts.append(full_transcript)
             print("  ✅ Transkrypcja zapisana")
-            
-            # Usuń audio po transkrypcji (oszczędność miejsca)
-            if audio_file.exists():
-                audio_file.unlink()
-                print("  🗑️  Audio usunięte")
         
         print(f"  ⏱️  Postęp: {i}/{len(political_videos[:5])}")
     
     print(f"\n✅ Kanał {channel_info['name']}: {len(transcripts)} transkrypcji")
     return transcripts
 
-def export_for_training(channel_transcripts):
-    """Eksportuje transkrypcje do formatu treningowego."""
+def export_for_training():
+    """
+    Przyrostowy eksport wszystkich data/youtube/<video_id>.json do formatu treningowego
+    (processing/transcript_export.py) — dopisuje tylko jeszcze niewyeksportowane segmenty.
+    """
     print("\n📤 Eksport do formatu treningowego...")
-    
-    training_data = []
-    
-    for channel_key, transcripts in channel_transcripts.items():
-        for transcript in transcripts:
-            # Podziel długie transkrypcje na segmenty
-            text = transcript['transcript']['text']
-            
-            # Prosta segmentacja (można ulepszyć)
-            sentences = text.split('. ')
-            current_segment = ""
-            
-            for sentence in sentences:
-                if len(current_segment + sentence) < 500:  # Max 500 znaków na segment
-                    current_segment += sentence + ". "
-                else:
-                    if current_segment.strip():
-                        training_data.append({
-                            "source": transcript['channel'],
-                            "feed": transcript['url'],
-                            "type": "video_transcript", 
-                            "country": "PL",
-                            "license": "fair_use",
-                            "data": {
-                                "id": f"{transcript['video_id']}_seg_{len(training_data)}",
-                                "title": transcript['title'],
-                                "link": transcript['url'],
-                                "summary": current_segment.strip(),
-                                "published": transcript['upload_date'],
-                                "raw": {
-                                    "video_id": transcript['video_id'],
-                                    "channel": transcript['channel_key'],
-                                    "segment_text": current_segment.strip()
-                                }
-                            }
-                        })
-                    current_segment = sentence + ". "
-            
-            # Dodaj ostatni segment
-            if current_segment.strip():
-                training_data.append({
-                    "source": transcript['channel'],
-                    "feed": transcript['url'], 
-                    "type": "video_transcript",
-                    "country": "PL",
-                    "license": "fair_use",
-                    "data": {
-                        "id": f"{transcript['video_id']}_seg_{len(training_data)}",
-                        "title": transcript['title'],
-                        "link": transcript['url'],
-                        "summary": current_segment.strip(),
-                        "published": transcript['upload_date'],
-                        "raw": {
-                            "video_id": transcript['video_id'],
-                            "channel": transcript['channel_key'],
-                            "segment_text": current_segment.strip()
-                        }
-                    }
-                })
-    
-    # Zapisz w formacie JSONL
-    output_file = ROOT / "data" / "raw" / "youtube_transcripts.jsonl"
-    with output_file.open('w', encoding='utf-8') as f:
-        for item in training_data:
-            f.write(json.dumps(item, ensure_ascii=False) + '\n')
-    
-    print(f"✅ Zapisano {len(training_data)} segmentów do {output_file}")
-    return len(training_data)
+    written = export_transcripts()
+    print(f"✅ Dopisano {written} nowych segmentów do {RAW_EXPORT_PATH}")
+    return written
 
 def main():
     """Główna funkcja."""
@@ -326,16 +275,19 @@ def main():
         if transcripts:
             all_transcripts[channel_key] = transcripts
     
-    if all_transcripts:
-        # Eksportuj do formatu treningowego
-        total_segments = export_for_training(all_transcripts)
-        
+    if not all_transcripts:
+        print("\n⚠️  Brak nowych transkrypcji w tym uruchomieniu")
+    
+    # Eksport przyrostowy obejmuje też transkrypcje z poprzednich uruchomień
+    total_segments = export_for_training()
+    
+    if total_segments:
         print(f"\n🎉 PIPELINE ZAKOŃCZONY!")
-        print(f"📊 Pozyskano {total_segments} segmentów treningowych")
-        print(f"📁 Lokalizacja: {ROOT}/data/raw/youtube_transcripts.jsonl")
+        print(f"📊 Pozyskano {total_segments} nowych segmentów treningowych")
+        print(f"📁 Lokalizacja: {RAW_EXPORT_PATH}")
         print(f"🎯 Gotowe do włączenia do głównego korpusu!")
     else:
-        print("\n❌ Nie udało się pozyskać żadnych transkrypcji")
+        print("\n❌ Brak nowych segmentów do eksportu")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file